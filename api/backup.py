@@ -0,0 +1,186 @@
+"""
+Database backups, replacing dumpdata/loaddata: a directory per backup with
+a gzipped PostgreSQL COPY stream per table and a manifest.json.
+
+Backups read every table in one REPEATABLE READ transaction, so they are a
+consistent snapshot, and stream rows from COPY straight into gzip: memory
+does not grow with the database. An incremental backup hard-links the file
+of each table unchanged since the previous backup, so every backup
+directory is complete on its own. Only the tables of the change log are
+reused: its triggers see every write (counter updates, SET NULL cascades,
+raw SQL), and an entry the previous backup's snapshot did not see marks the
+table as changed. The other tables are small and always copied.
+
+Restores truncate the tables and COPY the rows back in one transaction. No
+model code runs, so no signal fires (stock ledger, barcodes, tokens...);
+the sequences are reset and the change markers, change feed and response
+cache are invalidated afterwards. Media files are not part of the backup.
+"""
+
+import gzip
+import json
+import os
+import shutil
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.migrations.recorder import MigrationRecorder
+from django.utils.timezone import now
+from .caching import RESPONSE_CACHE
+from .changes import FEED_TABLES
+from .models import TRACKED_MODELS, ChangeLog, TableChange
+
+BACKUP_FORMAT = 1
+COMPRESS_LEVEL = 3
+MANIFEST = "manifest.json"
+
+
+class BackupError(Exception):
+    pass
+
+
+def backup_models():
+    """{table: model} of every table Django manages, m2m tables included."""
+    tables = {}
+    for model in apps.get_models(include_auto_created=True):
+        if model._meta.managed and not model._meta.proxy:
+            tables.setdefault(model._meta.db_table, model)
+    return tables
+
+
+def applied_migrations():
+    applied = MigrationRecorder(connection).applied_migrations()
+    return sorted(f"{app}.{name}" for app, name in applied)
+
+
+def read_manifest(directory):
+    try:
+        with open(os.path.join(directory, MANIFEST)) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError) as error:
+        raise BackupError(f"{directory} is not a backup: {error}")
+    if manifest.get("format") != BACKUP_FORMAT:
+        raise BackupError(f"Unsupported backup format in {directory}")
+    return manifest
+
+
+def latest_backup(root):
+    """Directory of the most recent complete backup under `root`, or None."""
+    try:
+        names = sorted(os.listdir(root), reverse=True)
+    except FileNotFoundError:
+        return None
+    for name in names:
+        if os.path.exists(os.path.join(root, name, MANIFEST)):
+            return os.path.join(root, name)
+    return None
+
+
+def changed_tables(cursor, snapshot):
+    """
+    Tables with change log entries that the backup taken at `snapshot` (a
+    txid_snapshot) did not see. "" stands for a reset (restore, pruned log)
+    since: the entries it replaced may have been such ones.
+    """
+    quote = connection.ops.quote_name
+    cursor.execute(
+        f"SELECT DISTINCT {quote('table')} FROM {quote(ChangeLog._meta.db_table)} "
+        "WHERE txid >= txid_snapshot_xmin(%s::txid_snapshot) AND "
+        "(action = %s OR NOT txid_visible_in_snapshot(txid, %s::txid_snapshot))",
+        [snapshot, ChangeLog.Actions.RESET, snapshot],
+    )
+    return {table for (table,) in cursor.fetchall()}
+
+
+def backup(root=None, incremental=False):
+    """
+    Writes a backup under `root` (BACKUP_DIR by default) and returns its
+    directory. `incremental` reuses the unchanged tables of the latest one.
+    """
+    root = root or settings.BACKUP_DIR
+    base = latest_backup(root) if incremental else None
+    base_manifest = read_manifest(base) if base else {}
+    base_tables = base_manifest.get("tables", {})
+    directory = os.path.join(root, now().strftime("%Y%m%d-%H%M%S-%f"))
+    partial = f"{directory}.partial"
+    os.makedirs(partial)
+    quote = connection.ops.quote_name
+    manifest = {"format": BACKUP_FORMAT, "base": base and os.path.basename(base)}
+
+    try:
+        with transaction.atomic(durable=True), connection.cursor() as cursor:
+            # Must come first: every table is then read from the same snapshot.
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY")
+            cursor.execute("SELECT txid_current_snapshot()")
+            manifest["snapshot"] = cursor.fetchone()[0]
+            manifest["created_at"] = now().isoformat()
+            manifest["migrations"] = applied_migrations()
+            unchanged = set()
+            if base_manifest.get("snapshot"):
+                changed = changed_tables(cursor, base_manifest["snapshot"])
+                if "" not in changed:
+                    unchanged = set(FEED_TABLES) - changed
+            tables = manifest["tables"] = {}
+            for table, model in sorted(backup_models().items()):
+                columns = [field.column for field in model._meta.local_concrete_fields]
+                entry = {"file": f"{table}.copy.gz", "columns": columns}
+                path = os.path.join(partial, entry["file"])
+                previous = base_tables.get(table)
+                if table in unchanged and previous and previous["columns"] == columns:
+                    os.link(os.path.join(base, previous["file"]), path)
+                    entry["rows"] = previous["rows"]
+                    entry["reused"] = True
+                else:
+                    column_list = ", ".join(quote(column) for column in columns)
+                    with gzip.open(path, "wb", compresslevel=COMPRESS_LEVEL) as file:
+                        cursor.copy_expert(
+                            f"COPY {quote(table)} ({column_list}) TO STDOUT", file
+                        )
+                    entry["rows"] = cursor.rowcount
+                tables[table] = entry
+
+        with open(os.path.join(partial, MANIFEST), "w") as file:
+            json.dump(manifest, file, indent=1)
+        os.rename(partial, directory)
+    except BaseException:
+        shutil.rmtree(partial, ignore_errors=True)
+        raise
+    return directory
+
+
+def restore(directory):
+    """
+    Replaces the content of every table with the backup in `directory`.
+    The database must be migrated to the same state the backup was taken in.
+    """
+    manifest = read_manifest(directory)
+    if manifest["migrations"] != applied_migrations():
+        raise BackupError(
+            "The backup was taken with other migrations applied, migrate the "
+            "database to the same state first."
+        )
+    models = backup_models()
+    unknown = set(manifest["tables"]) - set(models)
+    if unknown:
+        raise BackupError(f"Unknown tables in the backup: {', '.join(sorted(unknown))}")
+    quote = connection.ops.quote_name
+
+    with transaction.atomic(durable=True), connection.cursor() as cursor:
+        ChangeLog.pause()
+        cursor.execute(f"TRUNCATE {', '.join(quote(table) for table in models)}")
+        for table, entry in manifest["tables"].items():
+            column_list = ", ".join(quote(column) for column in entry["columns"])
+            path = os.path.join(directory, entry["file"])
+            with gzip.open(path, "rb") as file:
+                cursor.copy_expert(
+                    f"COPY {quote(table)} ({column_list}) FROM STDIN", file
+                )
+        for sql in connection.ops.sequence_reset_sql(no_style(), models.values()):
+            cursor.execute(sql)
+        # Clients, replicas and caches may hold data newer than the backup.
+        TableChange.touch(*TRACKED_MODELS)
+        ChangeLog.add_reset()
+        transaction.on_commit(caches[RESPONSE_CACHE].clear)
+    return manifest
@@ -0,0 +1,115 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.timezone import now
+from rest_framework.response import Response
+
+RESPONSE_CACHE = "default"
+
+# Scopes a cached response can depend on.
+STATS_SCOPE = "stats"
+LOOKUPS_SCOPE = "lookups"  # years, tribes, statuses, professions, handlers
+
+
+def year_scope(year):
+    return f"year:{year}"
+
+
+def family_scope(family_id):
+    return f"family:{family_id}"
+
+
+def version_key(scope):
+    return f"version:{scope}"
+
+
+def bump_versions(*scopes):
+    """
+    Gives every scope a fresh version, so the responses built from them stop
+    matching. Runs once the surrounding transaction commits, otherwise a
+    concurrent request could cache the old rows under the new version.
+    """
+    if not scopes:
+        return
+    versions = {version_key(scope): uuid.uuid4().hex for scope in set(scopes)}
+    transaction.on_commit(lambda: caches[RESPONSE_CACHE].set_many(versions, None))
+
+
+def response_cache_key(request, name):
+    # Age filters and the dashboard months depend on the current date.
+    query = sorted(request.query_params.lists())
+    digest = hashlib.sha1(repr((now().date(), query)).encode()).hexdigest()
+    return f"response:{name}:{digest}"
+
+
+def cached_response(request, name, scopes, build):
+    """
+    Returns `Response(build())`, reusing the data stored under `name` and the
+    request query while none of `scopes` was bumped since it was built.
+
+    Entries carry the versions they were built against and are fetched with
+    the versions in a single `get_many`, so a hit costs one cache round trip.
+    """
+    cache = caches[RESPONSE_CACHE]
+    key = response_cache_key(request, name)
+    version_keys = [version_key(scope) for scope in scopes]
+
+    found = cache.get_many([key, *version_keys])
+    versions = [found.get(version) for version in version_keys]
+    entry = found.get(key)
+    if entry is not None and None not in versions and entry[0] == versions:
+        return Response(entry[1])
+
+    if None in versions:
+        versions = get_versions(scopes)
+    data = build()
+    if None not in versions:
+        cache.set(key, (versions, data))
+    return Response(data)
+
+
+def get_versions(scopes):
+    """Current versions of `scopes`, starting the missing ones."""
+    cache = caches[RESPONSE_CACHE]
+    version_keys = [version_key(scope) for scope in scopes]
+    found = cache.get_many(version_keys)
+    if len(found) < len(version_keys):
+        for version in version_keys:
+            if version not in found:
+                cache.add(version, uuid.uuid4().hex, None)
+        found = cache.get_many(version_keys)
+    return [found.get(version) for version in version_keys]
+
+
+class VersionedLRU:
+    """
+    Bounded in-process LRU. Each entry remembers the versions of the scopes
+    it was built from and `get` only returns it while they are unchanged, so
+    writes invalidate it (in every worker once CACHE_DIR is shared).
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """Returns (fresh, scopes, value), or None when `key` is unknown."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            self.entries.move_to_end(key)
+        scopes, versions, value = entry
+        return versions == get_versions(scopes), scopes, value
+
+    def set(self, key, scopes, versions, value):
+        """`versions` must be read before `value` was built (None: unknown)."""
+        with self.lock:
+            self.entries[key] = (scopes, versions, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
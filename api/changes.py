@@ -0,0 +1,177 @@
+"""
+Delta sync for the desktop client: every row created, updated or deleted
+since the client's cursor, read from the ChangeLog the database triggers
+write.
+
+A cursor is the (txid, id) position of the last entry the client got. Only
+entries of transactions that finished before the oldest one still running
+are returned, so entries cannot show up later below a cursor. A client
+without a cursor, or with one older than the last reset (restore, pruned
+log), gets `reset`: it reloads the lists and keeps the returned cursor.
+
+The feed therefore stops at the oldest transaction that writes and is still
+open: while an import or a rollover runs, the changes committed after it
+began are held back, then come in one go. Read-only transactions (requests,
+backups) are never waited for, they have no txid. A session left idle in a
+transaction holds the feed until it ends: set the database's
+idle_in_transaction_session_timeout to bound that.
+"""
+
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework.exceptions import ValidationError
+from .models import (
+    ChangeLog,
+    Child,
+    Delivery,
+    Donation,
+    Family,
+    Handler,
+    PersonInCustody,
+    Product,
+    Spouce,
+)
+from .serializers import (
+    ChildSerializer,
+    DeliverySerializer,
+    DonationSerializer,
+    FamilySerializer,
+    HandlerSerializer,
+    PersonInCustodySerializer,
+    ProductSerializer,
+    SpouceSerializer,
+)
+
+FEED_PAGE_SIZE = 1000
+MAX_FEED_PAGE_SIZE = 5000
+
+# table: (name in the feed, rows, serializer)
+FEED_TABLES = {
+    model._meta.db_table: (name, queryset, serializer_class)
+    for name, model, queryset, serializer_class in [
+        (
+            "family",
+            Family,
+            Family.objects.select_related(
+                "tribe", "healthStatus", "socialStatus", "profession"
+            ),
+            FamilySerializer,
+        ),
+        ("child", Child, Child.objects.all(), ChildSerializer),
+        ("spouce", Spouce, Spouce.objects.all(), SpouceSerializer),
+        (
+            "person_in_custody",
+            PersonInCustody,
+            PersonInCustody.objects.all(),
+            PersonInCustodySerializer,
+        ),
+        ("handler", Handler, Handler.objects.all(), HandlerSerializer),
+        ("product", Product, Product.objects.all(), ProductSerializer),
+        ("delivery", Delivery, Delivery.objects.all(), DeliverySerializer),
+        ("donation", Donation, Donation.objects.all(), DonationSerializer),
+    ]
+}
+
+
+def parse_cursor(value):
+    if not value:
+        return None
+    try:
+        txid, id = value.split(".")
+        return int(txid), int(id)
+    except ValueError:
+        raise ValidationError({"cursor": "Invalid cursor"})
+
+
+def format_cursor(position):
+    return "{}.{}".format(*position)
+
+
+def finished_entries():
+    """
+    Entries whose (txid, id) order is final: no earlier one can appear. They
+    end before the oldest transaction that is still open and has written.
+    """
+    xmin = RawSQL("txid_snapshot_xmin(txid_current_snapshot())", [])
+    return ChangeLog.objects.filter(txid__lt=xmin)
+
+
+def after(position):
+    txid, id = position
+    return Q(txid__gt=txid) | Q(txid=txid, id__gt=id)
+
+
+def last_position(entries):
+    return entries.order_by("-txid", "-id").values_list("txid", "id").first()
+
+
+def change_feed(cursor, limit=FEED_PAGE_SIZE):
+    """
+    The feed page after `cursor` (a (txid, id) position or None): at most
+    `limit` log entries, with one change per row holding its current data.
+    """
+    entries = finished_entries()
+    reset = last_position(entries.filter(action=ChangeLog.Actions.RESET))
+    if cursor is None or (reset and cursor < reset):
+        head = last_position(entries) or (0, 0)
+        return {
+            "cursor": format_cursor(head),
+            "reset": True,
+            "more": False,
+            "changes": [],
+        }
+
+    page = list(
+        entries.filter(after(cursor))
+        .exclude(action=ChangeLog.Actions.RESET)
+        .order_by("txid", "id")
+        .values_list("txid", "id", "table", "object_id", "action")[: limit + 1]
+    )
+    more = len(page) > limit
+    page = page[:limit]
+    if page:
+        cursor = page[-1][:2]
+
+    return {
+        "cursor": format_cursor(cursor),
+        "reset": False,
+        "more": more,
+        "changes": collapse_changes(page),
+    }
+
+
+def collapse_changes(page):
+    """One change per row, in the order of its last entry, with its data."""
+    actions = {}
+    for txid, id, table, object_id, action in page:
+        if table not in FEED_TABLES:
+            continue
+        previous = actions.pop((table, object_id), None)
+        if previous == ChangeLog.Actions.CREATED:
+            if action == ChangeLog.Actions.DELETED:
+                continue  # never seen by the client
+            action = ChangeLog.Actions.CREATED
+        actions[(table, object_id)] = action
+
+    data = {}
+    for table, (name, queryset, serializer_class) in FEED_TABLES.items():
+        ids = [
+            object_id
+            for (changed, object_id), action in actions.items()
+            if changed == table and action != ChangeLog.Actions.DELETED
+        ]
+        if ids:
+            rows = serializer_class(queryset.filter(pk__in=ids), many=True).data
+            data.update(((table, row["id"]), row) for row in rows)
+
+    changes = []
+    for (table, object_id), action in actions.items():
+        row = data.get((table, object_id))
+        if row is None:
+            # Deleted since, its tombstone comes in a later page.
+            action = ChangeLog.Actions.DELETED
+        change = {"model": FEED_TABLES[table][0], "id": object_id, "action": action}
+        if row is not None:
+            change["data"] = row
+        changes.append(change)
+    return changes
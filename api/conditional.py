@@ -0,0 +1,89 @@
+import hashlib
+from datetime import datetime, time
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.timezone import localdate, make_aware, now
+from .models import TableChange
+
+# Last-Modified has a one second precision: until a change is this old, a
+# later write could carry the same timestamp and get a wrong 304.
+LAST_MODIFIED_DELAY = 2
+
+
+class NotModified(Exception):
+    def __init__(self, response):
+        self.response = response
+
+
+def get_validators(tables, request, name):
+    """
+    Strong ETag and Last-Modified timestamp for `request` against the change
+    markers of `tables`. Both move with any write to those tables, and at
+    midnight since ages and "this year" filters depend on the date. The
+    timestamp is None while the last change is under LAST_MODIFIED_DELAY
+    seconds old, the ETag alone validates then.
+    """
+    markers = sorted(
+        TableChange.objects.filter(
+            table__in=[model._meta.db_table for model in tables]
+        ).values_list("table", "version", "changed_at")
+    )
+    today = localdate()
+    last_modified = max(
+        [make_aware(datetime.combine(today, time.min))]
+        + [changed_at for table, version, changed_at in markers]
+    ).timestamp()
+    versions = [(table, version) for table, version, changed_at in markers]
+    query = sorted(request.query_params.lists())
+    digest = hashlib.sha1(repr((name, today, versions, query)).encode()).hexdigest()
+    if now().timestamp() < int(last_modified) + LAST_MODIFIED_DELAY:
+        return quote_etag(digest), None
+    return quote_etag(digest), int(last_modified)
+
+
+class ConditionalGetMixin:
+    """
+    Answers GET/HEAD requests with 304 when `If-None-Match` or
+    `If-Modified-Since` still match the `change_tables` markers, before the
+    view queries or serializes anything, and tags 200 responses with the
+    validators otherwise.
+    """
+
+    change_tables = ()
+    conditional_validators = None
+
+    def get_change_tables(self):
+        return self.change_tables
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        tables = self.get_change_tables()
+        if request.method not in ("GET", "HEAD") or not tables:
+            return
+
+        etag, last_modified = get_validators(
+            tables, request, f"{type(self).__name__}:{request.path}"
+        )
+        self.conditional_validators = (etag, last_modified)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified
+        )
+        if response is not None:
+            raise NotModified(response)
+
+    def handle_exception(self, exc):
+        if isinstance(exc, NotModified):
+            return exc.response
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if self.conditional_validators and response.status_code in (200, 304):
+            etag, last_modified = self.conditional_validators
+            response.headers["ETag"] = etag
+            if last_modified is not None:
+                response.headers["Last-Modified"] = http_date(last_modified)
+            # Token-authenticated data: keep it out of shared caches and make
+            # clients revalidate on every use.
+            patch_cache_control(response, private=True, no_cache=True)
+        return response
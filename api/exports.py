@@ -0,0 +1,104 @@
+"""
+CSV/XLSX exports of the filter views, streamed from a `values_list()`
+iterator: rows are never turned into models or run through serializers.
+
+Family columns are named like the import columns (api.imports), so an
+export can be edited and imported again; imported families get new
+barcodes.
+"""
+
+from django.db.models import CharField, Value
+from django.db.models.functions import Concat, NullIf, Trim
+from rest_framework.exceptions import ValidationError
+from .streaming import (
+    EXPORT_CHUNK_SIZE,
+    EXPORT_CONTENT_TYPES,
+    streaming_export_response,
+)
+
+
+def full_name(*fields):
+    """The space-joined `fields`, NULL when they all are."""
+    parts = []
+    for field in fields:
+        parts += [field, Value(" ")]
+    name = Trim(Concat(*parts[:-1], output_field=CharField()))
+    return NullIf(name, Value(""))
+
+
+FAMILY_COLUMNS = [
+    ("id", "id"),
+    ("barcode", "barcode"),
+    ("lastName", "lastName"),
+    ("firstName", "firstName"),
+    ("father", "father"),
+    ("grandFather", "grandFather"),
+    ("day_of_birth", "day_of_birth"),
+    ("idNumber", "idNumber"),
+    ("phoneNumber1", "phoneNumber1"),
+    ("phoneNumber2", "phoneNumber2"),
+    ("address", "address"),
+    ("email", "email"),
+    ("tribe", "tribe__name"),
+    ("healthStatus", "healthStatus__name"),
+    ("socialStatus", "socialStatus__name"),
+    ("profession", "profession__name"),
+    ("handler", full_name("handler__lastName", "handler__firstName")),
+    ("childrenCount", "childrenCount"),
+    ("spoucesCount", "spoucesCount"),
+    ("personInCustodyCount", "personInCustodyCount"),
+]
+
+CHILD_COLUMNS = [
+    ("id", "id"),
+    ("barcode", "family__barcode"),
+    ("father", full_name("family__lastName", "family__firstName")),
+    ("firstName", "firstName"),
+    ("gender", "gender"),
+    ("day_of_birth", "day_of_birth"),
+    ("mother", "mother"),
+    ("healthStatus", "healthStatus__name"),
+    ("notes", "notes"),
+]
+
+DELIVERY_COLUMNS = [
+    ("id", "id"),
+    ("occasion", "occasion"),
+    ("product", "product__category"),
+    ("type", "product__type"),
+    ("quantity", "quantity"),
+    ("date", "date"),
+    ("beneficiary", full_name("beneficiary__lastName", "beneficiary__firstName")),
+    ("barcode", "beneficiary__barcode"),
+]
+
+DONATION_COLUMNS = [
+    ("id", "id"),
+    ("donor", "donor"),
+    ("product", "product__category"),
+    ("type", "product__type"),
+    ("date", "date"),
+    ("quantity", "quantity"),
+]
+
+
+class ExportMixin:
+    """
+    Lets a filter view answer with a spreadsheet of its whole result when
+    the client passes `export=csv` or `export=xlsx`.
+    """
+
+    export_query_param = "export"
+
+    def export_format(self, request):
+        format = request.query_params.get(self.export_query_param)
+        if format and format not in EXPORT_CONTENT_TYPES:
+            raise ValidationError({self.export_query_param: "Expected csv or xlsx."})
+        return format
+
+    def export_response(self, queryset, columns, format, filename):
+        header = [name for name, _ in columns]
+        rows = queryset.values_list(*[column for _, column in columns])
+        # A server-side cursor: rows come in as the file goes out.
+        rows = rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        return streaming_export_response(header, rows, format, filename)
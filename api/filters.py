@@ -0,0 +1,243 @@
+from datetime import date
+from django.db.models import Exists, OuterRef, Q
+from django.utils.timezone import now
+from rest_framework.exceptions import ValidationError
+from .models import Child, FamilySearchDocument
+
+
+def years_ago(today, years):
+    try:
+        return today.replace(year=today.year - years)
+    except ValueError:  # 29 February
+        return today.replace(year=today.year - years, day=28)
+
+
+class Filter:
+    """
+    Maps one query parameter onto one ORM lookup. Empty parameters are
+    ignored unless `apply_empty` is set (e.g. an empty `__in` list that must
+    match nothing).
+    """
+
+    def __init__(
+        self, param, lookup=None, many=False, cast=None, default=None, apply_empty=False
+    ):
+        self.param = param
+        self.lookup = lookup
+        self.many = many
+        self.cast = cast
+        self.default = default
+        self.apply_empty = apply_empty
+
+    def convert(self, param, value):
+        if self.cast is None:
+            return value
+        try:
+            return self.cast(value)
+        except (TypeError, ValueError):
+            raise ValidationError({param: f"Invalid value: {value}"})
+
+    def read(self, params, param, default=None):
+        value = params.get(param, default)
+        if callable(value):
+            value = value()
+        if value in (None, ""):
+            return None
+        return self.convert(param, value)
+
+    def get_value(self, params):
+        if self.many:
+            values = [
+                self.convert(self.param, value)
+                for value in params.getlist(self.param, [])
+            ]
+            return values if values or self.apply_empty else None
+        return self.read(params, self.param, self.default)
+
+    def compile(self, params):
+        value = self.get_value(params)
+        if value is None:
+            return None
+        return Q(**{self.lookup: value})
+
+
+class SearchFilter(Filter):
+    """Case-insensitive match of one term against any of `fields`."""
+
+    def __init__(self, param, fields):
+        super().__init__(param)
+        self.fields = fields
+
+    def compile(self, params):
+        value = self.get_value(params)
+        if value is None:
+            return None
+        query = Q()
+        for field in self.fields:
+            query |= Q(**{f"{field}__icontains": value})
+        return query
+
+
+class RangeFilter(Filter):
+    """`min_param` / `max_param` bounds on one field."""
+
+    def __init__(self, min_param, max_param, field, cast=None, defaults=(None, None)):
+        super().__init__(min_param, cast=cast)
+        self.min_param = min_param
+        self.max_param = max_param
+        self.field = field
+        self.defaults = defaults
+
+    def compile(self, params):
+        query = Q()
+        low = self.read(params, self.min_param, self.defaults[0])
+        high = self.read(params, self.max_param, self.defaults[1])
+        if low is not None:
+            query &= Q(**{f"{self.field}__gte": low})
+        if high is not None:
+            query &= Q(**{f"{self.field}__lte": high})
+        return query
+
+
+class AgeRangeFilter(RangeFilter):
+    """
+    `min_param` / `max_param` ages in years turned into a `day_of_birth`
+    range. `max_offset` widens the upper age bound by whole years.
+    """
+
+    def __init__(
+        self,
+        min_param,
+        max_param,
+        field="day_of_birth",
+        max_offset=0,
+        defaults=(0, 1000),
+    ):
+        super().__init__(min_param, max_param, field, cast=int, defaults=defaults)
+        self.max_offset = max_offset
+
+    def compile(self, params):
+        today = now().date()
+        min_age = self.read(params, self.min_param, self.defaults[0])
+        max_age = self.read(params, self.max_param, self.defaults[1])
+        query = Q()
+        if max_age is not None:
+            born_after = years_ago(today, max_age + self.max_offset)
+            query &= Q(**{f"{self.field}__gte": born_after})
+        if min_age is not None:
+            query &= Q(**{f"{self.field}__lte": years_ago(today, min_age)})
+        return query
+
+
+class ExistsFilter(Filter):
+    """
+    Keeps rows having at least one related `model` row (joined back through
+    `field`) that matches the nested `filters`. Compiles to EXISTS(...), so a
+    to-many relation never duplicates the outer rows.
+    """
+
+    def __init__(self, param, model, field, filters=()):
+        super().__init__(param)
+        self.model = model
+        self.field = field
+        self.filters = filters
+
+    def compile(self, params):
+        if not self.get_value(params):
+            return None
+        query = Q(**{self.field: OuterRef("pk")})
+        for spec in self.filters:
+            condition = spec.compile(params)
+            if condition is not None:
+                query &= condition
+        return Q(Exists(self.model.objects.filter(query)))
+
+
+class FilterSet:
+    """
+    Declarative list of filters compiled from request query params, e.g.
+
+        class ProductFilterSet(FilterSet):
+            search = SearchFilter("search", ["category", "type"])
+
+        queryset = ProductFilterSet(request.query_params).filter(queryset)
+    """
+
+    def __init__(self, params):
+        self.params = params
+
+    @classmethod
+    def get_filters(cls):
+        filters = {}
+        for klass in reversed(cls.__mro__):
+            for name, value in vars(klass).items():
+                if isinstance(value, Filter):
+                    filters[name] = value
+        return list(filters.values())
+
+    def get_query(self):
+        query = Q()
+        for spec in self.get_filters():
+            condition = spec.compile(self.params)
+            if condition is not None:
+                query &= condition
+        return query
+
+    def filter(self, queryset):
+        return queryset.filter(self.get_query())
+
+
+def start_of_year():
+    return date(date.today().year, 1, 1)
+
+
+class FamilyFilterSet(FilterSet):
+    search = Filter(
+        "search",
+        "search_document__document__contains",
+        cast=FamilySearchDocument.normalize,
+    )
+    socials = Filter("s", "socialStatus__name__in", many=True)
+    professions = Filter("p", "profession__name__in", many=True)
+    healths = Filter("h", "healthStatus__name__in", many=True)
+    age = AgeRangeFilter("min_age", "max_age", max_offset=1)
+    has_children = ExistsFilter(
+        "has_children",
+        Child,
+        "family",
+        filters=[AgeRangeFilter("min_children_age", "max_children_age")],
+    )
+
+
+class ChildFilterSet(FilterSet):
+    # `child_full_name` is annotated by the view
+    search = SearchFilter("search", ["child_full_name"])
+    age = AgeRangeFilter("min_children_age", "max_children_age")
+
+
+class HandlerFilterSet(FilterSet):
+    # `full_name` is annotated by the view
+    search = SearchFilter("search", ["full_name"])
+    types = Filter("types", "type__in", many=True, apply_empty=True)
+
+
+class ProductFilterSet(FilterSet):
+    search = SearchFilter("search", ["category", "type"])
+
+
+class DeliveryFilterSet(FilterSet):
+    # `beneficiary_full_name` is annotated by the view
+    search = SearchFilter(
+        "search",
+        ["occasion", "product__category", "product__type", "beneficiary_full_name"],
+    )
+    since = Filter("since", "date__gte", default=start_of_year)
+    till = Filter("till", "date__lte", default=date.today)
+    product = Filter("product_id", "product__id")
+
+
+class DonationFilterSet(FilterSet):
+    search = SearchFilter("search", ["donor", "product__category", "product__type"])
+    since = Filter("since", "date__gte", default=start_of_year)
+    till = Filter("till", "date__lte", default=date.today)
+    product = Filter("product_id", "product__id")
@@ -0,0 +1,303 @@
+"""
+Bulk family import from a CSV or XLSX sheet (the new year's registrations).
+
+Each row is a family, or a member of the family row above it when its
+`record` column is "child", "spouse" or "custody". Columns are named like
+the API fields (lastName, firstName, day_of_birth...). Lookups (tribe,
+healthStatus, socialStatus, profession) are given by name, the handler by
+"<lastName> <firstName>" or id, and dates as YYYY-MM-DD or DD/MM/YYYY.
+Families always get a new barcode of the year: a `barcode` column, as in
+exports (api.exports), is ignored.
+
+Rows are validated and bulk-inserted in batches inside one transaction,
+which is rolled back when any row is invalid, and the derived data
+(counters, search documents, stats, caches) is rebuilt once at the end.
+"""
+
+import csv
+import io
+import zipfile
+from collections import Counter, defaultdict
+from datetime import date, datetime
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from .models import (
+    Child,
+    Family,
+    Handler,
+    HealthStatus,
+    PersonInCustody,
+    Profession,
+    SocialStatus,
+    Spouce,
+    Tribe,
+    families_changed,
+    family_barcode,
+)
+from .streaming import iter_chunks
+
+BATCH_SIZE = 500
+
+RECORDS = {
+    "family": (
+        Family,
+        [
+            "lastName",
+            "firstName",
+            "father",
+            "grandFather",
+            "day_of_birth",
+            "idNumber",
+            "phoneNumber1",
+            "phoneNumber2",
+            "address",
+            "email",
+            "tribe",
+            "healthStatus",
+            "socialStatus",
+            "profession",
+            "handler",
+        ],
+    ),
+    "child": (
+        Child,
+        ["firstName", "day_of_birth", "gender", "mother", "healthStatus", "notes"],
+    ),
+    "spouse": (
+        Spouce,
+        ["firstName", "lastName", "day_of_birth", "healthStatus", "notes"],
+    ),
+    "custody": (
+        PersonInCustody,
+        [
+            "firstName",
+            "lastName",
+            "day_of_birth",
+            "gender",
+            "relation",
+            "healthStatus",
+            "notes",
+        ],
+    ),
+}
+RECORD_ALIASES = {"spouce": "spouse", "person_in_custody": "custody"}
+LOOKUP_MODELS = {
+    "tribe": Tribe,
+    "healthStatus": HealthStatus,
+    "socialStatus": SocialStatus,
+    "profession": Profession,
+}
+
+
+def read_rows(file, name):
+    """
+    (line number, {column: value}) of an uploaded .csv or .xlsx file. Files
+    that cannot be read raise ValidationError.
+    """
+    rows = read_xlsx(file) if name.lower().endswith(".xlsx") else read_csv(file)
+    try:
+        yield from rows
+    except (csv.Error, UnicodeDecodeError, zipfile.BadZipFile, OSError) as error:
+        raise ValidationError(f"Could not read {name}: {error}")
+
+
+def read_csv(file):
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    reader = csv.DictReader(text, dialect=dialect)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_xlsx(file):
+    try:
+        from openpyxl import load_workbook
+        from openpyxl.utils.exceptions import InvalidFileException
+    except ImportError:
+        raise ValidationError("XLSX files need openpyxl, send a CSV file instead.")
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (InvalidFileException, KeyError, ValueError) as error:
+        # A zip without the workbook parts, another Office format...
+        raise ValidationError(f"Not an XLSX workbook: {error}")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = ["" if cell is None else str(cell).strip() for cell in next(rows, ())]
+        for line, values in enumerate(rows, start=2):
+            if any(value is not None for value in values):
+                yield line, dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def cell_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, (date, datetime)):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def lookup_key(name):
+    return " ".join(str(name).split()).casefold()
+
+
+class FamilyImporter:
+    def __init__(self, year):
+        self.year = year
+        self.lookups = {
+            field: self.name_map(model.objects.values_list("name", "pk"))
+            for field, model in LOOKUP_MODELS.items()
+        }
+        handlers = Handler.objects.values_list("lastName", "firstName", "pk")
+        self.handlers = self.name_map(
+            (f"{lastName} {firstName}", pk) for lastName, firstName, pk in handlers
+        )
+        self.family_ids = []
+        self.counts = Counter()
+        self.errors = []
+
+    @staticmethod
+    def name_map(pairs):
+        names = {}
+        for name, pk in pairs:
+            names.setdefault(lookup_key(name), pk)
+        return names
+
+    def run(self, rows, dry_run=False):
+        """
+        Imports `rows` ((line, {column: value}) pairs) and returns the report.
+        Nothing is kept when a row is invalid or on a `dry_run`.
+        """
+        with transaction.atomic():
+            for batch in iter_chunks(self.group(rows), BATCH_SIZE):
+                records = self.validate(batch)
+                if not self.errors and not dry_run:
+                    self.insert(records)
+            if self.errors or dry_run:
+                transaction.set_rollback(True)
+            elif self.family_ids:
+                families_changed.send(sender=Family, family_ids=self.family_ids)
+        return self.report(imported=not self.errors and not dry_run)
+
+    def report(self, imported):
+        return {
+            "imported": imported,
+            "families": self.counts["family"],
+            "children": self.counts["child"],
+            "spouces": self.counts["spouse"],
+            "custodies": self.counts["custody"],
+            "errors": sorted(self.errors, key=lambda error: error["row"]),
+        }
+
+    def group(self, rows):
+        """Yields each family row with the member rows under it."""
+        group = []
+        for line, row in rows:
+            record = lookup_key(row.get("record") or "family")
+            record = RECORD_ALIASES.get(record, record)
+            if record == "family" and group:
+                yield group
+                group = []
+            group.append((line, record, row))
+        if group:
+            yield group
+
+    def validate(self, groups):
+        records = []
+        for group in groups:
+            (line, record, row), members = group[0], group[1:]
+            if record != "family":
+                self.error(line, "record", "Member row without a family above it.")
+                continue
+            family = self.build(line, record, row)
+            built = [self.build_member(*member) for member in members]
+            if family is not None and all(member for _, member in built):
+                records.append((family, built))
+        for family, members in records:
+            self.counts["family"] += 1
+            self.counts.update(record for record, _ in members)
+        return records
+
+    def build_member(self, line, record, row):
+        if record not in RECORDS:
+            self.error(line, "record", f"Unknown record type: {record}")
+            return record, None
+        return record, self.build(line, record, row)
+
+    def build(self, line, record, row):
+        model, fields = RECORDS[record]
+        values, errors = {}, {}
+        for name in fields:
+            try:
+                values.update(self.clean(model, name, cell_value(row.get(name))))
+            except ValidationError as error:
+                errors[name] = error.messages
+        if errors:
+            self.errors.append({"row": line, "errors": errors})
+            return None
+        if record == "family":
+            values["year_id"] = self.year.pk
+        instance = model(**values)
+        instance._import_line = line
+        return instance
+
+    def clean(self, model, name, value):
+        """{attribute: value} of one cell, raising ValidationError."""
+        if name == "handler":
+            return {"handler_id": self.resolve(self.handlers, value, "handler")}
+        if name in LOOKUP_MODELS:
+            return {f"{name}_id": self.resolve(self.lookups[name], value, name)}
+
+        field = model._meta.get_field(name)
+        if value == "":
+            if field.has_default():
+                value = field.get_default()
+            else:
+                value = None if field.null else ""
+        elif isinstance(field, models.DateField) and isinstance(value, str):
+            value = self.parse_date(value)
+        return {name: field.clean(value, None)}
+
+    @staticmethod
+    def parse_date(value):
+        try:
+            return datetime.strptime(value, "%d/%m/%Y").date()
+        except ValueError:
+            return value  # ISO dates (and errors) are left to the field
+
+    @staticmethod
+    def resolve(names, value, label):
+        if value == "":
+            return None
+        if isinstance(value, str) and value.isdigit() and int(value) in names.values():
+            return int(value)
+        try:
+            return names[lookup_key(value)]
+        except KeyError:
+            raise ValidationError(f"Unknown {label}: {value}")
+
+    def insert(self, records):
+        members = defaultdict(list)
+        ids = Family.allocate_ids(len(records))
+        for (family, family_members), pk in zip(records, ids):
+            family.pk = pk
+            family.barcode = family_barcode(self.year.year, pk)
+            for record, member in family_members:
+                member.family_id = pk
+                members[record].append(member)
+        Family.objects.bulk_create([family for family, _ in records])
+        for record, instances in members.items():
+            RECORDS[record][0].objects.bulk_create(instances)
+        self.family_ids.extend(ids)
+
+    def error(self, line, field, message):
+        self.errors.append({"row": line, "errors": {field: [message]}})
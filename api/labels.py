@@ -0,0 +1,335 @@
+"""
+Printable barcode label sheets: A4 pages of 3 x 8 cards.
+
+Barcodes are rendered once into a content-addressed cache (the file name is
+a hash of what gets drawn), pages are composed in a process pool and whole
+sheets are cached the same way, so printing the same cards again is a file
+read. The page workers only get plain values, they never touch Django.
+Cached files are touched when used; `manage.py purge_labels` drops the ones
+left unused.
+
+Titles are Arabic names: they need LABEL_FONT, a TTF with Arabic glyphs,
+and shaping (joined letters, right to left), done by Pillow's libraqm layout
+when it is available and by arabic-reshaper and python-bidi otherwise.
+"""
+
+import hashlib
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+RENDER_VERSION = 1  # bump when the drawing code changes
+DPI = 200
+PAGE_SIZE = (1654, 2339)  # A4
+COLUMNS, ROWS = 3, 8
+LABELS_PER_PAGE = COLUMNS * ROWS
+MARGIN = 60
+TITLE_SIZE = 28
+# Pages a worker renders before it is replaced, giving back what Pillow and
+# its caches hold.
+PAGES_PER_WORKER = 50
+
+
+def content_key(*parts):
+    return hashlib.sha256(repr((RENDER_VERSION, *parts)).encode()).hexdigest()
+
+
+def cached_path(cache_dir, kind, key, extension):
+    return os.path.join(cache_dir, kind, key[:2], f"{key}.{extension}")
+
+
+def write_atomic(path, write):
+    """Runs `write(file)` on a temporary file moved to `path` when done."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as file:
+            write(file)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def render_barcode(code):
+    import barcode
+    from barcode.writer import ImageWriter
+
+    # Hand-typed codes that are not EAN-13 still print, as Code 128.
+    name = "ean13" if code.isdigit() and len(code) in (12, 13) else "code128"
+    symbol = barcode.get(name, code, writer=ImageWriter(mode="1"))
+    buffer = BytesIO()
+    symbol.write(
+        buffer,
+        {
+            "dpi": DPI,
+            "module_width": 0.33,  # the nominal EAN-13 size
+            "module_height": 12.0,
+            "font_size": 10,
+            "text_distance": 4,
+            "quiet_zone": 3,
+        },
+    )
+    return buffer.getvalue()
+
+
+def use_cached(path):
+    """True when `path` is cached, marking it as used for `purge_cache`."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+def barcode_image(code, cache_dir):
+    from PIL import Image
+
+    path = cached_path(cache_dir, "barcodes", content_key("barcode", code), "png")
+    if not use_cached(path):
+        data = render_barcode(code)
+        write_atomic(path, lambda file: file.write(data))
+    return Image.open(path)
+
+
+def has_raqm():
+    from PIL import features
+
+    return features.check("raqm")
+
+
+def check_setup():
+    """Raises ImproperlyConfigured unless titles can be drawn in Arabic."""
+    if not settings.LABEL_FONT or not os.path.isfile(settings.LABEL_FONT):
+        raise ImproperlyConfigured(
+            "LABEL_FONT must be the path of a TTF font with Arabic glyphs."
+        )
+    if not has_raqm():
+        try:
+            import arabic_reshaper, bidi  # noqa: F401
+        except ImportError:
+            raise ImproperlyConfigured(
+                "Arabic titles need Pillow built with libraqm, or the "
+                "arabic-reshaper and python-bidi packages."
+            )
+
+
+def title_font(font_path):
+    """The title font and the function preparing a title to be drawn with it."""
+    from PIL import ImageFont
+
+    if has_raqm():
+        font = ImageFont.truetype(
+            font_path, TITLE_SIZE, layout_engine=ImageFont.Layout.RAQM
+        )
+        return font, str
+    from arabic_reshaper import reshape
+    from bidi.algorithm import get_display
+
+    font = ImageFont.truetype(
+        font_path, TITLE_SIZE, layout_engine=ImageFont.Layout.BASIC
+    )
+    return font, lambda title: get_display(reshape(title))
+
+
+def render_page(labels, cache_dir, font_path, format):
+    """
+    One sheet of `labels` ((barcode, title) pairs): PNG bytes, or for "pdf"
+    the zlib-compressed 1-bit raster that `write_pdf` embeds.
+    """
+    from PIL import Image, ImageDraw
+
+    font, shape = title_font(font_path)
+    page = Image.new("1", PAGE_SIZE, 1)
+    draw = ImageDraw.Draw(page)
+    cell_width = (PAGE_SIZE[0] - 2 * MARGIN) // COLUMNS
+    cell_height = (PAGE_SIZE[1] - 2 * MARGIN) // ROWS
+
+    for index, (code, title) in enumerate(labels):
+        x = MARGIN + (index % COLUMNS) * cell_width
+        y = MARGIN + (index // COLUMNS) * cell_height
+        title = shape(title)
+        title_width = draw.textlength(title, font=font)
+        draw.text((x + (cell_width - title_width) / 2, y + 10), title, font=font)
+        image = barcode_image(code, cache_dir)
+        image.thumbnail((cell_width - 40, cell_height - 60), Image.NEAREST)
+        page.paste(image, (x + (cell_width - image.width) // 2, y + 50))
+
+    if format == "png":
+        buffer = BytesIO()
+        page.save(buffer, "PNG", optimize=True)
+        return buffer.getvalue()
+    return zlib.compress(page.tobytes())
+
+
+def write_pdf(pages, file):
+    """
+    Writes `render_page` rasters as a PDF, one page at a time, so memory does
+    not grow with the number of pages.
+    """
+    width, height = PAGE_SIZE
+    media = f"[0 0 {width * 72 / DPI:.2f} {height * 72 / DPI:.2f}]"
+    offsets = {}
+
+    def write_object(number, body, stream=None):
+        offsets[number] = file.tell()
+        file.write(f"{number} 0 obj\n".encode() + body)
+        if stream is not None:
+            file.write(b"\nstream\n" + stream + b"\nendstream")
+        file.write(b"\nendobj\n")
+
+    file.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    write_object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = []
+    for index, raster in enumerate(pages):
+        image, content, page = 3 + 3 * index, 4 + 3 * index, 5 + 3 * index
+        write_object(
+            image,
+            (
+                f"<< /Type /XObject /Subtype /Image /Width {width} "
+                f"/Height {height} /ColorSpace /DeviceGray /BitsPerComponent 1 "
+                f"/Filter /FlateDecode /Length {len(raster)} >>"
+            ).encode(),
+            raster,
+        )
+        draw = (
+            f"q {width * 72 / DPI:.2f} 0 0 {height * 72 / DPI:.2f} 0 0 cm /Im0 Do Q"
+        ).encode()
+        write_object(content, f"<< /Length {len(draw)} >>".encode(), draw)
+        write_object(
+            page,
+            (
+                f"<< /Type /Page /Parent 2 0 R /MediaBox {media} "
+                f"/Resources << /XObject << /Im0 {image} 0 R >> >> "
+                f"/Contents {content} 0 R >>"
+            ).encode(),
+        )
+        kids.append(f"{page} 0 R")
+    write_object(
+        2, f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+    )
+
+    xref = file.tell()
+    file.write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n".encode())
+    for number in sorted(offsets):
+        file.write(f"{offsets[number]:010d} 00000 n \n".encode())
+    file.write(
+        f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref}\n%%EOF\n".encode()
+    )
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(workers):
+    """
+    The pool of `workers` processes, started on first use and kept for the
+    life of the process: starting interpreters costs more than a page.
+    """
+    with _pools_lock:
+        pool = _pools.get(workers)
+        if pool is None:
+            # spawn: forking a threaded server process is not safe
+            pool = _pools[workers] = ProcessPoolExecutor(
+                workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                max_tasks_per_child=PAGES_PER_WORKER,
+            )
+        return pool
+
+
+def discard_pool(workers, pool):
+    with _pools_lock:
+        if _pools.get(workers) is pool:
+            del _pools[workers]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def map_pages(pages, format, workers=None):
+    """Renders `pages` in order, in the process pool when there are several."""
+    args = [settings.LABEL_CACHE_DIR, settings.LABEL_FONT, format]
+    workers = workers or settings.LABEL_WORKERS
+    if min(workers, len(pages)) <= 1:
+        for labels in pages:
+            yield render_page(labels, *args)
+        return
+    pool = get_pool(workers)
+    try:
+        yield from pool.map(render_page, pages, *[[arg] * len(pages) for arg in args])
+    except BrokenProcessPool:
+        # A worker died (killed, out of memory): the next sheet gets a new pool.
+        discard_pool(workers, pool)
+        raise
+
+
+def paginate(labels):
+    pages = [
+        labels[start : start + LABELS_PER_PAGE]
+        for start in range(0, len(labels), LABELS_PER_PAGE)
+    ]
+    return pages or [[]]
+
+
+def family_labels(families):
+    """(barcode, title) pairs for a Family queryset, in its order."""
+    return [
+        (barcode, f"{lastName} {firstName}")
+        for barcode, lastName, firstName in families.values_list(
+            "barcode", "lastName", "firstName"
+        )
+    ]
+
+
+def label_sheet(labels, format="pdf", page=None, workers=None):
+    """
+    Path of the sheet for `labels` ((barcode, title) pairs), rendered on the
+    first request on `workers` processes. "png" sheets hold the single
+    1-based `page`.
+    """
+    check_setup()
+    pages = paginate(labels)
+    if format == "png":
+        pages = [pages[page - 1]]
+    key = content_key("sheet", format, settings.LABEL_FONT, has_raqm(), pages)
+    path = cached_path(settings.LABEL_CACHE_DIR, "sheets", key, format)
+    if use_cached(path):
+        return path
+
+    rendered = map_pages(pages, format, workers)
+    if format == "png":
+        write_atomic(path, lambda file: file.write(next(rendered)))
+    else:
+        write_atomic(path, lambda file: write_pdf(rendered, file))
+    return path
+
+
+def purge_cache(max_age):
+    """
+    Deletes the cached barcodes and sheets not used for `max_age` seconds.
+    Returns the number of files deleted.
+    """
+    cutoff = time.time() - max_age
+    purged = 0
+    for kind in ("barcodes", "sheets"):
+        for directory, _, names in os.walk(
+            os.path.join(settings.LABEL_CACHE_DIR, kind)
+        ):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    if os.stat(path).st_mtime < cutoff:
+                        os.unlink(path)
+                        purged += 1
+                except FileNotFoundError:
+                    pass  # purged concurrently
+    return purged
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from api.models import Family, families_changed, family_barcode
+from api.streaming import iter_chunks
+
+
+class Command(BaseCommand):
+    help = "Give a barcode to every family that has none (e.g. imported rows)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        families = (
+            Family.objects.filter(barcode__isnull=True)
+            .order_by("pk")
+            .values_list("pk", "year__year")
+        )
+        assigned = 0
+        for batch in iter_chunks(families.iterator(), options["batch_size"]):
+            with transaction.atomic():
+                Family.objects.bulk_update(
+                    [
+                        Family(pk=pk, barcode=family_barcode(year, pk))
+                        for pk, year in batch
+                    ],
+                    ["barcode"],
+                )
+                families_changed.send(
+                    sender=Family, family_ids=[pk for pk, year in batch]
+                )
+            assigned += len(batch)
+        self.stdout.write(self.style.SUCCESS(f"Assigned {assigned} barcodes"))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from api.backup import backup, read_manifest
+
+
+class Command(BaseCommand):
+    help = "Back up the database as gzipped COPY streams, one file per table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dir", help="backup root (BACKUP_DIR by default)")
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="reuse the tables unchanged since the latest backup",
+        )
+
+    def handle(self, *args, **options):
+        directory = backup(options["dir"], incremental=options["incremental"])
+        tables = read_manifest(directory)["tables"].values()
+        reused = sum(1 for table in tables if table.get("reused"))
+        rows = sum(table["rows"] for table in tables)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Backed up {rows} rows of {len(tables)} tables "
+                f"({reused} unchanged) to {directory}"
+            )
+        )
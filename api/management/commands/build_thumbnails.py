@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from api.models import Document
+
+
+class Command(BaseCommand):
+    help = "Build the missing document thumbnails and previews."
+
+    def handle(self, *args, **options):
+        documents = Document.objects.filter(thumbnail="").order_by("pk")
+        built = skipped = 0
+        for document in documents.iterator():
+            if not document.file.storage.exists(document.file.name):
+                skipped += 1
+                continue
+            document.build_thumbnail()
+            if document.thumbnail.name:
+                built += 1
+            else:
+                skipped += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Built {built} thumbnails, {skipped} without preview")
+        )
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from api.models import StockSnapshot
+
+
+class Command(BaseCommand):
+    help = "Fold the stock ledger into the product snapshots."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--product", type=int, action="append", help="Only compact this product."
+        )
+
+    def handle(self, *args, **options):
+        compacted = StockSnapshot.compact(options["product"])
+        self.stdout.write(self.style.SUCCESS(f"Compacted {compacted} products"))
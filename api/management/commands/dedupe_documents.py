@@ -0,0 +1,35 @@
+import os
+from django.core.management.base import BaseCommand
+from api.models import DocumentUpload
+from api.storage import document_storage
+
+
+class Command(BaseCommand):
+    help = (
+        "Replace duplicate files under media/documents with links to shared "
+        "content-addressed blobs, then delete the unreferenced blobs."
+    )
+
+    def handle(self, *args, **options):
+        # Chunked uploads in progress are still written in place.
+        pending = set(DocumentUpload.objects.values_list("file", flat=True))
+        linked = dropped = freed = 0
+        for directory, _, files in os.walk(document_storage.path("documents")):
+            for name in files:
+                path = os.path.join(directory, name)
+                name = os.path.relpath(path, document_storage.location)
+                size = os.stat(path).st_size
+                if not size or name in pending:
+                    continue
+                if document_storage.deduplicate(name):
+                    dropped += 1
+                    freed += size
+                linked += 1
+        collected, collected_size = document_storage.collect_garbage()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Linked {linked} files, dropped {dropped} copies "
+                f"({freed // 1024} KB), collected {collected} blobs "
+                f"({collected_size // 1024} KB)"
+            )
+        )
@@ -0,0 +1,43 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from api.imports import FamilyImporter, read_rows
+from api.models import Year
+
+
+class Command(BaseCommand):
+    help = "Import a year's families and their members from a CSV or XLSX file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", type=int)
+        parser.add_argument("file", help="CSV or XLSX file")
+        parser.add_argument(
+            "--dry-run", action="store_true", help="validate without saving"
+        )
+
+    def handle(self, *args, **options):
+        try:
+            year = Year.objects.get(year=options["year"])
+        except Year.DoesNotExist:
+            raise CommandError(f"No year {options['year']}")
+
+        with open(options["file"], "rb") as file:
+            try:
+                report = FamilyImporter(year).run(
+                    read_rows(file, options["file"]), dry_run=options["dry_run"]
+                )
+            except ValidationError as error:
+                raise CommandError(" ".join(error.messages))
+
+        for error in report["errors"]:
+            for field, messages in error["errors"].items():
+                self.stderr.write(f"row {error['row']}, {field}: {' '.join(messages)}")
+        if report["errors"]:
+            raise CommandError(f"{len(report['errors'])} invalid rows, nothing saved")
+        verb = "Imported" if report["imported"] else "Validated"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{verb} {report['families']} families, {report['children']} "
+                f"children, {report['spouces']} spouses and {report['custodies']} "
+                "persons in custody"
+            )
+        )
@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+from api.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Drop old change feed entries. Replicas that had not synced them "
+        "reload on their next sync."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=90, help="keep this many days (90)"
+        )
+
+    def handle(self, *args, **options):
+        deleted = ChangeLog.prune(now() - timedelta(days=options["days"]))
+        self.stdout.write(self.style.SUCCESS(f"Pruned {deleted} change log entries"))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from api.labels import purge_cache
+
+
+class Command(BaseCommand):
+    help = "Delete the cached barcodes and label sheets left unused."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days", type=int, default=30, help="Idle time before a file goes."
+        )
+
+    def handle(self, *args, **options):
+        purged = purge_cache(options["days"] * 24 * 3600)
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} cached files"))
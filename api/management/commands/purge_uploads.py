@@ -0,0 +1,31 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+from api.models import DocumentUpload
+
+
+class Command(BaseCommand):
+    help = "Delete chunked uploads (and their partial files) left unfinished."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--hours", type=int, default=72, help="Idle time before an upload goes."
+        )
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(hours=options["hours"])
+        purged = 0
+        for pk in DocumentUpload.objects.filter(updated_at__lt=cutoff).values_list(
+            "pk", flat=True
+        ):
+            with transaction.atomic():
+                upload = (
+                    DocumentUpload.objects.select_for_update(skip_locked=True)
+                    .filter(pk=pk, updated_at__lt=cutoff)
+                    .first()
+                )
+                if upload is not None:
+                    upload.abort()
+                    purged += 1
+        self.stdout.write(self.style.SUCCESS(f"Purged {purged} uploads"))
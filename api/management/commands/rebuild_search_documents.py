@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from api.models import Family, FamilySearchDocument
+
+
+class Command(BaseCommand):
+    help = "Rebuild the family search documents used by the family filter view."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Only rebuild this year.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        families = Family.objects.order_by("pk")
+        if options["year"]:
+            families = families.filter(year__year=options["year"])
+
+        family_ids = list(families.values_list("pk", flat=True))
+        FamilySearchDocument.refresh(family_ids, batch_size=options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt {len(family_ids)} search documents")
+        )
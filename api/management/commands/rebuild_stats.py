@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+from api.models import MonthlyActivity, Year, YearStats
+
+
+class Command(BaseCommand):
+    help = "Recompute the dashboard rollup tables from the source tables."
+
+    def handle(self, *args, **options):
+        YearStats.refresh(Year.objects.values_list("pk", flat=True))
+        MonthlyActivity.refresh()
+        self.stdout.write(self.style.SUCCESS("Rebuilt dashboard statistics"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+from api.models import Family
+
+
+class Command(BaseCommand):
+    help = "Recompute the children, spouse and custody counters of every family."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--year", type=int, help="Only recount this year.")
+
+    def handle(self, *args, **options):
+        families = Family.objects.all()
+        if options["year"]:
+            families = families.filter(year__year=options["year"])
+
+        updated = families.refresh_member_counts()
+        self.stdout.write(self.style.SUCCESS(f"Recounted {updated} families"))
@@ -0,0 +1,36 @@
+import shutil
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from api.labels import family_labels, label_sheet, paginate
+from api.models import Family
+
+
+class Command(BaseCommand):
+    help = "Render the barcode cards of a year's families as a printable PDF."
+
+    def add_arguments(self, parser):
+        parser.add_argument("year", type=int)
+        parser.add_argument("output", help="PDF file to write")
+        parser.add_argument(
+            "--family", type=int, action="append", help="only this family id"
+        )
+        parser.add_argument("--workers", type=int, help="rendering processes")
+
+    def handle(self, *args, **options):
+        families = Family.objects.filter(
+            year__year=options["year"], barcode__isnull=False
+        )
+        if options["family"]:
+            families = families.filter(pk__in=options["family"])
+        labels = family_labels(families.order_by("id"))
+
+        try:
+            path = label_sheet(labels, workers=options["workers"])
+        except ImproperlyConfigured as error:
+            raise CommandError(error)
+        shutil.copyfile(path, options["output"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered {len(labels)} labels on {len(paginate(labels))} pages"
+            )
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.backup import BackupError, read_manifest, restore
+
+
+class Command(BaseCommand):
+    help = "Replace the database content with a backup made by `backup`."
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="backup directory")
+        parser.add_argument(
+            "--noinput",
+            "--no-input",
+            action="store_false",
+            dest="interactive",
+            help="do not ask for confirmation",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            manifest = read_manifest(options["directory"])
+        except BackupError as error:
+            raise CommandError(error)
+        if options["interactive"]:
+            answer = input(
+                f"This replaces ALL the data with the backup of "
+                f"{manifest['created_at']}. Type 'yes' to continue: "
+            )
+            if answer != "yes":
+                raise CommandError("Restore cancelled")
+
+        try:
+            restore(options["directory"])
+        except BackupError as error:
+            raise CommandError(error)
+        rows = sum(table["rows"] for table in manifest["tables"].values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Restored {rows} rows of {len(manifest['tables'])} tables"
+            )
+        )
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from api.models import Family, Year
+from api.rollover import rollover_families
+
+
+class Command(BaseCommand):
+    help = "Copy a year's families with their members into another year."
+
+    def add_arguments(self, parser):
+        parser.add_argument("from_year", type=int)
+        parser.add_argument("to_year", type=int)
+        parser.add_argument(
+            "--family", type=int, action="append", help="only this family id"
+        )
+
+    def handle(self, *args, **options):
+        if options["from_year"] == options["to_year"]:
+            raise CommandError("The years must differ")
+        try:
+            source = Year.objects.get(year=options["from_year"])
+        except Year.DoesNotExist:
+            raise CommandError(f"No year {options['from_year']}")
+
+        families = Family.objects.filter(year=source)
+        if options["family"]:
+            families = families.filter(pk__in=options["family"])
+        target, _ = Year.objects.get_or_create(year=options["to_year"])
+        counts = rollover_families(families, target)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Copied {counts['families']} families, {counts['children']} "
+                f"children, {counts['spouces']} spouses and {counts['custodies']} "
+                f"persons in custody into {target.year}"
+            )
+        )
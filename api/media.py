@@ -0,0 +1,133 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFile:
+    """
+    The `length` bytes of `file` from its current position. `fileno` is kept,
+    so servers with a sendfile file_wrapper (gunicorn) still send the range
+    zero-copy, bounded by Content-Length; the others read through `read`.
+    """
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self):
+        return self.file.fileno()
+
+    def tell(self):
+        return self.file.tell()
+
+    def seek(self, *args):
+        return self.file.seek(*args)
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    (start, end) of a single "bytes=" range, inclusive, None to send the
+    whole file (no or several ranges), or False when it cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.replace(" ", ""))
+    if not match or match.group(1) == match.group(2) == "":
+        return None
+    first, last = match.groups()
+    if first == "":  # the last `last` bytes
+        length = int(last)
+        if not length or not size:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        return False
+    return start, end
+
+
+def range_applies(request, etag, last_modified):
+    """If-Range: the range is only sent when the client's copy is current."""
+    validator = request.headers.get("If-Range")
+    if not validator:
+        return True
+    if validator.startswith(('"', "W/")):
+        return validator == etag
+    return parse_http_date_safe(validator) == last_modified
+
+
+def serve_file(request, name, path):
+    """
+    Response for the media file `name` at `path`: 304/412 for conditional
+    requests, 206 for a single byte range, and the whole file otherwise,
+    streamed through the server's sendfile where there is one. With
+    MEDIA_SENDFILE the transfer is handed to the front server instead.
+    """
+    # Headers are latin-1: names (often Arabic) go percent-encoded, which
+    # nginx and mod_xsendfile decode.
+    if settings.MEDIA_SENDFILE == "x-accel":
+        response = HttpResponse()
+        response["X-Accel-Redirect"] = quote(settings.MEDIA_ACCEL_PREFIX + name)
+        return media_headers(response, name)
+    if settings.MEDIA_SENDFILE == "x-sendfile":
+        response = HttpResponse()
+        response["X-Sendfile"] = quote(path)
+        return media_headers(response, name)
+
+    # Stored files are never rewritten in place, size and mtime identify them.
+    stat = os.stat(path)
+    etag = quote_etag(f"{stat.st_size:x}-{stat.st_mtime_ns:x}")
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = file_response(request, path, stat.st_size, etag, last_modified)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    return media_headers(response, name)
+
+
+def file_response(request, path, size, etag, last_modified):
+    byte_range = None
+    if "Range" in request.headers and range_applies(request, etag, last_modified):
+        byte_range = parse_range(request.headers["Range"], size)
+    if byte_range is False:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    file = open(path, "rb")
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(RangeFile(file, end - start + 1), status=206)
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def media_headers(response, name):
+    content_type, encoding = mimetypes.guess_type(name)
+    if response.status_code in (200, 206):
+        response["Content-Type"] = content_type or "application/octet-stream"
+    # Family documents: never in shared caches.
+    patch_cache_control(response, private=True, max_age=3600)
+    return response
@@ -0,0 +1,100 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:14
+
+import django.contrib.postgres.indexes
+from collections import defaultdict
+from django.contrib.postgres.operations import TrigramExtension
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def build_search_documents(apps, schema_editor):
+    Family = apps.get_model("api", "Family")
+    Child = apps.get_model("api", "Child")
+    Spouce = apps.get_model("api", "Spouce")
+    PersonInCustody = apps.get_model("api", "PersonInCustody")
+    FamilySearchDocument = apps.get_model("api", "FamilySearchDocument")
+
+    def join(*parts):
+        return " ".join(part or "" for part in parts)
+
+    lines = defaultdict(list)
+    names = {}
+    for row in Family.objects.values_list(
+        "pk",
+        "lastName",
+        "firstName",
+        "father",
+        "grandFather",
+        "tribe__name",
+        "phoneNumber1",
+        "phoneNumber2",
+        "barcode",
+        "healthStatus__name",
+        "address",
+        "handler__lastName",
+        "handler__firstName",
+    ).iterator():
+        names[row[0]] = row[1:5]
+        lines[row[0]].append(join(*row[1:5]))
+        lines[row[0]].extend(value for value in row[5:11] if value)
+        if row[11] is not None:
+            lines[row[0]].append(join(row[11], row[12]))
+
+    for family_id, firstName in Child.objects.values_list(
+        "family_id", "firstName"
+    ).iterator():
+        lastName, familyFirstName, father, grandFather = names[family_id]
+        lines[family_id].append(
+            join(lastName, firstName, familyFirstName, father, grandFather)
+        )
+
+    for model in (Spouce, PersonInCustody):
+        for family_id, lastName, firstName in model.objects.values_list(
+            "family_id", "lastName", "firstName"
+        ).iterator():
+            lines[family_id].append(join(lastName, firstName))
+
+    FamilySearchDocument.objects.bulk_create(
+        [
+            FamilySearchDocument(family_id=pk, document="\n".join(lines[pk]).lower())
+            for pk in names
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0005_alter_family_day_of_birth_and_more"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.CreateModel(
+            name="FamilySearchDocument",
+            fields=[
+                (
+                    "family",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="search_document",
+                        serialize=False,
+                        to="api.family",
+                    ),
+                ),
+                ("document", models.TextField(blank=True, default="")),
+            ],
+            options={
+                "indexes": [
+                    django.contrib.postgres.indexes.GinIndex(
+                        fields=["document"],
+                        name="family_search_document_trgm",
+                        opclasses=["gin_trgm_ops"],
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(build_search_documents, migrations.RunPython.noop),
+    ]
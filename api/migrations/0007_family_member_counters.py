@@ -0,0 +1,54 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:17
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_members(apps, schema_editor):
+    Family = apps.get_model("api", "Family")
+
+    def count(model_name):
+        model = apps.get_model("api", model_name)
+        return Coalesce(
+            Subquery(
+                model.objects.filter(family=OuterRef("pk"))
+                .order_by()
+                .values("family")
+                .annotate(total=Count("pk"))
+                .values("total")
+            ),
+            0,
+        )
+
+    Family.objects.update(
+        childrenCount=count("Child"),
+        spoucesCount=count("Spouce"),
+        personInCustodyCount=count("PersonInCustody"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0006_familysearchdocument"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="family",
+            name="childrenCount",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name="family",
+            name="personInCustodyCount",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.AddField(
+            model_name="family",
+            name="spoucesCount",
+            field=models.PositiveIntegerField(db_index=True, default=0),
+        ),
+        migrations.RunPython(count_members, migrations.RunPython.noop),
+    ]
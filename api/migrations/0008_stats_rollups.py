@@ -0,0 +1,122 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:21
+
+import django.db.models.deletion
+from collections import Counter, defaultdict
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    Year = apps.get_model("api", "Year")
+    Family = apps.get_model("api", "Family")
+    Delivery = apps.get_model("api", "Delivery")
+    Donation = apps.get_model("api", "Donation")
+    YearStats = apps.get_model("api", "YearStats")
+    StatusDistribution = apps.get_model("api", "StatusDistribution")
+    MonthlyActivity = apps.get_model("api", "MonthlyActivity")
+
+    for year_id in Year.objects.values_list("pk", flat=True):
+        families = Family.objects.filter(year_id=year_id)
+        YearStats.objects.create(
+            year_id=year_id,
+            **families.aggregate(
+                families=Count("pk"),
+                children=Coalesce(Sum("childrenCount"), 0),
+                spouces=Coalesce(Sum("spoucesCount"), 0),
+                custodies=Coalesce(Sum("personInCustodyCount"), 0),
+            ),
+        )
+        StatusDistribution.objects.bulk_create(
+            StatusDistribution(
+                year_id=year_id, field=field, value=row[field], total=row["total"]
+            )
+            for field in ("healthStatus", "socialStatus", "profession", "tribe")
+            for row in families.filter(**{f"{field}__isnull": False})
+            .values(field)
+            .annotate(total=Count("pk"))
+            .order_by()
+        )
+
+    totals = defaultdict(Counter)
+    for model, field in ((Delivery, "deliveries"), (Donation, "donations")):
+        for row in (
+            model.objects.filter(date__isnull=False)
+            .annotate(month=TruncMonth("date"))
+            .values("month")
+            .annotate(total=Count("pk"))
+            .order_by()
+        ):
+            totals[row["month"]][field] = row["total"]
+    MonthlyActivity.objects.bulk_create(
+        MonthlyActivity(month=month, **counts) for month, counts in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0007_family_member_counters"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="MonthlyActivity",
+            fields=[
+                ("month", models.DateField(primary_key=True, serialize=False)),
+                ("deliveries", models.IntegerField(default=0)),
+                ("donations", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="YearStats",
+            fields=[
+                (
+                    "year",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="stats",
+                        serialize=False,
+                        to="api.year",
+                    ),
+                ),
+                ("families", models.IntegerField(default=0)),
+                ("children", models.IntegerField(default=0)),
+                ("spouces", models.IntegerField(default=0)),
+                ("custodies", models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StatusDistribution",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("field", models.CharField(max_length=20)),
+                ("value", models.PositiveBigIntegerField()),
+                ("total", models.IntegerField(default=0)),
+                (
+                    "year",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="status_distribution",
+                        to="api.year",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="statusdistribution",
+            constraint=models.UniqueConstraint(
+                fields=("year", "field", "value"), name="unique_status_distribution"
+            ),
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
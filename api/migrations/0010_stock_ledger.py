@@ -0,0 +1,176 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:28
+
+import django.db.models.deletion
+from collections import defaultdict
+from django.db import migrations, models
+from django.db.models import Max, Sum
+from django.utils.timezone import now
+
+
+def build_ledger(apps, schema_editor):
+    """
+    Replays the existing donations and deliveries into the ledger. Whatever
+    part of Product.quantity they do not explain (quantities typed in by
+    hand) becomes an opening movement, so every product keeps its quantity.
+    """
+    Product = apps.get_model("api", "Product")
+    Donation = apps.get_model("api", "Donation")
+    Delivery = apps.get_model("api", "Delivery")
+    StockMovement = apps.get_model("api", "StockMovement")
+    StockSnapshot = apps.get_model("api", "StockSnapshot")
+
+    today = now().date()
+    movements = []
+    balance = defaultdict(int)
+    first_day = {}
+    for model, kind, sign in ((Donation, "donation", 1), (Delivery, "delivery", -1)):
+        rows = model.objects.filter(product__isnull=False).values_list(
+            "pk", "product_id", "quantity", "date"
+        )
+        for pk, product_id, quantity, day in rows.iterator():
+            day = day or today
+            movements.append(
+                StockMovement(
+                    product_id=product_id,
+                    kind=kind,
+                    quantity=sign * quantity,
+                    date=day,
+                    **{f"{kind}_id": pk},
+                )
+            )
+            balance[product_id] += sign * quantity
+            first_day[product_id] = min(day, first_day.get(product_id, day))
+
+    quantities = dict(Product.objects.values_list("pk", "quantity"))
+    for pk, quantity in quantities.items():
+        opening = (quantity or 0) - balance[pk]
+        if opening:
+            movements.append(
+                StockMovement(
+                    product_id=pk,
+                    kind="opening",
+                    quantity=opening,
+                    date=first_day.get(pk, today),
+                )
+            )
+    StockMovement.objects.bulk_create(movements, batch_size=1000)
+
+    last_id = StockMovement.objects.aggregate(last=Max("pk"))["last"] or 0
+    StockSnapshot.objects.bulk_create(
+        [
+            StockSnapshot(
+                product_id=pk, quantity=quantity or 0, last_movement_id=last_id
+            )
+            for pk, quantity in quantities.items()
+        ],
+        batch_size=1000,
+    )
+
+
+def restore_quantities(apps, schema_editor):
+    Product = apps.get_model("api", "Product")
+    StockMovement = apps.get_model("api", "StockMovement")
+    totals = StockMovement.objects.values("product").annotate(total=Sum("quantity"))
+    for row in totals:
+        Product.objects.filter(pk=row["product"]).update(quantity=max(row["total"], 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0009_change_tracking"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="StockSnapshot",
+            fields=[
+                (
+                    "product",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="snapshot",
+                        serialize=False,
+                        to="api.product",
+                    ),
+                ),
+                ("quantity", models.BigIntegerField(default=0)),
+                ("last_movement_id", models.BigIntegerField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="StockMovement",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.CharField(
+                        choices=[
+                            ("opening", "Opening"),
+                            ("donation", "Donation"),
+                            ("delivery", "Delivery"),
+                            ("adjustment", "Adjustment"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("quantity", models.IntegerField()),
+                ("date", models.DateField()),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "delivery",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="api.delivery",
+                    ),
+                ),
+                (
+                    "donation",
+                    models.ForeignKey(
+                        blank=True,
+                        db_constraint=False,
+                        null=True,
+                        on_delete=django.db.models.deletion.DO_NOTHING,
+                        related_name="+",
+                        to="api.donation",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        db_index=False,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="movements",
+                        to="api.product",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["product", "id"], name="stock_movement_tail"),
+                    models.Index(
+                        fields=["product", "date"], name="stock_movement_date"
+                    ),
+                ],
+            },
+        ),
+        migrations.RunPython(build_ledger, restore_quantities),
+        migrations.RemoveField(
+            model_name="product",
+            name="quantity",
+        ),
+    ]
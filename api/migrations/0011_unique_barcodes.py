@@ -0,0 +1,46 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:32
+
+import barcode
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def dedupe_barcodes(apps, schema_editor):
+    """
+    Blank barcodes become NULL. When several families share a barcode the
+    oldest keeps it and the others get the id-based code.
+    """
+    Family = apps.get_model("api", "Family")
+    ean = barcode.get_barcode_class("ean13")
+
+    Family.objects.filter(barcode="").update(barcode=None)
+    duplicates = (
+        Family.objects.exclude(barcode=None)
+        .values("barcode")
+        .annotate(total=Count("pk"))
+        .filter(total__gt=1)
+        .values_list("barcode", flat=True)
+    )
+    reissued = []
+    for code in duplicates:
+        families = Family.objects.filter(barcode=code).order_by("pk")
+        for pk, year in families.values_list("pk", "year__year")[1:]:
+            code = ean(f"29{year % 100:02d}{pk:08d}").get_fullcode()
+            reissued.append(Family(pk=pk, barcode=code))
+    Family.objects.bulk_update(reissued, ["barcode"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0010_stock_ledger"),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_barcodes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="family",
+            name="barcode",
+            field=models.CharField(blank=True, max_length=20, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:41
+
+import api.models
+import api.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0012_document_uploads"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="document",
+            name="file",
+            field=models.FileField(
+                storage=api.storage.ContentAddressedStorage(),
+                upload_to=api.models.get_upload_path,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="documentupload",
+            name="file",
+            field=models.FileField(
+                max_length=255,
+                storage=api.storage.ContentAddressedStorage(),
+                upload_to=api.models.get_upload_path,
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0013_content_addressed_documents"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="document",
+            name="thumbnail",
+            # Existing documents start pending (""), see Document.thumbnail.
+            field=models.FileField(
+                blank=True, default="", max_length=255, null=True, upload_to=""
+            ),
+            preserve_default=False,
+        ),
+    ]
@@ -0,0 +1,129 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:58
+
+import django.utils.timezone
+from django.db import migrations, models
+
+LOGGED_TABLES = [
+    "api_family",
+    "api_child",
+    "api_spouce",
+    "api_personincustody",
+    "api_handler",
+    "api_product",
+    "api_delivery",
+    "api_donation",
+]
+
+# Statement-level triggers with transition tables: a bulk write logs its
+# rows with one INSERT ... SELECT. Updates that change nothing (recounts)
+# are not logged. ChangeLog.pause() turns logging off for a transaction.
+LOG_FUNCTIONS = """
+CREATE FUNCTION api_log_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('hilal.changelog_off', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO api_changelog (txid, "table", object_id, action, changed_at)
+        SELECT txid_current(), TG_TABLE_NAME, id, 'created', NOW() FROM new_rows;
+    ELSIF TG_OP = 'UPDATE' THEN
+        INSERT INTO api_changelog (txid, "table", object_id, action, changed_at)
+        SELECT txid_current(), TG_TABLE_NAME, new_rows.id, 'updated', NOW()
+        FROM new_rows JOIN old_rows ON old_rows.id = new_rows.id
+        WHERE new_rows IS DISTINCT FROM old_rows;
+    ELSE
+        INSERT INTO api_changelog (txid, "table", object_id, action, changed_at)
+        SELECT txid_current(), TG_TABLE_NAME, id, 'deleted', NOW() FROM old_rows;
+    END IF;
+    RETURN NULL;
+END
+$$;
+
+-- Product quantities come from the stock ledger: new movements update them.
+CREATE FUNCTION api_log_stock_changes() RETURNS trigger LANGUAGE plpgsql AS $$
+BEGIN
+    IF current_setting('hilal.changelog_off', true) = 'on' THEN
+        RETURN NULL;
+    END IF;
+    INSERT INTO api_changelog (txid, "table", object_id, action, changed_at)
+    SELECT DISTINCT txid_current(), 'api_product', product_id, 'updated', NOW()
+    FROM new_rows;
+    RETURN NULL;
+END
+$$;
+
+CREATE TRIGGER api_stockmovement_log_insert AFTER INSERT ON api_stockmovement
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION api_log_stock_changes();
+"""
+
+LOG_TRIGGERS = """
+CREATE TRIGGER {table}_log_insert AFTER INSERT ON {table}
+REFERENCING NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION api_log_changes();
+CREATE TRIGGER {table}_log_update AFTER UPDATE ON {table}
+REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+FOR EACH STATEMENT EXECUTE FUNCTION api_log_changes();
+CREATE TRIGGER {table}_log_delete AFTER DELETE ON {table}
+REFERENCING OLD TABLE AS old_rows
+FOR EACH STATEMENT EXECUTE FUNCTION api_log_changes();
+"""
+
+CREATE_SQL = LOG_FUNCTIONS + "".join(
+    LOG_TRIGGERS.format(table=table) for table in LOGGED_TABLES
+)
+DROP_SQL = """
+DROP FUNCTION api_log_changes() CASCADE;
+DROP FUNCTION api_log_stock_changes() CASCADE;
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("api", "0014_document_thumbnails"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ChangeLog",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("txid", models.BigIntegerField()),
+                ("table", models.CharField(max_length=64)),
+                ("object_id", models.BigIntegerField(null=True)),
+                (
+                    "action",
+                    models.CharField(
+                        choices=[
+                            ("created", "Created"),
+                            ("updated", "Updated"),
+                            ("deleted", "Deleted"),
+                            ("reset", "Reset"),
+                        ],
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "changed_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["txid", "id"], name="change_log_position")
+                ],
+            },
+        ),
+        migrations.RunSQL(CREATE_SQL, DROP_SQL),
+    ]
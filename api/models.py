@@ -1,16 +1,71 @@
-from django.db import models
-from django.db.models import F
+from django.db import IntegrityError, connection, models, transaction
+from django.db.models import F, Count, Max, OuterRef, Subquery, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce, TruncMonth
 from django.dispatch import receiver
 from django.utils.timezone import now
-from django.db.models.signals import pre_save, post_save, pre_delete
+from django.utils.dateparse import parse_date
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import Signal
+from django.contrib.postgres.indexes import GinIndex
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from django.core.files.base import ContentFile
+from django.http import UnreadablePostError
+from django.core.files.storage import default_storage
 import os
+import threading
+import uuid
 from django.contrib.auth.models import AbstractUser
+from .storage import document_storage, file_digest
+from .thumbnails import in_background, render_thumbnail, thumbnail_name
+from .caching import (
+    LOOKUPS_SCOPE,
+    STATS_SCOPE,
+    bump_versions,
+    family_scope,
+    year_scope,
+)
 
 
 def get_upload_path(instance, filename):
     return os.path.join("documents", str(instance.owner.pk), str(filename))
 
 
+# Sent with `family_ids` after set-based writes (bulk deletes, imports...) that
+# ran inside `bulk_operation()`, so derived per-family data is rebuilt once.
+families_changed = Signal()
+
+_bulk_state = threading.local()
+
+
+@contextmanager
+def bulk_operation():
+    """
+    Silences the per-row bookkeeping receivers (member counters, search
+    documents...) for the current thread. The caller is expected to send
+    `families_changed` for the families it touched.
+    """
+    previous = getattr(_bulk_state, "active", False)
+    _bulk_state.active = True
+    try:
+        yield
+    finally:
+        _bulk_state.active = previous
+
+
+def in_bulk_operation():
+    return getattr(_bulk_state, "active", False)
+
+
+def deleted_by_cascade(sender, origin):
+    """True when a row is removed by a cascade from its family, year..."""
+    if origin is None:
+        return False
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return origin_model is not sender
+
+
 class EncryptionKey(models.Model):
     key = models.CharField(max_length=64, null=False, blank=False)
 
@@ -20,6 +75,7 @@ class EncryptionKey(models.Model):
 
 class Year(models.Model):
     year = models.PositiveBigIntegerField(unique=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self) -> str:
         return str(self.year)
@@ -29,6 +85,7 @@ class Tribe(models.Model):
     name = models.CharField(
         max_length=50, unique=True, default=None, null=True, blank=True
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self) -> str:
         return str(self.name)
@@ -38,6 +95,7 @@ class HealthStatus(models.Model):
     name = models.CharField(
         max_length=50, unique=True, default=None, null=True, blank=True
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self) -> str:
         return str(self.name)
@@ -47,6 +105,7 @@ class Profession(models.Model):
     name = models.CharField(
         max_length=50, unique=True, default=None, null=True, blank=True
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self) -> str:
         return str(self.name)
@@ -56,6 +115,7 @@ class SocialStatus(models.Model):
     name = models.CharField(
         max_length=50, unique=True, default=None, null=True, blank=True
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self) -> str:
         return str(self.name)
@@ -67,6 +127,7 @@ class Handler(models.Model):
     day_of_birth = models.DateField(null=True, blank=True)
     type = models.CharField(max_length=20)
     phoneNumber = models.CharField(max_length=15, null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return str(f"{self.lastName} {self.firstName}")
@@ -81,6 +142,39 @@ class Handler(models.Model):
         return self.__str__()
 
 
+def count_family_members(model):
+    """Correlated COUNT of `model` rows belonging to the outer family."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(family=OuterRef("pk"))
+            .order_by()
+            .values("family")
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+class FamilyQuerySet(models.QuerySet):
+    def with_list_data(self):
+        """
+        Everything FamilyListSerializer reads, in a single query: the member
+        counters are columns and the lookups come through joins.
+        """
+        return self.select_related(
+            "healthStatus", "socialStatus", "profession", "handler"
+        )
+
+    def refresh_member_counts(self):
+        """Recomputes the member counters of these families in one UPDATE."""
+        return self.update(
+            childrenCount=count_family_members(Child),
+            spoucesCount=count_family_members(Spouce),
+            personInCustodyCount=count_family_members(PersonInCustody),
+        )
+
+
 class Family(models.Model):
     year = models.ForeignKey(Year, on_delete=models.CASCADE)
     tribe = models.ForeignKey(
@@ -105,14 +199,42 @@ class Family(models.Model):
     phoneNumber2 = models.CharField(max_length=15, null=True, blank=True)
     address = models.CharField(max_length=50, null=True, blank=True)
     email = models.CharField(max_length=50, null=True, blank=True)
-    barcode = models.CharField(max_length=20, null=True, blank=True)
+    barcode = models.CharField(max_length=20, null=True, blank=True, unique=True)
     handler = models.ForeignKey(
         Handler, on_delete=models.SET_NULL, null=True, blank=True
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # Maintained by the FamilyMember signals below, rebuilt by
+    # `manage.py recount_family_members`.
+    childrenCount = models.PositiveIntegerField(default=0, db_index=True)
+    spoucesCount = models.PositiveIntegerField(default=0, db_index=True)
+    personInCustodyCount = models.PositiveIntegerField(default=0, db_index=True)
+
+    objects = FamilyQuerySet.as_manager()
+
+    COUNTER_FIELDS = ("childrenCount", "spoucesCount", "personInCustodyCount")
 
     def __str__(self) -> str:
         return str(f"{self.lastName} {self.firstName}")
 
+    def save(self, *args, **kwargs):
+        self.barcode = self.barcode or None  # blanks would clash in the index
+        if self._state.adding and not self.barcode:
+            # Take the id ahead of the INSERT so the barcode goes in with it.
+            if self.pk is None:
+                self.pk = Family.allocate_ids(1)[0]
+                kwargs.setdefault("force_insert", True)
+            self.barcode = family_barcode(self.year.year, self.pk)
+        # A full save of an already loaded family must not write back stale
+        # member counters; only the signals (and recounts) change them.
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     @property
     def fullName(self, *args, **kwargs):
         return self.__str__()
@@ -131,41 +253,38 @@ class Family(models.Model):
 
     @property
     def numberOfPersonInCustody(self, *args, **kwargs):
-        return self.personincustody_set.all().count()
+        return self.personInCustodyCount
 
     @property
     def spouces_count(self, *args, **kwargs):
-        return self.spouces.all().count()
+        return self.spoucesCount
 
     @property
     def children_count(self, *args, **kwargs):
-        return self.children.all().count()
-
-    def generate_barcode_number(self):
-        import random
-        import barcode
-
-        if not self.id:
-            return None
-
-        year_part = str(self.year.year)
-        id_part = str(self.id).zfill(5)[:5]
-        random_part = str(random.randint(0, 999)).zfill(3)
-
-        base_number = year_part + id_part + random_part
-
-        ean = barcode.get_barcode_class("ean13")
-        ean_code = ean(base_number)
-
-        return ean_code.get_fullcode()
+        return self.childrenCount
+
+    @classmethod
+    def allocate_ids(cls, count):
+        """Draws `count` ids from the table's id sequence."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(pg_get_serial_sequence(%s, 'id'))"
+                " FROM generate_series(1, %s)",
+                [cls._meta.db_table, count],
+            )
+            return [row[0] for row in cursor.fetchall()]
 
 
-@receiver(post_save, sender=Family)
-def generate_barcode_on_save(sender, instance: Family, created, **kwargs):
+def family_barcode(year, family_id):
+    """
+    EAN-13 of a family: "29" (in-store range, apart from the older
+    year-prefixed random codes), the 2-digit year and the 8-digit id. Unique
+    because the id is.
+    """
+    import barcode
 
-    if created and not instance.barcode:
-        instance.barcode = instance.generate_barcode_number()
-        instance.save()
+    ean = barcode.get_barcode_class("ean13")
+    return ean(f"29{year % 100:02d}{family_id:08d}").get_fullcode()
 
 
 class Document(models.Model):
@@ -174,17 +293,176 @@ class Document(models.Model):
         OTHER = "other"
 
     owner = models.ForeignKey(Family, on_delete=models.CASCADE, related_name="files")
-    file = models.FileField(upload_to=get_upload_path)
+    file = models.FileField(upload_to=get_upload_path, storage=document_storage)
     # name = models.CharField(max_length=50)
     # type = models.CharField(max_length=20, null=True, choices=DocumentsTypes.choices)
     description = models.TextField(null=True, blank=True)
     date = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+    # "" until built by `build_thumbnail`, NULL when the file has no preview.
+    thumbnail = models.FileField(null=True, blank=True, max_length=255)
 
     def __str__(self):
         return self.file.__str__()
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "file" in field_names:
+            instance._loaded_file = values[field_names.index("file")]
+        return instance
+
+    def save(self, *args, **kwargs):
+        if self.file.name != getattr(self, "_loaded_file", self.file.name):
+            self.thumbnail = ""
+        super().save(*args, **kwargs)
+        self._loaded_file = self.file.name
+
+    def build_thumbnail(self):
+        name = thumbnail_name(file_digest(self.file.path))
+        if not default_storage.exists(name):
+            data = render_thumbnail(self.file.path)
+            if data is None:
+                name = None
+            else:
+                name = default_storage.save(name, ContentFile(data))
+        # Only if the file was not replaced meanwhile.
+        Document.objects.filter(pk=self.pk, file=self.file.name).update(thumbnail=name)
+        TableChange.touch(Document)
+        self.thumbnail = name
+
+
+def build_document_thumbnail(document_id):
+    try:
+        document = Document.objects.filter(pk=document_id, thumbnail="").first()
+        if document is not None:
+            document.build_thumbnail()
+    finally:
+        connection.close()  # the pool thread's own connection
+
+
+@receiver(post_save, sender=Document)
+def schedule_document_thumbnail(sender, instance, created, **kwargs):
+    if created or instance.thumbnail.name == "":
+        transaction.on_commit(
+            lambda: in_background(build_document_thumbnail, instance.pk)
+        )
+
+
+def delete_unused_document_file(name):
+    # Unlinking the name lowers its blob's link count, `collect_garbage`
+    # reclaims the blob once no name links to it anymore.
+    if name and not Document.objects.filter(file=name).exists():
+        document_storage.delete(name)
+
+
+@receiver(post_delete, sender=Document)
+def remove_document_file(sender, instance, **kwargs):
+    # Also on cascades and bulk deletes: the file must go with the last row.
+    name = instance.file.name
+    transaction.on_commit(lambda: delete_unused_document_file(name))
+
+
+class DocumentUpload(models.Model):
+    """
+    A document sent in chunks. Chunks are written straight into `file`, the
+    storage file the Document ends up using, and `offset` is how much of it
+    is on disk: where the client resumes after losing the connection.
+    """
+
+    CHUNK_SIZE = 64 * 1024
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(Family, on_delete=models.CASCADE, related_name="uploads")
+    file = models.FileField(
+        upload_to=get_upload_path, storage=document_storage, max_length=255
+    )
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    description = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    @classmethod
+    def start(cls, owner, filename, size, description=None):
+        upload = cls(owner=owner, size=size, description=description)
+        # Reserves the final name with an empty file.
+        upload.file.save(filename, ContentFile(b""), save=False)
+        upload.save()
+        return upload
+
+    @property
+    def complete(self):
+        return self.offset == self.size
+
+    def append(self, stream, length):
+        """
+        Writes `length` bytes read from `stream` at `offset`, in bounded
+        pieces. What arrived before a disconnect is kept. The row must be
+        locked (select_for_update) by the caller. Returns whether the whole
+        chunk arrived. Errors writing the file are raised.
+        """
+        start = self.offset
+        with open(self.file.path, "r+b") as file:
+            file.seek(start)
+            remaining = length
+            while remaining:
+                try:
+                    piece = stream.read(min(self.CHUNK_SIZE, remaining))
+                except UnreadablePostError:  # client gone
+                    break
+                if not piece:
+                    break
+                file.write(piece)
+                remaining -= len(piece)
+            self.offset = file.tell()
+        self.save(update_fields=["offset", "updated_at"])
+        return self.offset - start == length
+
+    def sha256(self):
+        return file_digest(self.file.path)
+
+    def finish(self):
+        """Turns the complete upload into its Document, without copying."""
+        with open(self.file.path, "r+b") as file:
+            file.truncate(self.size)  # bytes of a write that was never counted
+        self.file.storage.deduplicate(self.file.name)
+        with transaction.atomic():
+            document = Document.objects.create(
+                owner=self.owner, file=self.file.name, description=self.description
+            )
+            self.delete()
+        return document
+
+    def abort(self):
+        self.file.delete(save=False)
+        self.delete()
+
+
+class FamilyMember(models.Model):
+    """
+    Base of the tables hanging off a family. Writes run in a transaction so
+    the family counter (`counter_field`) moves together with the row.
+    """
+
+    counter_field = None
+    stats_field = None
+
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
-class Child(models.Model):
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+
+class Child(FamilyMember):
     firstName = models.CharField(max_length=50)
     day_of_birth = models.DateField(default=now)
     gender = models.CharField(max_length=20)
@@ -197,6 +475,9 @@ class Child(models.Model):
         Family, on_delete=models.CASCADE, related_name="children"
     )
 
+    counter_field = "childrenCount"
+    stats_field = "children"
+
     def __str__(self) -> str:
         return str(f"{self.family.lastName} {self.firstName}")
 
@@ -217,7 +498,7 @@ class Child(models.Model):
         return self.__str__()
 
 
-class PersonInCustody(models.Model):
+class PersonInCustody(FamilyMember):
     firstName = models.CharField(max_length=50)
     lastName = models.CharField(max_length=50)
     day_of_birth = models.DateField(default=now)
@@ -229,6 +510,9 @@ class PersonInCustody(models.Model):
     notes = models.TextField(null=True, blank=True)
     family = models.ForeignKey(Family, on_delete=models.CASCADE)
 
+    counter_field = "personInCustodyCount"
+    stats_field = "custodies"
+
     def __str__(self) -> str:
         return str(f"{self.lastName} {self.firstName}")
 
@@ -242,7 +526,7 @@ class PersonInCustody(models.Model):
         return now().year - dob.year
 
 
-class Spouce(models.Model):
+class Spouce(FamilyMember):
     firstName = models.CharField(max_length=50)
     lastName = models.CharField(max_length=50)
     day_of_birth = models.DateField(default=now)
@@ -252,6 +536,9 @@ class Spouce(models.Model):
     notes = models.TextField(null=True, blank=True)
     family = models.ForeignKey(Family, on_delete=models.CASCADE, related_name="spouces")
 
+    counter_field = "spoucesCount"
+    stats_field = "spouces"
+
     def __str__(self) -> str:
         return str(f"{self.lastName} {self.firstName}")
 
@@ -265,134 +552,1002 @@ class Spouce(models.Model):
         return now().year - dob.year
 
 
+class FamilySearchDocument(models.Model):
+    """
+    Denormalized, lower-cased text of everything a family can be searched by
+    (names, members, handler, phones, barcode...), one line per source field.
+    Backed by a pg_trgm GIN index so `document__contains` is an index scan.
+    """
+
+    family = models.OneToOneField(
+        Family,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    document = models.TextField(default="", blank=True)
+
+    class Meta:
+        indexes = [
+            GinIndex(
+                fields=["document"],
+                name="family_search_document_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return str(self.family_id)
+
+    @staticmethod
+    def normalize(text):
+        return str(text).lower()
+
+    @classmethod
+    def refresh(cls, family_ids, batch_size=500):
+        """
+        Rebuild the documents of the given families with a handful of queries
+        per batch, whatever the number of members.
+        """
+        family_ids = list(family_ids)
+        for start in range(0, len(family_ids), batch_size):
+            cls._refresh_batch(family_ids[start : start + batch_size])
+
+    @classmethod
+    def _refresh_batch(cls, family_ids):
+        lines = defaultdict(list)
+        names = {}
+
+        def join(*parts):
+            return " ".join(part or "" for part in parts)
+
+        families = Family.objects.filter(pk__in=family_ids).values_list(
+            "pk",
+            "lastName",
+            "firstName",
+            "father",
+            "grandFather",
+            "tribe__name",
+            "phoneNumber1",
+            "phoneNumber2",
+            "barcode",
+            "healthStatus__name",
+            "address",
+            "handler__lastName",
+            "handler__firstName",
+        )
+        for row in families:
+            pk, lastName, firstName, father, grandFather = row[:5]
+            names[pk] = (lastName, firstName, father, grandFather)
+            lines[pk].append(join(lastName, firstName, father, grandFather))
+            lines[pk].extend(value for value in row[5:11] if value)
+            if row[11] is not None:
+                lines[pk].append(join(row[11], row[12]))
+
+        children = Child.objects.filter(family_id__in=names).values_list(
+            "family_id", "firstName"
+        )
+        for family_id, firstName in children:
+            lastName, familyFirstName, father, grandFather = names[family_id]
+            lines[family_id].append(
+                join(lastName, firstName, familyFirstName, father, grandFather)
+            )
+
+        for model in (Spouce, PersonInCustody):
+            members = model.objects.filter(family_id__in=names).values_list(
+                "family_id", "lastName", "firstName"
+            )
+            for family_id, lastName, firstName in members:
+                lines[family_id].append(join(lastName, firstName))
+
+        cls.objects.bulk_create(
+            [
+                cls(family_id=pk, document=cls.normalize("\n".join(lines[pk])))
+                for pk in names
+            ],
+            update_conflicts=True,
+            unique_fields=["family"],
+            update_fields=["document"],
+        )
+
+
+@receiver(post_save, sender=Family)
+def refresh_family_search_document(sender, instance: Family, **kwargs):
+    FamilySearchDocument.refresh([instance.pk])
+
+
+@receiver(pre_save, sender=Child)
+@receiver(pre_save, sender=Spouce)
+@receiver(pre_save, sender=PersonInCustody)
+def capture_previous_family(sender, instance, **kwargs):
+    """
+    Remember which family a member belonged to, so that moving it to another
+    family also refreshes the old one.
+    """
+    if instance.pk:  # Only for updates
+        instance._previous_family_id = (
+            sender.objects.filter(pk=instance.pk)
+            .values_list("family_id", flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Child)
+@receiver(post_save, sender=Spouce)
+@receiver(post_save, sender=PersonInCustody)
+def refresh_member_search_document(sender, instance, **kwargs):
+    if in_bulk_operation():
+        return
+    family_ids = {instance.family_id}
+    previous_family_id = getattr(instance, "_previous_family_id", None)
+    if previous_family_id:
+        family_ids.add(previous_family_id)
+    FamilySearchDocument.refresh(family_ids)
+
+
+@receiver(post_delete, sender=Child)
+@receiver(post_delete, sender=Spouce)
+@receiver(post_delete, sender=PersonInCustody)
+def refresh_deleted_member_search_document(sender, instance, origin=None, **kwargs):
+    if in_bulk_operation() or deleted_by_cascade(sender, origin):
+        return
+    # Deferred to commit so the document is never recreated for a family
+    # deleted later in the same transaction.
+    family_id = instance.family_id
+    transaction.on_commit(lambda: FamilySearchDocument.refresh([family_id]))
+
+
+@receiver(post_save, sender=Child)
+@receiver(post_save, sender=Spouce)
+@receiver(post_save, sender=PersonInCustody)
+def update_member_counter(sender, instance, created, **kwargs):
+    if in_bulk_operation():
+        return
+    counter = sender.counter_field
+    previous_family_id = getattr(instance, "_previous_family_id", None)
+    if created:
+        Family.objects.filter(pk=instance.family_id).update(**{counter: F(counter) + 1})
+    elif previous_family_id and previous_family_id != instance.family_id:
+        # Member moved to another family
+        Family.objects.filter(pk=previous_family_id).update(**{counter: F(counter) - 1})
+        Family.objects.filter(pk=instance.family_id).update(**{counter: F(counter) + 1})
+
+
+@receiver(post_delete, sender=Child)
+@receiver(post_delete, sender=Spouce)
+@receiver(post_delete, sender=PersonInCustody)
+def decrement_member_counter(sender, instance, origin=None, **kwargs):
+    if in_bulk_operation() or deleted_by_cascade(sender, origin):
+        return
+    counter = sender.counter_field
+    Family.objects.filter(pk=instance.family_id).update(**{counter: F(counter) - 1})
+
+
+@receiver(families_changed)
+def refresh_changed_families(sender, family_ids, **kwargs):
+    Family.objects.filter(pk__in=family_ids).refresh_member_counts()
+    FamilySearchDocument.refresh(family_ids)
+
+
+@receiver(post_save, sender=Handler)
+def refresh_handler_search_documents(sender, instance, created, **kwargs):
+    if not created:
+        FamilySearchDocument.refresh(instance.family_set.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Handler)
+def capture_handler_families(sender, instance, **kwargs):
+    instance._family_ids = list(instance.family_set.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Handler)
+def refresh_deleted_handler_search_documents(sender, instance, **kwargs):
+    FamilySearchDocument.refresh(getattr(instance, "_family_ids", []))
+
+
+@receiver(post_save, sender=Tribe)
+@receiver(post_save, sender=HealthStatus)
+def refresh_lookup_search_documents(sender, instance, created, **kwargs):
+    if not created:
+        FamilySearchDocument.refresh(instance.family_set.values_list("pk", flat=True))
+
+
+class ProductQuerySet(models.QuerySet):
+    def with_quantity(self, as_of=None):
+        """
+        Annotates `quantity`: the product's snapshot plus the ledger movements
+        recorded after it, or the sum of the movements dated up to `as_of`.
+        """
+        if as_of is not None:
+            movements = StockMovement.objects.filter(
+                product=OuterRef("pk"), date__lte=as_of
+            )
+            return self.annotate(quantity=sum_movements(movements))
+        tail = StockMovement.objects.filter(
+            product=OuterRef("pk"),
+            pk__gt=Coalesce(OuterRef("snapshot__last_movement_id"), 0),
+        )
+        return self.annotate(
+            quantity=Coalesce(F("snapshot__quantity"), 0) + sum_movements(tail)
+        )
+
+
+class ProductManager(models.Manager.from_queryset(ProductQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().with_quantity()
+
+
+def sum_movements(movements):
+    return Coalesce(
+        Subquery(
+            movements.order_by()
+            .values("product")
+            .annotate(total=Sum("quantity"))
+            .values("total"),
+            output_field=models.BigIntegerField(),
+        ),
+        0,
+    )
+
+
 class Product(models.Model):
     category = models.CharField(max_length=50)
     type = models.CharField(max_length=50)
-    quantity = models.PositiveIntegerField(null=True, blank=True, default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    # The stock quantity lives in the StockMovement ledger, `objects`
+    # annotates it as `quantity`.
+    objects = ProductManager()
 
     def __str__(self) -> str:
         return str(f"{self.category} - {self.type}")
 
 
-class Donation(models.Model):
+class StockEntry(models.Model):
+    """
+    Base of the rows that move stock (donations, deliveries). Each write
+    appends its effect to the StockMovement ledger. The previous state comes
+    from the values the row was loaded with, so updates cost no extra SELECT.
+    """
+
+    STOCK_FIELDS = ("product_id", "quantity", "date")
+    stock_sign = 1
+    movement_kind = None
+    activity_field = None  # MonthlyActivity column
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        loaded = dict(zip(field_names, values))
+        if all(field in loaded for field in cls.STOCK_FIELDS):
+            instance._loaded_stock = {
+                field: loaded[field] for field in cls.STOCK_FIELDS
+            }
+        return instance
+
+    def stock_state(self):
+        return {field: getattr(self, field) for field in self.STOCK_FIELDS}
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            self._previous_stock = None
+        elif hasattr(self, "_loaded_stock"):
+            self._previous_stock = self._loaded_stock
+        else:  # deferred fields
+            self._previous_stock = (
+                type(self).objects.filter(pk=self.pk).values(*self.STOCK_FIELDS).first()
+            )
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+        self._loaded_stock = self.stock_state()
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            return super().delete(*args, **kwargs)
+
+    @classmethod
+    def delete_in_bulk(cls, queryset):
+        """
+        Deletes `queryset` with one summed ledger reversal per product and
+        day and one rollup update per month, instead of the per-row receivers.
+        """
+        with transaction.atomic():
+            reversals = (
+                queryset.filter(product__isnull=False)
+                .values("product", "date")
+                .annotate(total=Sum("quantity"))
+                .order_by()
+            )
+            StockMovement.record(
+                [
+                    StockMovement(
+                        product_id=row["product"],
+                        kind=cls.movement_kind,
+                        quantity=-cls.stock_sign * row["total"],
+                        date=row["date"] or now().date(),
+                    )
+                    for row in reversals
+                ]
+            )
+            months = (
+                queryset.filter(date__isnull=False)
+                .annotate(month=TruncMonth("date"))
+                .values("month")
+                .annotate(total=Count("pk"))
+                .order_by()
+            )
+            for row in months:
+                bump_counters(
+                    MonthlyActivity,
+                    {"month": row["month"]},
+                    **{cls.activity_field: -row["total"]},
+                )
+            # One DELETE, no per-row signals: ledger rows only keep a plain
+            # reference to deliveries and donations, nothing cascades.
+            deleted = queryset._raw_delete(queryset.db)
+            TableChange.touch(cls)
+            bump_versions(STATS_SCOPE)
+        return deleted
+
+    def movement(self, state, sign=1):
+        """Unsaved ledger row for `state` (sign=-1 reverses it)."""
+        return StockMovement(
+            product_id=state["product_id"],
+            kind=self.movement_kind,
+            quantity=sign * self.stock_sign * state["quantity"],
+            date=state["date"] or now().date(),
+            **{self.movement_kind: self},
+        )
+
+
+class Donation(StockEntry):
     donor = models.CharField(max_length=50, null=True, blank=True)
     product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
     date = models.DateField(null=True, blank=True)
     quantity = models.PositiveIntegerField()
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    stock_sign = 1
+    movement_kind = "donation"
+    activity_field = "donations"
 
     def __str__(self) -> str:
         return str(f"{self.product} : {self.date}")
 
 
-class Delivery(models.Model):
+class Delivery(StockEntry):
     occasion = models.CharField(max_length=50, null=True, blank=True)
     date = models.DateField()
     quantity = models.PositiveIntegerField()
     beneficiary = models.ForeignKey(Family, on_delete=models.CASCADE)
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    stock_sign = -1
+    movement_kind = "delivery"
+    activity_field = "deliveries"
 
     def __str__(self) -> str:
         return str(f"{self.beneficiary} : {self.product} - {self.date}")
 
 
-@receiver(pre_save, sender=Donation)
-def capture_previous_Donation_state(sender, instance, **kwargs):
+class StockMovement(models.Model):
+    """
+    Append-only stock ledger: donations, deliveries and manual corrections
+    add signed rows, nothing is ever updated in place. Edits and deletions
+    are recorded as reversals dated like the row they correct.
+    """
 
-    if instance.pk:  # Only for updates
-        instance._previous_Donation = Donation.objects.select_related("product").get(
-            pk=instance.pk
-        )
+    class Kinds(models.TextChoices):
+        OPENING = "opening"
+        DONATION = "donation"
+        DELIVERY = "delivery"
+        ADJUSTMENT = "adjustment"
 
+    product = models.ForeignKey(
+        Product, on_delete=models.CASCADE, related_name="movements", db_index=False
+    )
+    kind = models.CharField(max_length=20, choices=Kinds.choices)
+    quantity = models.IntegerField()
+    date = models.DateField()
+    # Plain references (no constraint) so the trail outlives the rows.
+    donation = models.ForeignKey(
+        Donation,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    delivery = models.ForeignKey(
+        Delivery,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        null=True,
+        blank=True,
+        related_name="+",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
 
-@receiver(post_save, sender=Donation)
-def update_product_quantity(sender, instance, created, **kwargs):
+    class Meta:
+        indexes = [
+            models.Index(fields=["product", "id"], name="stock_movement_tail"),
+            models.Index(fields=["product", "date"], name="stock_movement_date"),
+        ]
+
+    @classmethod
+    def record(cls, movements):
+        movements = [movement for movement in movements if movement.quantity]
+        if movements:
+            cls.objects.bulk_create(movements)
+            TableChange.touch(cls)
+
+
+class StockSnapshot(models.Model):
     """
-    Adjust product quantities when a Donation is created or updated.
-    Handles product changes during updates.
+    Quantity of a product up to and including `last_movement_id`, moved
+    forward by `manage.py compact_stock` so quantities only sum a short tail.
     """
-    if created:
-        # On creation, deduct the Donation quantity from the product
-        instance.product.quantity = F("quantity") + instance.quantity
-        instance.product.save()
-    else:
-        # On update, check the previous state
-        previous_Donation = getattr(instance, "_previous_Donation", None)
-        if previous_Donation:
-            # Handle product change
-            if previous_Donation.product != instance.product:
-                # Restore quantity to the old product
-                previous_Donation.product.quantity = (
-                    F("quantity") - previous_Donation.quantity
+
+    product = models.OneToOneField(
+        Product, on_delete=models.CASCADE, primary_key=True, related_name="snapshot"
+    )
+    quantity = models.BigIntegerField(default=0)
+    last_movement_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def compact(cls, product_ids=None):
+        """Folds the ledger tail of `product_ids` (default all) into snapshots."""
+        with transaction.atomic():
+            # Waits for in-flight ledger writes, so no lower id can still
+            # commit behind the new `last_movement_id`.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {StockMovement._meta.db_table} IN SHARE MODE"
                 )
-                previous_Donation.product.save()
+            products = Product.objects.all()
+            if product_ids is not None:
+                products = products.filter(pk__in=product_ids)
+            last_id = StockMovement.objects.aggregate(last=Max("pk"))["last"] or 0
+            snapshots = [
+                cls(product_id=pk, quantity=quantity, last_movement_id=last_id)
+                for pk, quantity in products.values_list("pk", "quantity")
+            ]
+            cls.objects.bulk_create(
+                snapshots,
+                batch_size=500,
+                update_conflicts=True,
+                unique_fields=["product"],
+                update_fields=["quantity", "last_movement_id", "updated_at"],
+            )
+        return len(snapshots)
 
-                # Deduct quantity from the new product
-                instance.product.quantity = F("quantity") + instance.quantity
-                instance.product.save()
-            else:
-                # Adjust quantity for the same product
-                adjustment = instance.quantity - previous_Donation.quantity
-                instance.product.quantity = F("quantity") + adjustment
-                instance.product.save()
 
+def deleted_with_product(origin):
+    origin_model = origin.model if isinstance(origin, models.QuerySet) else type(origin)
+    return origin_model is Product
 
-@receiver(pre_delete, sender=Donation)
-def handle_Donation_delete(sender, instance, **kwargs):
-    """
-    Revert the product quantity when a Donation is deleted.
-    """
-    instance.product.quantity = F("quantity") - instance.quantity
-    instance.product.save()
 
+@receiver(post_save, sender=Donation)
+@receiver(post_save, sender=Delivery)
+def record_stock_movement(sender, instance, created, **kwargs):
+    if in_bulk_operation():
+        return
+    previous = getattr(instance, "_previous_stock", None)
+    current = instance.stock_state()
+    if previous == current:
+        return
+    movements = []
+    if previous and previous["product_id"]:
+        movements.append(instance.movement(previous, sign=-1))
+    if current["product_id"]:
+        movements.append(instance.movement(current))
+    same_entry = (
+        len(movements) == 2
+        and previous["product_id"] == current["product_id"]
+        and previous["date"] == current["date"]
+    )
+    if same_entry:
+        # Quantity edit: one net movement
+        movements[1].quantity += movements[0].quantity
+        movements = movements[1:]
+    StockMovement.record(movements)
+
+
+@receiver(post_delete, sender=Donation)
+@receiver(post_delete, sender=Delivery)
+def reverse_stock_movement(sender, instance, origin=None, **kwargs):
+    # Ledger rows go away with their product.
+    if in_bulk_operation() or deleted_with_product(origin):
+        return
+    state = getattr(instance, "_loaded_stock", None) or instance.stock_state()
+    if state["product_id"]:
+        StockMovement.record([instance.movement(state, sign=-1)])
+
+
+def bump_counters(model, keys, **deltas):
+    """Adds `deltas` to the counter columns of the `keys` row, creating it."""
+    changes = {field: F(field) + delta for field, delta in deltas.items() if delta}
+    if not changes:
+        return
+    if model.objects.filter(**keys).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**keys, **deltas)
+    except IntegrityError:  # created concurrently
+        model.objects.filter(**keys).update(**changes)
+
+
+def month_start(day):
+    if isinstance(day, str):
+        day = parse_date(day)
+    return day.replace(day=1) if day else None
+
+
+class YearStats(models.Model):
+    """Per-year family and member totals read by the dashboard."""
+
+    year = models.OneToOneField(
+        Year, on_delete=models.CASCADE, primary_key=True, related_name="stats"
+    )
+    families = models.IntegerField(default=0)
+    children = models.IntegerField(default=0)
+    spouces = models.IntegerField(default=0)
+    custodies = models.IntegerField(default=0)
+
+    def __str__(self) -> str:
+        return str(self.year)
 
-@receiver(pre_save, sender=Delivery)
-def capture_previous_delivery_state(sender, instance, **kwargs):
-    """
-    Capture the previous state of the Delivery object before saving.
-    This is used to handle updates.
-    """
-    if instance.pk:  # Only for updates
-        instance._previous_delivery = Delivery.objects.select_related("product").get(
-            pk=instance.pk
+    @classmethod
+    def refresh(cls, year_ids):
+        """Recomputes the totals and status distributions of these years."""
+        for year_id in set(year_ids):
+            families = Family.objects.filter(year_id=year_id)
+            totals = families.aggregate(
+                families=Count("pk"),
+                children=Coalesce(Sum("childrenCount"), 0),
+                spouces=Coalesce(Sum("spoucesCount"), 0),
+                custodies=Coalesce(Sum("personInCustodyCount"), 0),
+            )
+            cls.objects.update_or_create(year_id=year_id, defaults=totals)
+
+            StatusDistribution.objects.filter(year_id=year_id).delete()
+            StatusDistribution.objects.bulk_create(
+                StatusDistribution(
+                    year_id=year_id, field=field, value=row[field], total=row["total"]
+                )
+                for field in StatusDistribution.FIELDS
+                for row in families.filter(**{f"{field}__isnull": False})
+                .values(field)
+                .annotate(total=Count("pk"))
+                .order_by()
+            )
+
+
+class StatusDistribution(models.Model):
+    """Number of families of a year per health/social/profession/tribe."""
+
+    FIELDS = ("healthStatus", "socialStatus", "profession", "tribe")
+
+    year = models.ForeignKey(
+        Year, on_delete=models.CASCADE, related_name="status_distribution"
+    )
+    field = models.CharField(max_length=20)
+    # pk of the row in the lookup table behind `field`
+    value = models.PositiveBigIntegerField()
+    total = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["year", "field", "value"], name="unique_status_distribution"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return str(f"{self.year} {self.field}={self.value}: {self.total}")
+
+
+class MonthlyActivity(models.Model):
+    """Deliveries and donations per calendar month (first day of the month)."""
+
+    month = models.DateField(primary_key=True)
+    deliveries = models.IntegerField(default=0)
+    donations = models.IntegerField(default=0)
+
+    def __str__(self) -> str:
+        return str(self.month)
+
+    @classmethod
+    def refresh(cls):
+        totals = defaultdict(Counter)
+        for model in (Delivery, Donation):
+            field = model.activity_field
+            rows = (
+                model.objects.filter(date__isnull=False)
+                .annotate(month=TruncMonth("date"))
+                .values("month")
+                .annotate(total=Count("pk"))
+                .order_by()
+            )
+            for row in rows:
+                totals[row["month"]][field] = row["total"]
+
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                cls(month=month, **counts) for month, counts in totals.items()
+            )
+
+
+FAMILY_STATS_FIELDS = (
+    "year_id",
+    "healthStatus_id",
+    "socialStatus_id",
+    "profession_id",
+    "tribe_id",
+    "childrenCount",
+    "spoucesCount",
+    "personInCustodyCount",
+)
+
+
+def collect_family_stats(changes, state, sign):
+    """Adds one family's contribution (`state`) to the rollup `changes`."""
+    year_id = state["year_id"]
+    totals = changes[(YearStats, (("year_id", year_id),))]
+    totals["families"] += sign
+    totals["children"] += sign * state["childrenCount"]
+    totals["spouces"] += sign * state["spoucesCount"]
+    totals["custodies"] += sign * state["personInCustodyCount"]
+    for field in StatusDistribution.FIELDS:
+        value = state[f"{field}_id"]
+        if value is not None:
+            keys = (("year_id", year_id), ("field", field), ("value", value))
+            changes[(StatusDistribution, keys)]["total"] += sign
+
+
+def apply_stats_changes(changes):
+    for (model, keys), deltas in changes.items():
+        bump_counters(model, dict(keys), **deltas)
+
+
+@receiver(pre_save, sender=Family)
+def capture_previous_family_stats(sender, instance, **kwargs):
+    if instance.pk and not instance._state.adding:  # Only for updates
+        instance._previous_stats = (
+            Family.objects.filter(pk=instance.pk).values(*FAMILY_STATS_FIELDS).first()
         )
 
 
-@receiver(post_save, sender=Delivery)
-def update_product_quantity(sender, instance, created, **kwargs):
-    """
-    Adjust product quantities when a delivery is created or updated.
-    Handles product changes during updates.
-    """
+@receiver(post_save, sender=Family)
+def update_family_stats(sender, instance, created, **kwargs):
+    if in_bulk_operation():
+        return
+    changes = defaultdict(Counter)
+    current = {field: getattr(instance, field) for field in FAMILY_STATS_FIELDS}
     if created:
-        # On creation, deduct the delivery quantity from the product
-        instance.product.quantity = F("quantity") - instance.quantity
-        instance.product.save()
+        collect_family_stats(changes, current, 1)
     else:
-        # On update, check the previous state
-        previous_delivery = getattr(instance, "_previous_delivery", None)
-        if previous_delivery:
-            # Handle product change
-            if previous_delivery.product != instance.product:
-                # Restore quantity to the old product
-                previous_delivery.product.quantity = (
-                    F("quantity") + previous_delivery.quantity
-                )
-                previous_delivery.product.save()
+        previous = getattr(instance, "_previous_stats", None)
+        if not previous:
+            return
+        # save() never writes the counters, the stored ones are the truth
+        current.update({field: previous[field] for field in Family.COUNTER_FIELDS})
+        collect_family_stats(changes, previous, -1)
+        collect_family_stats(changes, current, 1)
+    apply_stats_changes(changes)
+
+
+@receiver(pre_delete, sender=Family)
+def capture_deleted_family_stats(sender, instance, origin=None, **kwargs):
+    # The in-memory counters may be stale, read the stored ones.
+    if in_bulk_operation() or deleted_by_cascade(sender, origin):
+        return
+    instance._previous_stats = (
+        Family.objects.filter(pk=instance.pk).values(*FAMILY_STATS_FIELDS).first()
+    )
+
+
+@receiver(post_delete, sender=Family)
+def remove_family_stats(sender, instance, **kwargs):
+    previous = getattr(instance, "_previous_stats", None)
+    if in_bulk_operation() or not previous:
+        return
+    changes = defaultdict(Counter)
+    collect_family_stats(changes, previous, -1)
+    apply_stats_changes(changes)
+
+
+def bump_family_year_stats(family_id, field, delta):
+    YearStats.objects.filter(year__family=family_id).update(**{field: F(field) + delta})
+
+
+@receiver(post_save, sender=Child)
+@receiver(post_save, sender=Spouce)
+@receiver(post_save, sender=PersonInCustody)
+def update_member_stats(sender, instance, created, **kwargs):
+    if in_bulk_operation():
+        return
+    previous_family_id = getattr(instance, "_previous_family_id", None)
+    if created:
+        bump_family_year_stats(instance.family_id, sender.stats_field, 1)
+    elif previous_family_id and previous_family_id != instance.family_id:
+        bump_family_year_stats(previous_family_id, sender.stats_field, -1)
+        bump_family_year_stats(instance.family_id, sender.stats_field, 1)
+
+
+@receiver(post_delete, sender=Child)
+@receiver(post_delete, sender=Spouce)
+@receiver(post_delete, sender=PersonInCustody)
+def remove_member_stats(sender, instance, origin=None, **kwargs):
+    if in_bulk_operation() or deleted_by_cascade(sender, origin):
+        return
+    bump_family_year_stats(instance.family_id, sender.stats_field, -1)
+
+
+@receiver(families_changed)
+def refresh_changed_year_stats(sender, family_ids, **kwargs):
+    years = Family.objects.filter(pk__in=family_ids).values_list("year_id", flat=True)
+    YearStats.refresh(years.distinct())
+
+
+@receiver(post_save, sender=Delivery)
+@receiver(post_save, sender=Donation)
+def update_monthly_activity(sender, instance, created, **kwargs):
+    if in_bulk_operation():
+        return
+    field = sender.activity_field
+    month = month_start(instance.date)
+    if created:
+        if month:
+            bump_counters(MonthlyActivity, {"month": month}, **{field: 1})
+        return
+    previous = getattr(instance, "_previous_stock", None)
+    previous_month = month_start(previous["date"]) if previous else None
+    if previous and previous_month != month:
+        if previous_month:
+            bump_counters(MonthlyActivity, {"month": previous_month}, **{field: -1})
+        if month:
+            bump_counters(MonthlyActivity, {"month": month}, **{field: 1})
+
+
+@receiver(post_delete, sender=Delivery)
+@receiver(post_delete, sender=Donation)
+def remove_monthly_activity(sender, instance, **kwargs):
+    if in_bulk_operation():
+        return
+    field = sender.activity_field
+    month = month_start(instance.date)
+    if month:
+        bump_counters(MonthlyActivity, {"month": month}, **{field: -1})
+
+
+# Response cache versions (see caching.py)
+
+
+def bump_family_versions(family_ids, years=()):
+    years = set(years)
+    years.update(
+        Family.objects.filter(pk__in=family_ids).values_list("year__year", flat=True)
+    )
+    bump_versions(
+        STATS_SCOPE,
+        *[family_scope(pk) for pk in family_ids],
+        *[year_scope(year) for year in years],
+    )
+
+
+@receiver(post_save, sender=Family)
+def bump_family_cache_versions(sender, instance, created, **kwargs):
+    years = {instance.year.year}
+    previous = getattr(instance, "_previous_stats", None)
+    if previous and previous["year_id"] != instance.year_id:
+        years.update(
+            Year.objects.filter(pk=previous["year_id"]).values_list("year", flat=True)
+        )
+    bump_versions(
+        STATS_SCOPE,
+        family_scope(instance.pk),
+        *[year_scope(year) for year in years],
+    )
+
+
+@receiver(post_delete, sender=Family)
+def bump_deleted_family_cache_versions(sender, instance, origin=None, **kwargs):
+    # Year deletions bump every entry through LOOKUPS_SCOPE
+    if in_bulk_operation() or deleted_by_cascade(sender, origin):
+        return
+    bump_versions(
+        STATS_SCOPE, family_scope(instance.pk), year_scope(instance.year.year)
+    )
+
+
+@receiver(post_save, sender=Child)
+@receiver(post_save, sender=Spouce)
+@receiver(post_save, sender=PersonInCustody)
+@receiver(post_delete, sender=Child)
+@receiver(post_delete, sender=Spouce)
+@receiver(post_delete, sender=PersonInCustody)
+def bump_member_cache_versions(sender, instance, origin=None, **kwargs):
+    if in_bulk_operation() or deleted_by_cascade(sender, origin):
+        return
+    family_ids = {instance.family_id}
+    previous_family_id = getattr(instance, "_previous_family_id", None)
+    if previous_family_id:
+        family_ids.add(previous_family_id)
+    bump_family_versions(family_ids)
 
-                # Deduct quantity from the new product
-                instance.product.quantity = F("quantity") - instance.quantity
-                instance.product.save()
-            else:
-                # Adjust quantity for the same product
-                adjustment = instance.quantity - previous_delivery.quantity
-                instance.product.quantity = F("quantity") - adjustment
-                instance.product.save()
 
+@receiver(families_changed)
+def bump_changed_families_cache_versions(sender, family_ids, **kwargs):
+    bump_family_versions(family_ids)
 
-@receiver(pre_delete, sender=Delivery)
-def handle_delivery_delete(sender, instance, **kwargs):
+
+@receiver(post_save, sender=Delivery)
+@receiver(post_save, sender=Donation)
+@receiver(post_delete, sender=Delivery)
+@receiver(post_delete, sender=Donation)
+def bump_activity_cache_versions(sender, instance, **kwargs):
+    if not in_bulk_operation():
+        bump_versions(STATS_SCOPE)
+
+
+@receiver(post_save, sender=Year)
+@receiver(post_save, sender=Tribe)
+@receiver(post_save, sender=HealthStatus)
+@receiver(post_save, sender=SocialStatus)
+@receiver(post_save, sender=Profession)
+@receiver(post_save, sender=Handler)
+@receiver(post_delete, sender=Year)
+@receiver(post_delete, sender=Tribe)
+@receiver(post_delete, sender=HealthStatus)
+@receiver(post_delete, sender=SocialStatus)
+@receiver(post_delete, sender=Profession)
+@receiver(post_delete, sender=Handler)
+def bump_lookup_cache_versions(sender, instance, **kwargs):
+    bump_versions(LOOKUPS_SCOPE)
+
+
+class TableChange(models.Model):
     """
-    Revert the product quantity when a delivery is deleted.
+    Write marker of one tracked table. Deletions and cascades never show up
+    in `updated_at`, so conditional GETs (conditional.py) compare these.
     """
-    instance.product.quantity = F("quantity") + instance.quantity
-    instance.product.save()
+
+    table = models.CharField(max_length=64, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=now)
+
+    @classmethod
+    def touch(cls, *tracked):
+        """
+        Moves the markers of the `tracked` models once the current transaction
+        commits. Updating the marker rows inside it would lock them, and so
+        queue every other writer of those tables, until the commit.
+        """
+        tables = [model._meta.db_table for model in tracked]
+        transaction.on_commit(lambda: cls.bump(tables))
+
+    @classmethod
+    def bump(cls, tables):
+        changed_at = now()
+        for table in tables:
+            changes = {"version": F("version") + 1, "changed_at": changed_at}
+            if cls.objects.filter(table=table).update(**changes):
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(table=table, version=1, changed_at=changed_at)
+            except IntegrityError:
+                cls.objects.filter(table=table).update(**changes)
+
+
+class ChangeLog(models.Model):
+    """
+    Change feed of the rows desktop clients keep a replica of (api/changes.py).
+    Written by statement triggers (migration 0015), so bulk writes, cascades
+    and raw SQL are logged too, deletions as tombstones. Entries are read in
+    (txid, id) order: the writing transaction first, then the row.
+    """
+
+    class Actions(models.TextChoices):
+        CREATED = "created"
+        UPDATED = "updated"
+        DELETED = "deleted"
+        RESET = "reset"  # replicas from before this entry must reload
+
+    txid = models.BigIntegerField()
+    table = models.CharField(max_length=64)
+    object_id = models.BigIntegerField(null=True)
+    action = models.CharField(max_length=10, choices=Actions.choices)
+    changed_at = models.DateTimeField(default=now, db_index=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["txid", "id"], name="change_log_position")]
+
+    @classmethod
+    def pause(cls):
+        """Stops logging until the end of the current transaction."""
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL hilal.changelog_off = 'on'")
+
+    @classmethod
+    def add_reset(cls):
+        return cls.objects.create(
+            txid=RawSQL("txid_current()", []), table="", action=cls.Actions.RESET
+        )
+
+    @classmethod
+    def prune(cls, before):
+        """
+        Drops the finished entries logged before `before`. The last of them
+        becomes a reset marker, for the replicas that had not seen them yet.
+        One statement: feed readers see either all of the entries or the
+        reset, and concurrent prunes cannot interleave.
+        """
+        quote = connection.ops.quote_name
+        log = quote(cls._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH last AS (
+                    SELECT txid, id FROM {log}
+                    WHERE changed_at < %s
+                    AND txid < txid_snapshot_xmin(txid_current_snapshot())
+                    ORDER BY txid DESC, id DESC LIMIT 1
+                ), pruned AS (
+                    DELETE FROM {log} USING last
+                    WHERE ({log}.txid, {log}.id) < (last.txid, last.id)
+                    RETURNING 1
+                )
+                UPDATE {log} SET action = %s, {quote("table")} = '', object_id = NULL
+                FROM last WHERE {log}.id = last.id
+                RETURNING (SELECT COUNT(*) FROM pruned)
+                """,
+                [before, cls.Actions.RESET],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else 0
+
+
+TRACKED_MODELS = (
+    Year,
+    Tribe,
+    HealthStatus,
+    Profession,
+    SocialStatus,
+    Handler,
+    Family,
+    Document,
+    Child,
+    PersonInCustody,
+    Spouce,
+    Product,
+    Donation,
+    Delivery,
+)
+
+MEMBER_MODELS = (Child, PersonInCustody, Spouce)
+
+
+def touch_table(sender, **kwargs):
+    if not in_bulk_operation():
+        TableChange.touch(sender)
+
+
+for model in TRACKED_MODELS:
+    post_save.connect(touch_table, sender=model, dispatch_uid=f"touch_{model.__name__}")
+    post_delete.connect(
+        touch_table, sender=model, dispatch_uid=f"touch_deleted_{model.__name__}"
+    )
+
+
+@receiver(families_changed)
+def touch_changed_family_tables(sender, family_ids, **kwargs):
+    TableChange.touch(Family, *MEMBER_MODELS)
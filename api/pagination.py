@@ -0,0 +1,168 @@
+import base64
+import datetime
+import hashlib
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Q
+from django.db.models.expressions import OrderBy
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+
+
+class CursorEncoder(DjangoJSONEncoder):
+    """
+    DjangoJSONEncoder cuts datetimes to milliseconds, which would put the
+    cursor of an `updated_at` sort before its own row. Keys keep all digits.
+    """
+
+    def default(self, o):
+        if isinstance(o, (datetime.datetime, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over whatever ordering the view already applied
+    (including the `Lower()` keys produced by `case_insensitive_sort`).
+
+    The cursor is an opaque token holding the sort key values of the last row
+    of the page plus its id, so every page is a range scan that costs the same
+    however deep the client scrolls. NULLs sort last ascending and first
+    descending, like PostgreSQL does by default.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    page_size = 100
+    max_page_size = 1000
+    invalid_cursor_message = "Invalid cursor"
+
+    def is_requested(self, request):
+        params = request.query_params
+        return self.cursor_query_param in params or self.page_size_query_param in params
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(page_size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        """Returns the queryset ordering as (expression, descending) pairs."""
+        ordering = []
+        for item in queryset.query.order_by:
+            if isinstance(item, OrderBy):
+                ordering.append((item.expression, item.descending))
+            elif isinstance(item, str) and item != "?":
+                ordering.append((F(item.lstrip("-")), item.startswith("-")))
+
+        unique = any(
+            isinstance(expression, F) and expression.name in ("pk", "id")
+            for expression, descending in ordering
+        )
+        if not unique:
+            ordering.append((F("pk"), False))
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(queryset)
+        keys = [f"cursor_key_{index}" for index in range(len(ordering))]
+        self.signature = hashlib.sha1(
+            repr([(str(expr), desc) for expr, desc in ordering]).encode()
+        ).hexdigest()[:8]
+
+        queryset = queryset.annotate(
+            **{key: expression for key, (expression, _) in zip(keys, ordering)}
+        ).order_by(
+            *[
+                (
+                    F(key).desc(nulls_first=True)
+                    if descending
+                    else F(key).asc(nulls_last=True)
+                )
+                for key, (_, descending) in zip(keys, ordering)
+            ]
+        )
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            values = self.decode_cursor(encoded)
+            if len(values) != len(keys):
+                raise NotFound(self.invalid_cursor_message)
+            queryset = queryset.filter(
+                self.keyset_filter(keys, [desc for _, desc in ordering], values)
+            )
+
+        page_size = self.get_page_size(request)
+        page = list(queryset[: page_size + 1])
+
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor(
+                [getattr(page[-1], key) for key in keys]
+            )
+        return page
+
+    def keyset_filter(self, keys, descending, values):
+        """Rows strictly after `values` in the (keys, descending) ordering."""
+        query = Q(pk__in=[])
+        equal = Q()
+        for key, desc, value in zip(keys, descending, values):
+            if value is None:
+                after = Q(**{f"{key}__isnull": False}) if desc else None
+                same = Q(**{f"{key}__isnull": True})
+            else:
+                after = (
+                    Q(**{f"{key}__lt": value})
+                    if desc
+                    else Q(**{f"{key}__gt": value}) | Q(**{f"{key}__isnull": True})
+                )
+                same = Q(**{key: value})
+            if after is not None:
+                query |= equal & after
+            equal &= same
+        return query
+
+    def encode_cursor(self, values):
+        payload = json.dumps(
+            {"o": self.signature, "k": values},
+            cls=CursorEncoder,
+            separators=(",", ":"),
+        )
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, encoded):
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if payload["o"] != self.signature:
+                raise ValueError
+            return list(payload["k"])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.next_cursor, "results": data})
+
+
+class KeysetPaginatedMixin:
+    """
+    Lets an APIView answer with cursor pages when the client passes `cursor`
+    or `page_size`, and with the whole list otherwise.
+    """
+
+    pagination_class = KeysetPagination
+
+    def list_response(self, request, queryset, serializer_class):
+        paginator = self.pagination_class()
+        if not paginator.is_requested(request):
+            serializer = serializer_class(instance=queryset, many=True)
+            return Response(data=serializer.data, status=status.HTTP_200_OK)
+
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = serializer_class(instance=page, many=True)
+        return paginator.get_paginated_response(serializer.data)
@@ -0,0 +1,86 @@
+"""
+Year rollover: copies families with their children, spouses and persons in
+custody into another year.
+
+Rows are copied by the database with INSERT ... SELECT, a batch of families
+at a time. A mapping of old family id -> new id and barcode, passed as
+arrays, remaps the foreign keys. New ids are drawn from the id sequence
+ahead of the INSERT, so the new EAN-13 barcodes can be computed here.
+Documents and deliveries stay with the original year.
+"""
+
+from django.db import connection, transaction
+from .models import (
+    Child,
+    Family,
+    PersonInCustody,
+    Spouce,
+    families_changed,
+    family_barcode,
+)
+from .streaming import iter_chunks
+
+ROLLOVER_BATCH_SIZE = 2000
+MEMBER_RECORDS = {"children": Child, "spouces": Spouce, "custodies": PersonInCustody}
+
+
+def copy_sql(model, key, overrides):
+    """
+    INSERT ... SELECT copying the rows of `model` whose `key` column is a
+    mapped family id. `overrides` gives the SQL of the columns that are not
+    copied as they are. Timestamps get the copy time.
+    """
+    quote = connection.ops.quote_name
+    columns, values = [], []
+    for field in model._meta.concrete_fields:
+        if field.primary_key and field.name not in overrides:
+            continue  # from the sequence
+        columns.append(quote(field.column))
+        if field.name in overrides:
+            values.append(overrides[field.name])
+        elif getattr(field, "auto_now", False) or getattr(field, "auto_now_add", False):
+            values.append("NOW()")
+        else:
+            values.append(f"src.{quote(field.column)}")
+    return (
+        f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(columns)}) "
+        f"SELECT {', '.join(values)} FROM {quote(model._meta.db_table)} src "
+        "JOIN unnest(%s::bigint[], %s::bigint[], %s::varchar[]) "
+        "AS map(old_id, new_id, barcode) "
+        f"ON src.{quote(key)} = map.old_id ORDER BY src.id"
+    )
+
+
+def rollover_families(families, year):
+    """
+    Copies the `families` queryset with its members into `year`, in one
+    transaction, with new barcodes. Families already in `year` are skipped.
+    Returns the number of rows copied per table.
+    """
+    ids = list(families.exclude(year=year).order_by("pk").values_list("pk", flat=True))
+    family_sql = copy_sql(
+        Family,
+        "id",
+        {"id": "map.new_id", "year": str(int(year.pk)), "barcode": "map.barcode"},
+    )
+    member_sql = {
+        name: copy_sql(model, "family_id", {"family": "map.new_id"})
+        for name, model in MEMBER_RECORDS.items()
+    }
+
+    counts = dict.fromkeys(["families", *MEMBER_RECORDS], 0)
+    new_ids = []
+    with transaction.atomic(), connection.cursor() as cursor:
+        for batch in iter_chunks(ids, ROLLOVER_BATCH_SIZE):
+            batch_ids = Family.allocate_ids(len(batch))
+            barcodes = [family_barcode(year.year, pk) for pk in batch_ids]
+            params = [batch, batch_ids, barcodes]
+            cursor.execute(family_sql, params)
+            counts["families"] += cursor.rowcount
+            for name, sql in member_sql.items():
+                cursor.execute(sql, params)
+                counts[name] += cursor.rowcount
+            new_ids += batch_ids
+        if new_ids:
+            families_changed.send(sender=Family, family_ids=new_ids)
+    return counts
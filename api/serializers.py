@@ -1,4 +1,7 @@
 from .models import *
+import os
+from django.db import transaction
+from django.utils.timezone import now
 from django.contrib.auth.models import User
 from rest_framework import serializers
 
@@ -177,11 +180,35 @@ class DocumentSerializer(serializers.ModelSerializer):
         use_url=True,
         required=False,
     )
+    thumbnail = serializers.FileField(read_only=True, use_url=True)
 
     class Meta:
         model = Document
         # fields = '__all__'
-        fields = ["id", "file", "date", "owner"]
+        fields = ["id", "file", "thumbnail", "date", "owner"]
+
+
+class DocumentUploadSerializer(serializers.ModelSerializer):
+    filename = serializers.CharField(write_only=True, max_length=200)
+
+    class Meta:
+        model = DocumentUpload
+        fields = ["id", "owner", "filename", "size", "offset", "description"]
+        read_only_fields = ["offset"]
+
+    def validate_filename(self, value):
+        name = os.path.basename(value.replace("\\", "/"))
+        if not name:
+            raise serializers.ValidationError("Invalid file name.")
+        return name
+
+    def create(self, validated_data):
+        return DocumentUpload.start(
+            validated_data["owner"],
+            validated_data["filename"],
+            validated_data["size"],
+            validated_data.get("description"),
+        )
 
 
 ####
@@ -326,11 +353,63 @@ class SpouceSerializer(serializers.ModelSerializer):
 
 ####
 class ProductSerializer(serializers.ModelSerializer):
+    # Annotated by Product.objects; writing it records an adjustment in the
+    # stock ledger.
+    quantity = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+
     class Meta:
         model = Product
         # fields = '__all__'
         fields = ["id", "category", "type", "quantity"]
 
+    def create(self, validated_data):
+        quantity = validated_data.pop("quantity", None) or 0
+        instance = super().create(validated_data)
+        self.adjust_stock(instance, 0, quantity)
+        return instance
+
+    def update(self, instance, validated_data):
+        quantity = validated_data.pop("quantity", None)
+        with transaction.atomic():
+            if quantity is not None:
+                # Concurrent adjustments wait here, then the quantity is read
+                # again: the delta counts the movements committed meanwhile.
+                Product._base_manager.select_for_update().get(pk=instance.pk)
+                current = Product.objects.values_list("quantity", flat=True).get(
+                    pk=instance.pk
+                )
+            instance = super().update(instance, validated_data)
+            if quantity is not None:
+                self.adjust_stock(instance, current, quantity)
+        return instance
+
+    def adjust_stock(self, instance, current, quantity):
+        StockMovement.record(
+            [
+                StockMovement(
+                    product=instance,
+                    kind=StockMovement.Kinds.ADJUSTMENT,
+                    quantity=quantity - current,
+                    date=now().date(),
+                )
+            ]
+        )
+        instance.quantity = quantity
+
+
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = [
+            "id",
+            "kind",
+            "quantity",
+            "date",
+            "donation",
+            "delivery",
+            "created_at",
+        ]
+
 
 ####
 class DonationSerializer(serializers.ModelSerializer):
@@ -398,3 +477,58 @@ class DeliverySerializer(serializers.ModelSerializer):
         model = Delivery
         # fields = '__all__'
         fields = ["id", "occasion", "product", "quantity", "date", "beneficiary"]
+
+    def create(self, validated_data):
+        with transaction.atomic():
+            self.check_stock(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with transaction.atomic():
+            self.check_stock(validated_data)
+            return super().update(instance, validated_data)
+
+    def check_stock(self, data):
+        """
+        Refuses to take more than the product has left. Runs in the saving
+        transaction with the product row locked, so concurrent deliveries
+        and distributions of it wait until this one commits.
+        """
+        product = data.get("product", getattr(self.instance, "product", None))
+        quantity = data.get("quantity", getattr(self.instance, "quantity", 0))
+        if product is None:
+            return
+        Product._base_manager.select_for_update().get(pk=product.pk)
+        available = Product.objects.values_list("quantity", flat=True).get(
+            pk=product.pk
+        )
+        if self.instance is not None and self.instance.product_id == product.pk:
+            available += self.instance.quantity
+        if quantity > available:
+            raise serializers.ValidationError(
+                {"quantity": f"Only {available} left in stock"}
+            )
+
+
+class BulkDeliverySerializer(serializers.Serializer):
+    """
+    One product handed out to many families: either explicit `families` ids
+    or a `filter` holding the family filter view params (plus `year`).
+    """
+
+    occasion = serializers.CharField(
+        max_length=50, required=False, allow_null=True, allow_blank=True
+    )
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
+    quantity = serializers.IntegerField(min_value=1)
+    date = serializers.DateField(required=False)
+    families = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False
+    )
+    filter = serializers.DictField(required=False)
+
+    def validate(self, data):
+        if ("families" in data) == ("filter" in data):
+            raise serializers.ValidationError("Provide either `families` or `filter`.")
+        data.setdefault("date", now().date())
+        return data
@@ -0,0 +1,80 @@
+import hashlib
+import os
+import uuid
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+def file_digest(path, chunk_size=64 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        while piece := file.read(chunk_size):
+            digest.update(piece)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage whose files are hard links to blobs named after the
+    SHA-256 of their content (`blobs/ab/abcd...`), so a file uploaded for five
+    families is on disk once. Names and URLs do not change. A blob's link
+    count is its reference count: deleting a Document unlinks its file, and
+    `collect_garbage` drops the blobs no file links to anymore.
+
+    Linked files share their content, so they must never be written in
+    place. Empty files are left alone for that reason: they are placeholders
+    filled by chunked uploads, which deduplicate once finished.
+    """
+
+    blob_dir = "blobs"
+
+    def blob_name(self, digest):
+        return os.path.join(self.blob_dir, digest[:2], digest)
+
+    def _save(self, name, content):
+        name = super()._save(name, content)
+        if self.size(name):
+            self.deduplicate(name)
+        return name
+
+    def deduplicate(self, name):
+        """
+        Makes `name` a link to the blob of its content, which it becomes
+        when the content is new. Returns whether a copy was dropped.
+        """
+        path = self.path(name)
+        blob = self.path(self.blob_name(file_digest(path)))
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        while True:
+            try:
+                os.link(path, blob)
+                return False
+            except FileExistsError:
+                pass
+            temporary = f"{path}.{uuid.uuid4().hex}"
+            try:
+                if os.path.samefile(path, blob):
+                    return False
+                os.link(blob, temporary)
+            except FileNotFoundError:
+                continue  # collected in between, `path` becomes the blob
+            os.replace(temporary, path)
+            return True
+
+    def collect_garbage(self):
+        """Deletes unreferenced blobs. Returns (count, bytes) freed."""
+        count = size = 0
+        root = self.path(self.blob_dir)
+        for directory, _, files in os.walk(root):
+            for name in files:
+                path = os.path.join(directory, name)
+                stat = os.stat(path)
+                if stat.st_nlink == 1:
+                    os.unlink(path)
+                    count += 1
+                    size += stat.st_size
+        return count, size
+
+
+document_storage = ContentAddressedStorage()
@@ -0,0 +1,259 @@
+import csv
+import io
+import json
+import os
+import re
+import zipfile
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_CHUNK_SIZE = 500
+
+
+def iter_json_array(queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    """
+    Yields the serialized queryset as a JSON array, `chunk_size` rows at a
+    time, so only one chunk of model instances is ever held in memory.
+    """
+    separator = ""
+    yield "["
+    for chunk in iter_chunks(queryset.iterator(chunk_size=chunk_size), chunk_size):
+        data = serializer_class(instance=chunk, many=True).data
+        # Same compact, unicode output as DRF's JSONRenderer.
+        body = json.dumps(
+            data, cls=JSONEncoder, ensure_ascii=False, separators=(",", ":")
+        )
+        yield separator + body[1:-1]
+        separator = ","
+    yield "]"
+
+
+def iter_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def streaming_json_response(queryset, serializer_class, chunk_size=STREAM_CHUNK_SIZE):
+    return StreamingHttpResponse(
+        iter_json_array(queryset, serializer_class, chunk_size),
+        content_type="application/json",
+    )
+
+
+ZIP_CHUNK_SIZE = 64 * 1024
+# Already compressed formats, stored as they are instead of deflated again.
+STORED_EXTENSIONS = {
+    ".7z",
+    ".docx",
+    ".gif",
+    ".gz",
+    ".heic",
+    ".jpeg",
+    ".jpg",
+    ".mp3",
+    ".mp4",
+    ".pdf",
+    ".png",
+    ".pptx",
+    ".rar",
+    ".webp",
+    ".xlsx",
+    ".zip",
+}
+
+
+class ZipSink(io.RawIOBase):
+    """
+    Write-only, unseekable target for ZipFile: what it writes is collected
+    until `take`, and zipfile switches to data descriptors since it cannot
+    seek back to fill in the sizes.
+    """
+
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b"".join(self.chunks)
+        self.chunks.clear()
+        return data
+
+
+def iter_zip(entries):
+    """
+    Yields a ZIP archive of `entries` ((name in the archive, file path)
+    pairs) as it is built, one file chunk at a time, so neither memory nor
+    disk ever holds the archive. Missing files are skipped.
+    """
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, "w") as archive:
+        for name, path in entries:
+            try:
+                info = zipfile.ZipInfo.from_file(path, name)
+                source = open(path, "rb")
+            except FileNotFoundError:
+                continue
+            if os.path.splitext(path)[1].lower() in STORED_EXTENSIONS:
+                info.compress_type = zipfile.ZIP_STORED
+            else:
+                info.compress_type = zipfile.ZIP_DEFLATED
+            force_zip64 = info.file_size > zipfile.ZIP64_LIMIT
+            with source, archive.open(info, "w", force_zip64=force_zip64) as target:
+                while chunk := source.read(ZIP_CHUNK_SIZE):
+                    target.write(chunk)
+                    yield sink.take()
+            yield sink.take()
+    yield sink.take()
+
+
+def streaming_zip_response(entries, filename):
+    response = StreamingHttpResponse(iter_zip(entries), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+EXPORT_CHUNK_SIZE = 1000
+EXPORT_CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def iter_csv(header, rows):
+    """
+    Yields a CSV file of `header` and `rows` (value tuples) as UTF-8 with a
+    BOM, so Excel reads the Arabic text right, `EXPORT_CHUNK_SIZE` rows at a
+    time.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("\ufeff")
+    writer.writerow(header)
+    for chunk in iter_chunks(rows, EXPORT_CHUNK_SIZE):
+        writer.writerows(chunk)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+XLSX_PARTS = {
+    "[Content_Types].xml": (
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        "</Types>"
+    ),
+    "_rels/.rels": (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+        "</Relationships>"
+    ),
+    "xl/workbook.xml": (
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets>'
+        "</workbook>"
+    ),
+    "xl/_rels/workbook.xml.rels": (
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>'
+        "</Relationships>"
+    ),
+    # Cell styles: 0 plain, 1 date, 2 date and time, 3 bold (the header).
+    "xl/styles.xml": (
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="4"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="14" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="22" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        "</styleSheet>"
+    ),
+}
+XLSX_SHEET_START = (
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+    '<sheetViews><sheetView workbookViewId="0"><pane ySplit="1" topLeftCell="A2" '
+    'activePane="bottomLeft" state="frozen"/></sheetView></sheetViews><sheetData>'
+)
+XLSX_SHEET_END = "</sheetData></worksheet>"
+EXCEL_EPOCH = datetime(1899, 12, 30)
+# Control characters are not allowed in XML 1.0.
+ILLEGAL_XML_CHARS = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def xlsx_cell(value, style=0):
+    if value is None:
+        return "<c/>"
+    if isinstance(value, bool):
+        return f'<c t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float, Decimal)):
+        return f"<c><v>{value}</v></c>"
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.make_naive(value)
+        serial = (value - EXCEL_EPOCH).total_seconds() / 86400
+        return f'<c s="2"><v>{serial}</v></c>'
+    if isinstance(value, date):
+        serial = (value - EXCEL_EPOCH.date()).days
+        return f'<c s="1"><v>{serial}</v></c>'
+    text = escape(ILLEGAL_XML_CHARS.sub("", str(value)))
+    style = f' s="{style}"' if style else ""
+    return f'<c t="inlineStr"{style}><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+def xlsx_row(values, style=0):
+    return "<row>" + "".join(xlsx_cell(value, style) for value in values) + "</row>"
+
+
+def iter_xlsx(header, rows):
+    """
+    Yields an XLSX workbook of `header` and `rows` (value tuples) as it is
+    written: the sheet is a stream of inline-string rows deflated straight
+    into the archive, so memory stays flat whatever the number of rows.
+    """
+    sink = ZipSink()
+    with zipfile.ZipFile(sink, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content)
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            sheet.write((XLSX_SHEET_START + xlsx_row(header, style=3)).encode())
+            for chunk in iter_chunks(rows, EXPORT_CHUNK_SIZE):
+                sheet.write("".join(xlsx_row(row) for row in chunk).encode())
+                yield sink.take()
+            sheet.write(XLSX_SHEET_END.encode())
+    yield sink.take()
+
+
+def streaming_export_response(header, rows, format, filename):
+    writer = iter_xlsx if format == "xlsx" else iter_csv
+    response = StreamingHttpResponse(
+        writer(header, rows), content_type=EXPORT_CONTENT_TYPES[format]
+    )
+    response["Content-Disposition"] = f'attachment; filename="{filename}.{format}"'
+    return response
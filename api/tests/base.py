@@ -0,0 +1,42 @@
+import shutil
+import tempfile
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from api.caching import RESPONSE_CACHE
+from api.models import Family, Handler, HealthStatus, Year
+
+
+class ApiTestCase(TestCase):
+    """Authenticated API client; the response cache outlives rollbacks."""
+
+    def setUp(self):
+        caches[RESPONSE_CACHE].clear()
+        self.user = User.objects.create(username="tester")
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+        self.year, _ = Year.objects.get_or_create(year=2026)
+        self.handler = Handler.objects.create(
+            lastName="Handler", firstName="One", type="volunteer"
+        )
+        self.health, _ = HealthStatus.objects.get_or_create(name="Healthy")
+
+
+def make_family(year, **fields):
+    fields.setdefault("lastName", "Family")
+    fields.setdefault("firstName", "Head")
+    fields.setdefault("day_of_birth", "1980-01-01")
+    return Family.objects.create(year=year, **fields)
+
+
+class MediaTestCase(ApiTestCase):
+    """ApiTestCase with MEDIA_ROOT in a temporary directory."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
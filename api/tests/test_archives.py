@@ -0,0 +1,61 @@
+import io
+import os
+import zipfile
+from django.core.files.base import ContentFile
+from django.http import StreamingHttpResponse
+from api.models import Document
+from .base import MediaTestCase, make_family
+
+SCAN = os.urandom(200 * 1024)  # more than one chunk, does not compress
+
+
+class DocumentArchiveTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.amrani = make_family(self.year, lastName="Amrani", firstName="Ali")
+        self.bakri = make_family(self.year, lastName="Bakri", firstName="Yusuf")
+        self.scan = self.add(self.amrani, SCAN, "scan.jpg")
+        self.notes = self.add(self.amrani, b"notes " * 1000, "notes.txt")
+        self.add(self.bakri, b"bakri", "card.txt")
+
+    def add(self, family, content, name):
+        return Document.objects.create(owner=family, file=ContentFile(content, name))
+
+    def archive(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response["Content-Type"], "application/zip")
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_family(self):
+        archive = self.archive(f"/api/families/{self.amrani.pk}/files.zip")
+        self.assertIsNone(archive.testzip())
+        self.assertEqual(archive.namelist(), ["scan.jpg", "notes.txt"])
+        self.assertEqual(archive.read("scan.jpg"), SCAN)
+        self.assertEqual(archive.getinfo("scan.jpg").compress_type, zipfile.ZIP_STORED)
+        self.assertEqual(
+            archive.getinfo("notes.txt").compress_type, zipfile.ZIP_DEFLATED
+        )
+
+    def test_year_with_filters(self):
+        names = self.archive("/api/families/files/2026").namelist()
+        self.assertEqual(
+            names,
+            [
+                f"{self.amrani.pk} Amrani Ali/scan.jpg",
+                f"{self.amrani.pk} Amrani Ali/notes.txt",
+                f"{self.bakri.pk} Bakri Yusuf/card.txt",
+            ],
+        )
+        archive = self.archive("/api/families/files/2026", search="bakri")
+        self.assertEqual(archive.namelist(), [f"{self.bakri.pk} Bakri Yusuf/card.txt"])
+
+    def test_missing_files_are_skipped(self):
+        os.unlink(self.notes.file.path)
+        archive = self.archive(f"/api/families/{self.amrani.pk}/files.zip")
+        self.assertEqual(archive.namelist(), ["scan.jpg"])
+
+    def test_unknown_family(self):
+        response = self.client.get("/api/families/0/files.zip")
+        self.assertEqual(response.status_code, 404)
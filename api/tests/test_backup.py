@@ -0,0 +1,74 @@
+import shutil
+import tempfile
+from django.test import TransactionTestCase
+from api.backup import backup, read_manifest, restore
+from api.models import Child, Family, Handler, Year
+
+
+class BackupTests(TransactionTestCase):
+    """Backups and restores run in transactions of their own."""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        self.year, _ = Year.objects.get_or_create(year=2026)
+        self.handler = Handler.objects.create(
+            lastName="Handler", firstName="One", type="volunteer"
+        )
+        self.family = Family.objects.create(
+            year=self.year,
+            lastName="Amrani",
+            firstName="Ali",
+            day_of_birth="1975-03-02",
+            handler=self.handler,
+        )
+        Child.objects.create(family=self.family, firstName="Sara")
+
+    def reused(self, directory):
+        tables = read_manifest(directory)["tables"]
+        return {table for table, entry in tables.items() if entry.get("reused")}
+
+    def test_full_backup_and_restore(self):
+        directory = backup(self.root)
+        self.assertEqual(read_manifest(directory)["tables"]["api_family"]["rows"], 1)
+        Family.objects.all().delete()
+
+        restore(directory)
+        family = Family.objects.get()
+        self.assertEqual(family.handler, self.handler)
+        self.assertEqual(family.childrenCount, 1)
+        self.assertEqual(Child.objects.get().family, family)
+        # Sequences follow the restored rows.
+        Family.objects.create(year=self.year, lastName="Bakri", firstName="Yusuf")
+
+    def test_incremental_reuses_unchanged_tables(self):
+        backup(self.root)
+        directory = backup(self.root, incremental=True)
+        self.assertIn("api_family", self.reused(directory))
+        self.assertIn("api_child", self.reused(directory))
+
+        Child.objects.create(family=self.family, firstName="Omar")
+        directory = backup(self.root, incremental=True)
+        # The child and the counter update of its family.
+        self.assertNotIn("api_child", self.reused(directory))
+        self.assertNotIn("api_family", self.reused(directory))
+        self.assertIn("api_handler", self.reused(directory))
+
+    def test_incremental_after_handler_delete(self):
+        backup(self.root)
+        # SET NULL on the families, through a plain UPDATE.
+        self.handler.delete()
+        directory = backup(self.root, incremental=True)
+        self.assertNotIn("api_family", self.reused(directory))
+        self.assertIn("api_child", self.reused(directory))
+
+        restore(directory)
+        self.assertFalse(Handler.objects.exists())
+        self.assertIsNone(Family.objects.get().handler)
+        self.assertEqual(Child.objects.count(), 1)
+
+    def test_no_reuse_after_restore(self):
+        first = backup(self.root)
+        restore(first)
+        directory = backup(self.root, incremental=True)
+        self.assertEqual(self.reused(directory), set())
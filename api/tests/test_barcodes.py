@@ -0,0 +1,42 @@
+import io
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
+from api.models import Family, family_barcode
+from .base import ApiTestCase, make_family
+
+
+def ean13_valid(code):
+    digits = [int(digit) for digit in code]
+    return (
+        sum(digit * (3 if index % 2 else 1) for index, digit in enumerate(digits)) % 10
+        == 0
+    )
+
+
+class FamilyBarcodeTests(ApiTestCase):
+    def test_assigned_on_insert(self):
+        family = make_family(self.year)
+        self.assertEqual(family.barcode, family_barcode(2026, family.pk))
+        self.assertEqual(Family.objects.get(pk=family.pk).barcode, family.barcode)
+        self.assertTrue(family.barcode.startswith("2926"))
+        self.assertEqual(len(family.barcode), 13)
+        self.assertTrue(ean13_valid(family.barcode))
+
+    def test_given_barcode_is_kept_and_unique(self):
+        family = make_family(self.year, barcode="2026123456")
+        self.assertEqual(family.barcode, "2026123456")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            make_family(self.year, barcode="2026123456")
+        self.assertEqual(make_family(self.year, barcode="").barcode[:4], "2926")
+
+    def test_assign_barcodes(self):
+        families = [make_family(self.year) for _ in range(3)]
+        Family.objects.filter(pk__in=[families[0].pk, families[2].pk]).update(
+            barcode=None
+        )
+        call_command("assign_barcodes", batch_size=1, stdout=io.StringIO())
+        for family in families:
+            self.assertEqual(
+                Family.objects.get(pk=family.pk).barcode,
+                family_barcode(2026, family.pk),
+            )
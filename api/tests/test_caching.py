@@ -0,0 +1,64 @@
+from django.db import transaction
+from api.caching import LOOKUPS_SCOPE, STATS_SCOPE, family_scope, get_versions
+from api.models import Child, Family, HealthStatus, YearStats
+from .base import ApiTestCase, make_family
+
+
+class ResponseCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.family = make_family(self.year, lastName="Amrani")
+
+    def families(self):
+        response = self.client.get("/api/families/", {"year": 2026})
+        self.assertEqual(response.status_code, 200)
+        return [row["lastName"] for row in response.data]
+
+    def test_served_until_a_write_commits(self):
+        self.assertEqual(self.families(), ["Amrani"])
+        # Raw updates bump nothing: the cached response is still served.
+        Family.objects.filter(pk=self.family.pk).update(lastName="Stale")
+        self.assertEqual(self.families(), ["Amrani"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_family(self.year, lastName="Bakri")
+        self.assertEqual(sorted(self.families()), ["Bakri", "Stale"])
+
+    def test_query_params_are_part_of_the_key(self):
+        bakri = make_family(self.year, lastName="Bakri")
+        everyone = self.client.get("/api/families/filter/2026").data
+        found = self.client.get("/api/families/filter/2026", {"search": "bakri"}).data
+        self.assertEqual(len(everyone), 2)
+        self.assertEqual([row["id"] for row in found], [bakri.pk])
+
+    def test_rolled_back_writes_bump_nothing(self):
+        before = get_versions([STATS_SCOPE, family_scope(self.family.pk)])
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                Child.objects.create(family=self.family, firstName="Sara")
+                transaction.set_rollback(True)
+        self.assertEqual(
+            get_versions([STATS_SCOPE, family_scope(self.family.pk)]), before
+        )
+
+    def test_stats(self):
+        self.assertEqual(self.client.get("/api/stats/2026").data["totals"][0], 1)
+        YearStats.objects.filter(year=self.year).update(families=5)
+        self.assertEqual(self.client.get("/api/stats/2026").data["totals"][0], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Child.objects.create(family=self.family, firstName="Sara")
+        self.assertEqual(self.client.get("/api/stats/2026").data["totals"][:2], [5, 1])
+
+    def test_print_family_and_lookups(self):
+        url = f"/api/print-family/{self.family.pk}"
+        self.assertEqual(self.client.get(url).data["children"], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            Child.objects.create(family=self.family, firstName="Sara")
+        children = self.client.get(url).data["children"]
+        self.assertEqual([child["firstName"] for child in children], ["Sara"])
+
+        before = get_versions([LOOKUPS_SCOPE])
+        with self.captureOnCommitCallbacks(execute=True):
+            HealthStatus.objects.create(name="Recovering")
+        self.assertNotEqual(get_versions([LOOKUPS_SCOPE]), before)
@@ -0,0 +1,128 @@
+from datetime import timedelta
+from django.contrib.auth.models import User
+from django.db import connections
+from django.test import TransactionTestCase
+from django.utils.timezone import now
+from rest_framework.test import APIClient
+from api.models import ChangeLog, Child, Family, Year
+
+
+class ChangeFeedTests(TransactionTestCase):
+    """Entries only show once their transaction is over: no TestCase here."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="tester"))
+        self.year, _ = Year.objects.get_or_create(year=2026)
+
+    def feed(self, cursor=None, **params):
+        if cursor:
+            params["cursor"] = cursor
+        response = self.client.get("/api/changes/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def add_family(self, name="Amrani"):
+        return Family.objects.create(year=self.year, lastName=name, firstName="Ali")
+
+    def changes(self, page):
+        return [(change["model"], change["id"], change["action"]) for change in page]
+
+    def other_session(self, sql):
+        """A transaction left open on another connection after `sql`."""
+        other = connections.create_connection("default")
+        other.set_autocommit(False)
+        other.cursor().execute(sql)
+        self.addCleanup(other.close)
+        return other
+
+    def test_sync(self):
+        start = self.feed()
+        self.assertTrue(start["reset"])
+
+        family = self.add_family()
+        child = Child.objects.create(family=family, firstName="Sara")
+        page = self.feed(start["cursor"])
+        self.assertFalse(page["reset"])
+        self.assertEqual(
+            self.changes(page["changes"]),
+            [("child", child.pk, "created"), ("family", family.pk, "created")],
+        )
+        self.assertEqual(page["changes"][1]["data"]["lastName"], "Amrani")
+
+        Family.objects.filter(pk=family.pk).delete()
+        page = self.feed(page["cursor"])
+        self.assertEqual(
+            sorted(self.changes(page["changes"])),
+            [("child", child.pk, "deleted"), ("family", family.pk, "deleted")],
+        )
+        self.assertEqual(self.feed(page["cursor"])["changes"], [])
+
+    def test_pages(self):
+        cursor = self.feed()["cursor"]
+        families = [self.add_family(f"F{index}") for index in range(5)]
+        seen = []
+        while True:
+            page = self.feed(cursor, limit=2)
+            seen += [change["id"] for change in page["changes"]]
+            cursor = page["cursor"]
+            if not page["more"]:
+                break
+        self.assertEqual(seen, [family.pk for family in families])
+
+    def test_open_writer_holds_the_feed_back(self):
+        cursor = self.feed()["cursor"]
+        writer = self.other_session("SELECT txid_current()")
+        family = self.add_family()
+        self.assertEqual(self.feed(cursor)["changes"], [])
+        writer.rollback()
+        self.assertEqual(
+            self.changes(self.feed(cursor)["changes"]),
+            [("family", family.pk, "created")],
+        )
+
+    def test_read_only_transaction_does_not(self):
+        cursor = self.feed()["cursor"]
+        self.other_session(
+            "SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY; "
+            "SELECT COUNT(*) FROM api_family"
+        )
+        family = self.add_family()
+        self.assertEqual(
+            self.changes(self.feed(cursor)["changes"]),
+            [("family", family.pk, "created")],
+        )
+
+    def test_prune(self):
+        cursor = self.feed()["cursor"]
+        for index in range(3):
+            self.add_family(f"Old{index}")
+        ChangeLog.objects.update(changed_at=now() - timedelta(days=100))
+        recent = self.add_family("Recent")
+
+        self.assertEqual(ChangeLog.prune(now() - timedelta(days=90)), 2)
+        self.assertEqual(ChangeLog.prune(now() - timedelta(days=90)), 0)
+        reset = ChangeLog.objects.order_by("txid", "id").first()
+        self.assertEqual(reset.action, ChangeLog.Actions.RESET)
+        self.assertEqual(ChangeLog.objects.count(), 2)
+
+        # Replicas behind the pruned entries reload, the others go on.
+        self.assertTrue(self.feed(cursor)["reset"])
+        page = self.feed(f"{reset.txid}.{reset.id}")
+        self.assertFalse(page["reset"])
+        self.assertEqual(
+            self.changes(page["changes"]), [("family", recent.pk, "created")]
+        )
+
+    def test_prune_keeps_unfinished_entries(self):
+        # Entries after an open writer are not final yet: they stay.
+        writer = self.other_session("SELECT txid_current()")
+        for index in range(3):
+            self.add_family(f"Old{index}")
+        ChangeLog.objects.update(changed_at=now() - timedelta(days=100))
+        self.assertEqual(ChangeLog.prune(now() - timedelta(days=90)), 0)
+        self.assertFalse(
+            ChangeLog.objects.filter(action=ChangeLog.Actions.RESET).exists()
+        )
+        writer.rollback()
+        self.assertEqual(ChangeLog.prune(now() - timedelta(days=90)), 2)
@@ -0,0 +1,65 @@
+from datetime import timedelta
+from django.utils.http import http_date
+from django.utils.timezone import now
+from api.models import TableChange, Tribe
+from .base import ApiTestCase
+
+
+class ConditionalGetTests(ApiTestCase):
+    url = "/api/tribes/"
+
+    def add_tribe(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Tribe.objects.create(name=name)
+
+    def test_etag_not_modified(self):
+        self.add_tribe("First")
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.headers["ETag"], etag)
+
+        self.add_tribe("Second")
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def version(self):
+        marker = TableChange.objects.filter(table="api_tribe").first()
+        return marker.version if marker else 0
+
+    def test_marker_moves_on_commit(self):
+        before = self.version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Tribe.objects.create(name="Pending")
+        self.assertEqual(self.version(), before)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.version(), before + 1)
+
+    def test_no_last_modified_for_recent_changes(self):
+        self.add_tribe("First")
+        response = self.client.get(self.url)
+        self.assertNotIn("Last-Modified", response.headers)
+        # The ETag is kept, and If-Modified-Since is not trusted meanwhile.
+        self.assertIn("ETag", response.headers)
+        response = self.client.get(
+            self.url, HTTP_IF_MODIFIED_SINCE=http_date(now().timestamp())
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_if_modified_since(self):
+        self.add_tribe("First")
+        TableChange.objects.update(changed_at=now() - timedelta(minutes=5))
+        response = self.client.get(self.url)
+        last_modified = response.headers["Last-Modified"]
+
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+
+        self.add_tribe("Second")
+        response = self.client.get(self.url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,65 @@
+import io
+from django.core.management import call_command
+from api.models import Child, Family, PersonInCustody, Spouce
+from .base import ApiTestCase, make_family
+
+
+class MemberCounterTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.family = make_family(self.year, lastName="Amrani")
+        self.other = make_family(self.year, lastName="Bakri")
+
+    def counts(self, family):
+        family.refresh_from_db()
+        return (family.childrenCount, family.spoucesCount, family.personInCustodyCount)
+
+    def test_create_move_delete(self):
+        child = Child.objects.create(family=self.family, firstName="Sara")
+        Child.objects.create(family=self.family, firstName="Omar")
+        Spouce.objects.create(family=self.family, firstName="Mariam", lastName="H")
+        PersonInCustody.objects.create(
+            family=self.other, firstName="Nour", lastName="B"
+        )
+        self.assertEqual(self.counts(self.family), (2, 1, 0))
+        self.assertEqual(self.counts(self.other), (0, 0, 1))
+
+        child.family = self.other
+        child.save()
+        self.assertEqual(self.counts(self.family), (1, 1, 0))
+        self.assertEqual(self.counts(self.other), (1, 0, 1))
+
+        child.delete()
+        self.assertEqual(self.counts(self.other), (0, 0, 1))
+
+    def test_full_save_keeps_counters(self):
+        stale = Family.objects.get(pk=self.family.pk)
+        Child.objects.create(family=self.family, firstName="Sara")
+        stale.lastName = "Renamed"
+        stale.save()
+        self.assertEqual(self.counts(self.family), (1, 0, 0))
+
+    def test_bulk_delete(self):
+        children = [
+            Child.objects.create(family=family, firstName=name)
+            for family, name in [
+                (self.family, "Sara"),
+                (self.family, "Omar"),
+                (self.other, "Lina"),
+            ]
+        ]
+        response = self.client.delete(
+            "/api/child/delete_multiple/",
+            {"ids": [children[0].pk, children[2].pk]},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counts(self.family), (1, 0, 0))
+        self.assertEqual(self.counts(self.other), (0, 0, 0))
+
+    def test_recount(self):
+        Child.objects.create(family=self.family, firstName="Sara")
+        Family.objects.update(childrenCount=7, spoucesCount=3)
+        call_command("recount_family_members", year=2026, stdout=io.StringIO())
+        self.assertEqual(self.counts(self.family), (1, 0, 0))
+        self.assertEqual(self.counts(self.other), (0, 0, 0))
@@ -0,0 +1,60 @@
+from api.models import Delivery, Donation, MonthlyActivity, Product
+from .base import ApiTestCase, make_family
+from .test_stock import quantity
+
+
+class BulkDeliveryTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(category="Flour", type="kg")
+        Donation.objects.create(product=self.product, quantity=10, date="2026-01-10")
+        self.families = [
+            make_family(self.year, lastName=name, healthStatus=health)
+            for name, health in [("A", self.health), ("B", None), ("C", self.health)]
+        ]
+
+    def distribute(self, **data):
+        data = {"product": self.product.pk, "date": "2026-03-01", **data}
+        return self.client.post("/api/delivery/bulk/", data, format="json")
+
+    def test_families(self):
+        ids = [family.pk for family in self.families[:2]]
+        response = self.distribute(quantity=3, occasion="Ramadan", families=ids)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data, {"created": 2, "skipped": 0, "quantity": 4})
+        self.assertEqual(quantity(self.product), 4)
+        self.assertEqual(
+            sorted(Delivery.objects.values_list("beneficiary", flat=True)), ids
+        )
+        self.assertEqual(MonthlyActivity.objects.get(month="2026-03-01").deliveries, 2)
+
+        # A retry serves nobody twice.
+        response = self.distribute(quantity=3, occasion="Ramadan", families=ids)
+        self.assertEqual(response.data, {"created": 0, "skipped": 2, "quantity": 4})
+        self.assertEqual(Delivery.objects.count(), 2)
+
+    def test_filter(self):
+        response = self.distribute(quantity=2, filter={"year": 2026, "h": ["Healthy"]})
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(
+            sorted(Delivery.objects.values_list("beneficiary", flat=True)),
+            [self.families[0].pk, self.families[2].pk],
+        )
+
+    def test_not_enough_stock(self):
+        response = self.distribute(
+            quantity=4, families=[family.pk for family in self.families]
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("quantity", response.data)
+        self.assertFalse(Delivery.objects.exists())
+        self.assertEqual(quantity(self.product), 10)
+
+    def test_invalid(self):
+        response = self.distribute(quantity=1, families=[0])
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("families", response.data)
+
+        response = self.distribute(quantity=1)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Delivery.objects.exists())
@@ -0,0 +1,93 @@
+import codecs
+import csv
+import io
+from django.http import StreamingHttpResponse
+from api.models import Child, Delivery, Donation, Product
+from .base import ApiTestCase, make_family
+
+
+class ExportTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.amrani = make_family(
+            self.year, lastName="عمراني", firstName="علي", handler=self.handler
+        )
+        self.bakri = make_family(self.year, lastName="Bakri", healthStatus=self.health)
+        Child.objects.create(family=self.amrani, firstName="Sara", gender="female")
+        self.product = Product.objects.create(category="Flour", type="kg")
+        Donation.objects.create(
+            product=self.product, quantity=5, date="2026-03-01", donor="Shop"
+        )
+        Delivery.objects.create(
+            product=self.product, quantity=2, date="2026-03-02", beneficiary=self.bakri
+        )
+
+    def export(self, url, format="csv", **params):
+        response = self.client.get(url, {"export": format, **params})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        return response, b"".join(response.streaming_content)
+
+    def rows(self, url, **params):
+        response, content = self.export(url, **params)
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertTrue(content.startswith(codecs.BOM_UTF8))  # for Excel
+        return list(csv.DictReader(io.StringIO(content.decode("utf-8-sig"))))
+
+    def test_families_csv(self):
+        response, _ = self.export("/api/families/filter/2026")
+        self.assertEqual(
+            response["Content-Disposition"],
+            'attachment; filename="families-2026.csv"',
+        )
+        rows = self.rows("/api/families/filter/2026", sort="id")
+        self.assertEqual(
+            [row["id"] for row in rows], [str(self.amrani.pk), str(self.bakri.pk)]
+        )
+        self.assertEqual(rows[0]["lastName"], "عمراني")
+        self.assertEqual(rows[0]["handler"], "Handler One")
+        self.assertEqual(rows[0]["childrenCount"], "1")
+        self.assertEqual(rows[1]["healthStatus"], "Healthy")
+        self.assertEqual(rows[1]["handler"], "")
+        self.assertEqual(rows[1]["barcode"], self.bakri.barcode)
+
+        # The whole filtered result, unpaginated.
+        rows = self.rows("/api/families/filter/2026", h="Healthy", page_size=1)
+        self.assertEqual([row["lastName"] for row in rows], ["Bakri"])
+
+    def test_families_xlsx(self):
+        from openpyxl import load_workbook
+
+        response, content = self.export("/api/families/filter/2026", "xlsx", sort="id")
+        self.assertEqual(
+            response["Content-Type"],
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        )
+        sheet = load_workbook(io.BytesIO(content)).active
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0][:4], ("id", "barcode", "lastName", "firstName"))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][2:4], ("عمراني", "علي"))
+
+    def test_children(self):
+        rows = self.rows("/api/families/filter/2026", get_children="1")
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["firstName"], "Sara")
+        self.assertEqual(rows[0]["barcode"], self.amrani.barcode)
+
+    def test_deliveries_and_donations(self):
+        rows = self.rows("/api/delivery/filter/", since="2026-01-01")
+        self.assertEqual(
+            [(row["product"], row["quantity"], row["beneficiary"]) for row in rows],
+            [("Flour", "2", "Bakri Head")],
+        )
+        rows = self.rows("/api/donations/filter/", since="2026-01-01")
+        self.assertEqual(
+            [(row["donor"], row["quantity"], row["date"]) for row in rows],
+            [("Shop", "5", "2026-03-01")],
+        )
+
+    def test_unknown_format(self):
+        response = self.client.get("/api/families/filter/2026", {"export": "pdf"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("export", response.data)
@@ -0,0 +1,53 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from api.caching import RESPONSE_CACHE
+from api.models import Child, PersonInCustody, Spouce
+from .base import ApiTestCase, make_family
+
+
+class FamilyListTests(ApiTestCase):
+    def add_family(self, children=0):
+        family = make_family(self.year, healthStatus=self.health, handler=self.handler)
+        for index in range(children):
+            Child.objects.create(family=family, firstName=f"Child {index}")
+        return family
+
+    def list_queries(self):
+        caches[RESPONSE_CACHE].clear()  # measure the built response
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                "/api/families/filter/2026", {"page_size": 50, "sort": "id"}
+            )
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"], len(queries)
+
+    def test_counts(self):
+        family = self.add_family(children=2)
+        Spouce.objects.create(family=family, firstName="Mariam")
+        PersonInCustody.objects.create(family=family, firstName="Omar")
+        self.add_family()
+
+        rows, _ = self.list_queries()
+        self.assertEqual(
+            [
+                (
+                    row["children_count"],
+                    row["spouces_count"],
+                    row["numberOfPersonInCustody"],
+                )
+                for row in rows
+            ],
+            [(2, 1, 1), (0, 0, 0)],
+        )
+        self.assertEqual(rows[0]["healthStatus"], "Healthy")
+        self.assertEqual(rows[0]["handler"], self.handler.fullName)
+
+    def test_queries_do_not_grow_with_rows(self):
+        self.add_family(children=1)
+        _, few = self.list_queries()
+        for _ in range(5):
+            self.add_family(children=3)
+        rows, many = self.list_queries()
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(many, few)
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from django.utils.timezone import now
+from api.filters import years_ago
+from api.models import Child, HealthStatus, Profession, SocialStatus
+from .base import ApiTestCase, make_family
+
+
+def born(age):
+    """A birth date `age` whole years ago, a day past the birthday."""
+    return years_ago(now().date(), age) - timedelta(days=1)
+
+
+class FamilyFilterTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        sick, _ = HealthStatus.objects.get_or_create(name="Sick")
+        poor = SocialStatus.objects.create(name="Poor")
+        farmer = Profession.objects.create(name="Farmer")
+        self.young = make_family(
+            self.year,
+            lastName="Young",
+            day_of_birth=born(25),
+            healthStatus=self.health,
+            socialStatus=poor,
+        )
+        self.old = make_family(
+            self.year,
+            lastName="Old",
+            day_of_birth=born(60),
+            healthStatus=sick,
+            profession=farmer,
+        )
+        self.middle = make_family(self.year, lastName="Middle", day_of_birth=born(40))
+        for age in (3, 5):
+            Child.objects.create(
+                family=self.old, firstName=f"C{age}", day_of_birth=born(age)
+            )
+        Child.objects.create(family=self.middle, firstName="C15", day_of_birth=born(15))
+
+    def ids(self, **params):
+        response = self.client.get("/api/families/filter/2026", params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return sorted(row["id"] for row in response.data)
+
+    def test_lookups(self):
+        self.assertEqual(self.ids(s="Poor"), [self.young.pk])
+        self.assertEqual(self.ids(p="Farmer"), [self.old.pk])
+        self.assertEqual(
+            self.ids(h=["Healthy", "Sick"]), sorted([self.young.pk, self.old.pk])
+        )
+        self.assertEqual(self.ids(h="Sick", s="Poor"), [])
+
+    def test_age(self):
+        self.assertEqual(self.ids(min_age=30), sorted([self.old.pk, self.middle.pk]))
+        self.assertEqual(self.ids(max_age=40), sorted([self.young.pk, self.middle.pk]))
+        self.assertEqual(self.ids(min_age=30, max_age=50), [self.middle.pk])
+
+    def test_has_children(self):
+        # Two matching children still list their family once.
+        self.assertEqual(
+            self.ids(has_children="1"), sorted([self.old.pk, self.middle.pk])
+        )
+        self.assertEqual(self.ids(has_children="1", max_children_age=10), [self.old.pk])
+        self.assertEqual(
+            self.ids(has_children="1", min_children_age=10), [self.middle.pk]
+        )
+        # The children ages only apply along with has_children.
+        self.assertEqual(len(self.ids(max_children_age=10)), 3)
+
+    def test_invalid_age(self):
+        response = self.client.get("/api/families/filter/2026", {"min_age": "old"})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("min_age", response.data)
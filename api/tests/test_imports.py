@@ -0,0 +1,97 @@
+import io
+import zipfile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from api.models import Child, Family, Year, YearStats
+from .base import ApiTestCase, make_family
+
+SHEET = """record,lastName,firstName,day_of_birth,healthStatus,handler,gender
+,Amrani,Ali,1975-03-02,healthy,Handler One,
+child,,Sara,02/05/2012,Healthy,,female
+child,,Omar,2015-01-20,,,male
+,Bakri,Yusuf,1980-11-11,,,
+"""
+
+
+class FamilyImportTests(ApiTestCase):
+    def upload(self, content, name="families.csv", year=2026, **data):
+        if isinstance(content, str):
+            content = content.encode()
+        return self.client.post(
+            f"/api/families/import/{year}",
+            {"file": SimpleUploadedFile(name, content), **data},
+            format="multipart",
+        )
+
+    def test_import(self):
+        response = self.upload(SHEET)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual((response.data["families"], response.data["children"]), (2, 2))
+
+        ali = Family.objects.get(lastName="Amrani")
+        self.assertEqual(ali.handler, self.handler)
+        self.assertEqual(ali.healthStatus, self.health)
+        self.assertEqual(ali.childrenCount, 2)
+        self.assertTrue(ali.barcode)
+        self.assertEqual(
+            sorted(
+                Child.objects.filter(family=ali).values_list("firstName", flat=True)
+            ),
+            ["Omar", "Sara"],
+        )
+        self.assertEqual(YearStats.objects.get(year=self.year).families, 2)
+
+    def test_invalid_rows_import_nothing(self):
+        sheet = SHEET + ",Chaoui,Nour,not a date,,,\nchild,,Lina,,Unknown,,\n"
+        response = self.upload(sheet)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error["row"] for error in response.data["errors"]], [6, 7])
+        self.assertIn("day_of_birth", response.data["errors"][0]["errors"])
+        self.assertFalse(Family.objects.exists())
+
+    def test_dry_run(self):
+        response = self.upload(SHEET, dry_run="true")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["families"], 2)
+        self.assertFalse(Family.objects.exists())
+
+    def test_unreadable_xlsx(self):
+        response = self.upload(b"not a zip file", name="families.xlsx")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("file", response.data)
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("hello.txt", "no workbook in here")
+        response = self.upload(buffer.getvalue(), name="families.xlsx")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("file", response.data)
+
+    def test_xlsx(self):
+        from openpyxl import Workbook
+
+        workbook = Workbook()
+        sheet = workbook.active
+        for line in SHEET.splitlines():
+            sheet.append(line.split(","))
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+        response = self.upload(buffer.getvalue(), name="families.xlsx")
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data["families"], 2)
+
+    def test_export_imports_again(self):
+        make_family(self.year, lastName="Amrani", handler=self.handler)
+        make_family(self.year, lastName="Bakri", healthStatus=self.health)
+        response = self.client.get("/api/families/filter/2026", {"export": "csv"})
+        self.assertEqual(response.status_code, 200)
+        export = b"".join(response.streaming_content)
+
+        Year.objects.get_or_create(year=2027)
+        for year in (2027, 2026):
+            response = self.upload(export, year=year)
+            self.assertEqual(response.status_code, 201, response.data)
+            self.assertEqual(response.data["families"], 2)
+        self.assertEqual(Family.objects.count(), 6)
+        self.assertEqual(Family.objects.values("barcode").distinct().count(), 6)
+        copy = Family.objects.filter(year__year=2027, lastName="Amrani").get()
+        self.assertEqual(copy.handler, self.handler)
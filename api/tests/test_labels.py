@@ -0,0 +1,72 @@
+import os
+import shutil
+import tempfile
+from django.test import override_settings
+from api import labels
+from .base import ApiTestCase, make_family
+
+FONT = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+@override_settings(LABEL_WORKERS=1)
+class LabelSheetTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        if not os.path.exists(FONT):
+            self.skipTest("no DejaVu font")
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        settings = override_settings(LABEL_CACHE_DIR=self.cache_dir, LABEL_FONT=FONT)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for index in range(30):
+            make_family(self.year, lastName="بن علي", firstName=f"محمد {index}")
+
+    def test_no_font(self):
+        with override_settings(LABEL_FONT=""):
+            response = self.client.get("/api/families/labels/2026")
+        self.assertEqual(response.status_code, 503)
+
+    def test_png_page(self):
+        response = self.client.get(
+            "/api/families/labels/2026", {"output": "png", "page": 2}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "image/png")
+        self.assertEqual(response["X-Page-Count"], "2")
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"\x89PNG"))
+
+        response = self.client.get(
+            "/api/families/labels/2026", {"output": "png", "page": 3}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_titles_are_shaped(self):
+        if labels.has_raqm():
+            self.skipTest("libraqm shapes the text while drawing")
+        font, shape = labels.title_font(FONT)
+        title = shape("محمد")
+        # Joined presentation forms, in display (left to right) order.
+        self.assertTrue(all("ﹰ" <= letter <= "﻿" for letter in title))
+        self.assertEqual(title[-1], "ﻣ")  # initial meem, drawn rightmost
+
+    def test_pool_is_kept(self):
+        pages = labels.paginate([("1234567890128", "عائلة")] * 50)
+        inline = list(labels.map_pages(pages, "png", workers=1))
+        pooled = list(labels.map_pages(pages, "png", workers=2))
+        self.assertEqual(pooled, inline)
+        pool = labels.get_pool(2)
+        list(labels.map_pages(pages, "png", workers=2))
+        self.assertIs(labels.get_pool(2), pool)
+
+    def test_purge_cache(self):
+        path = labels.label_sheet([("1234567890128", "عائلة")], "png", 1)
+        self.assertEqual(labels.purge_cache(3600), 0)
+        os.utime(path, (0, 0))
+        self.assertEqual(labels.purge_cache(3600), 1)
+        self.assertFalse(os.path.exists(path))
+        # Used again: rendered again.
+        self.assertEqual(
+            labels.label_sheet([("1234567890128", "عائلة")], "png", 1), path
+        )
+        self.assertTrue(os.path.exists(path))
@@ -0,0 +1,73 @@
+from urllib.parse import quote
+from django.core.files.base import ContentFile
+from django.test import override_settings
+from api.models import Document
+from .base import MediaTestCase, make_family
+
+CONTENT = bytes(range(256)) * 40
+
+
+class MediaFileTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        family = make_family(self.year)
+        self.document = Document.objects.create(
+            owner=family, file=ContentFile(CONTENT, name="وثيقة.pdf")
+        )
+        self.url = "/" + quote(f"media/{self.document.file.name}")
+
+    def read(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_whole_file(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(self.read(response), CONTENT)
+
+    def test_range(self):
+        response = self.client.get(self.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(CONTENT)}")
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(self.read(response), CONTENT[100:200])
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(self.read(response), CONTENT[-10:])
+
+        response = self.client.get(self.url, HTTP_RANGE=f"bytes={len(CONTENT)}-")
+        self.assertEqual(response.status_code, 416)
+
+    def test_if_range_with_stale_etag(self):
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.read(response), CONTENT)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_unknown_file(self):
+        response = self.client.get("/media/documents/1/missing.pdf")
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(MEDIA_SENDFILE="x-accel", MEDIA_ACCEL_PREFIX="/protected/")
+    def test_x_accel_redirect_quotes_the_name(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response["X-Accel-Redirect"],
+            "/protected/" + quote(self.document.file.name),
+        )
+        self.assertTrue(response["X-Accel-Redirect"].isascii())
+
+    @override_settings(MEDIA_SENDFILE="x-sendfile")
+    def test_x_sendfile_quotes_the_path(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Sendfile"], quote(self.document.file.path))
@@ -0,0 +1,44 @@
+from datetime import timedelta
+from django.utils.timezone import now
+from api.models import Family
+from .base import ApiTestCase, make_family
+
+
+class KeysetPaginationTests(ApiTestCase):
+    def walk(self, url, params):
+        ids, cursor = [], None
+        for _ in range(50):  # a cursor that does not advance would loop
+            query = dict(params, **({"cursor": cursor} if cursor else {}))
+            response = self.client.get(url, query)
+            self.assertEqual(response.status_code, 200)
+            ids += [row["id"] for row in response.data["results"]]
+            cursor = response.data["next"]
+            if cursor is None:
+                return ids
+        self.fail(f"Pagination does not end, got {ids[:10]}...")
+
+    def test_pages_cover_every_row_once(self):
+        families = [make_family(self.year, lastName=f"F{i % 3}") for i in range(7)]
+        ids = self.walk(
+            "/api/families/filter/2026", {"page_size": 2, "sort": "lastName"}
+        )
+        self.assertEqual(sorted(ids), sorted(f.id for f in families))
+
+    def test_microsecond_datetime_keys(self):
+        # Same millisecond: a cursor cut to milliseconds repeats or skips rows.
+        families = [make_family(self.year) for _ in range(5)]
+        base = now().replace(microsecond=123000)
+        for offset, family in enumerate(families):
+            Family.objects.filter(pk=family.pk).update(
+                updated_at=base + timedelta(microseconds=offset * 100)
+            )
+        ids = self.walk(
+            "/api/families/filter/2026", {"page_size": 1, "sort": "updated_at"}
+        )
+        self.assertEqual(ids, [family.id for family in families])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            "/api/families/filter/2026", {"cursor": "nope", "page_size": 2}
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,91 @@
+import io
+from django.core.management import CommandError, call_command
+from api.models import (
+    Child,
+    Family,
+    FamilySearchDocument,
+    PersonInCustody,
+    Spouce,
+    YearStats,
+    family_barcode,
+)
+from .base import ApiTestCase, make_family
+
+
+class RolloverTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.amrani = make_family(
+            self.year, lastName="Amrani", healthStatus=self.health
+        )
+        self.bakri = make_family(self.year, lastName="Bakri")
+        Child.objects.create(family=self.amrani, firstName="Sara")
+        Child.objects.create(family=self.amrani, firstName="Omar")
+        Spouce.objects.create(family=self.amrani, firstName="Mariam", lastName="H")
+        PersonInCustody.objects.create(
+            family=self.bakri, firstName="Nour", lastName="B"
+        )
+
+    def rollover(self, year=2027, query="", **data):
+        data.setdefault("from_year", 2026)
+        return self.client.post(
+            f"/api/families/rollover/{year}{query}", data, format="json"
+        )
+
+    def test_copy_year(self):
+        response = self.rollover()
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(
+            response.data,
+            {"year": 2027, "families": 2, "children": 2, "spouces": 1, "custodies": 1},
+        )
+
+        copy = Family.objects.get(year__year=2027, lastName="Amrani")
+        self.assertEqual(copy.barcode, family_barcode(2027, copy.pk))
+        self.assertEqual(copy.healthStatus, self.health)
+        self.assertEqual((copy.childrenCount, copy.spoucesCount), (2, 1))
+        self.assertEqual(
+            sorted(copy.children.values_list("firstName", flat=True)), ["Omar", "Sara"]
+        )
+        self.assertIn("sara", FamilySearchDocument.objects.get(family=copy).document)
+        stats = YearStats.objects.get(year__year=2027)
+        self.assertEqual((stats.families, stats.children, stats.custodies), (2, 2, 1))
+        # The source year is untouched.
+        self.assertEqual(Child.objects.filter(family=self.amrani).count(), 2)
+
+        # Families already in the target year are not copied again.
+        response = self.rollover(2027, from_year=2027)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.rollover().data["families"], 2)
+        self.assertEqual(Family.objects.filter(year__year=2027).count(), 4)
+
+    def test_ids_and_filters(self):
+        response = self.rollover(ids=[self.bakri.pk])
+        self.assertEqual(response.data["families"], 1)
+        self.assertEqual(response.data["custodies"], 1)
+
+        response = self.rollover(2028, query="?h=Healthy")
+        self.assertEqual(response.data["families"], 1)
+        self.assertEqual(
+            list(
+                Family.objects.filter(year__year=2028).values_list(
+                    "lastName", flat=True
+                )
+            ),
+            ["Amrani"],
+        )
+
+    def test_invalid(self):
+        self.assertEqual(self.rollover(from_year="last").status_code, 400)
+        self.assertEqual(self.rollover(from_year=1999).status_code, 404)
+        self.assertEqual(self.rollover(ids=self.bakri.pk).status_code, 400)
+        self.assertFalse(Family.objects.filter(year__year=2027).exists())
+
+    def test_command(self):
+        output = io.StringIO()
+        call_command(
+            "rollover_year", 2026, 2027, family=[self.amrani.pk], stdout=output
+        )
+        self.assertIn("Copied 1 families, 2 children", output.getvalue())
+        with self.assertRaises(CommandError):
+            call_command("rollover_year", 1999, 2027)
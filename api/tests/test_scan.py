@@ -0,0 +1,44 @@
+from api.models import Child, Delivery, Product
+from api.views import scan_cache
+from .base import ApiTestCase, make_family
+
+
+class FamilyScanTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        scan_cache.entries.clear()
+        self.family = make_family(self.year, lastName="Amrani")
+        self.url = f"/api/families/scan/{self.family.barcode}"
+
+    def test_scan(self):
+        product = Product.objects.create(category="Flour", type="kg")
+        Delivery.objects.create(
+            product=product,
+            quantity=1,
+            date="2026-03-01",
+            occasion="Ramadan",
+            beneficiary=self.family,
+        )
+        response = self.client.get(self.url, {"occasion": "Ramadan"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["family"]["id"], self.family.pk)
+        self.assertEqual(response.data["family"]["year"], 2026)
+        self.assertEqual(len(response.data["deliveries"]), 1)
+        # Without an occasion: what was handed out today.
+        self.assertEqual(self.client.get(self.url).data["deliveries"], [])
+
+    def test_cached_summary(self):
+        self.client.get(self.url)
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+        self.assertEqual(response.data["family"]["children_count"], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Child.objects.create(family=self.family, firstName="Sara")
+        response = self.client.get(self.url)
+        self.assertEqual(response.data["family"]["children_count"], 1)
+
+    def test_unknown_barcode(self):
+        response = self.client.get("/api/families/scan/0000000000000")
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,53 @@
+from api.models import Child, FamilySearchDocument, Spouce
+from .base import ApiTestCase, make_family
+
+
+class FamilySearchTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.family = make_family(
+            self.year,
+            lastName="Amrani",
+            firstName="Ali",
+            phoneNumber1="0550123456",
+            handler=self.handler,
+        )
+        self.other = make_family(self.year, lastName="Bakri", firstName="Yusuf")
+
+    def search(self, text):
+        response = self.client.get("/api/families/filter/2026", {"search": text})
+        self.assertEqual(response.status_code, 200)
+        return [row["id"] for row in response.data]
+
+    def test_family_fields(self):
+        self.assertEqual(self.search("AMRANI ali"), [self.family.pk])
+        self.assertEqual(self.search("0550123"), [self.family.pk])
+        self.assertEqual(self.search(self.family.barcode), [self.family.pk])
+        self.assertEqual(self.search("handler one"), [self.family.pk])
+        self.assertEqual(self.search("nobody"), [])
+
+    def test_members(self):
+        child = Child.objects.create(family=self.family, firstName="Sara")
+        Spouce.objects.create(family=self.other, firstName="Mariam", lastName="Haddad")
+        self.assertEqual(self.search("amrani sara"), [self.family.pk])
+        self.assertEqual(self.search("haddad"), [self.other.pk])
+
+        child.family = self.other
+        with self.captureOnCommitCallbacks(execute=True):
+            child.save()
+        self.assertEqual(self.search("bakri sara"), [self.other.pk])
+        self.assertEqual(self.search("amrani sara"), [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            child.delete()
+        document = FamilySearchDocument.objects.get(family=self.other)
+        self.assertNotIn("sara", document.document)
+
+    def test_handler_rename(self):
+        self.handler.lastName = "Guide"
+        self.handler.save()
+        self.assertEqual(self.search("guide one"), [self.family.pk])
+
+        self.handler.delete()
+        document = FamilySearchDocument.objects.get(family=self.family)
+        self.assertNotIn("guide", document.document)
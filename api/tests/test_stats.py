@@ -0,0 +1,92 @@
+import io
+from django.core.management import call_command
+from api.models import (
+    Child,
+    Delivery,
+    Donation,
+    Family,
+    HealthStatus,
+    MonthlyActivity,
+    Product,
+    StatusDistribution,
+    YearStats,
+)
+from .base import ApiTestCase, make_family
+
+
+class StatsRollupTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.sick, _ = HealthStatus.objects.get_or_create(name="Sick")
+        self.family = make_family(self.year, healthStatus=self.health)
+        self.other = make_family(self.year, healthStatus=self.health)
+        Child.objects.create(family=self.family, firstName="Sara")
+        Child.objects.create(family=self.other, firstName="Omar")
+
+    def totals(self):
+        stats = YearStats.objects.get(year=self.year)
+        return (stats.families, stats.children, stats.spouces, stats.custodies)
+
+    def health_totals(self):
+        rows = StatusDistribution.objects.filter(
+            year=self.year, field="healthStatus", total__gt=0
+        )
+        return dict(rows.values_list("value", "total"))
+
+    def test_family_writes(self):
+        self.assertEqual(self.totals(), (2, 2, 0, 0))
+        self.assertEqual(self.health_totals(), {self.health.pk: 2})
+
+        self.family.healthStatus = self.sick
+        self.family.save()
+        self.assertEqual(self.health_totals(), {self.health.pk: 1, self.sick.pk: 1})
+
+        self.family.delete()
+        self.assertEqual(self.totals(), (1, 1, 0, 0))
+        self.assertEqual(self.health_totals(), {self.health.pk: 1})
+
+    def test_bulk_delete(self):
+        response = self.client.delete(
+            "/api/family/delete_multiple/", {"ids": [self.family.pk]}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.totals(), (1, 1, 0, 0))
+        self.assertEqual(self.health_totals(), {self.health.pk: 1})
+
+    def test_monthly_activity(self):
+        product = Product.objects.create(category="Flour", type="kg")
+        Donation.objects.create(product=product, quantity=5, date="2026-03-04")
+        delivery = Delivery.objects.create(
+            product=product, quantity=1, date="2026-03-20", beneficiary=self.family
+        )
+        march = MonthlyActivity.objects.get(month="2026-03-01")
+        self.assertEqual((march.donations, march.deliveries), (1, 1))
+
+        delivery.date = "2026-04-02"
+        delivery.save()
+        march.refresh_from_db()
+        self.assertEqual(march.deliveries, 0)
+        april = MonthlyActivity.objects.get(month="2026-04-01")
+        self.assertEqual(april.deliveries, 1)
+
+    def test_rebuild(self):
+        YearStats.objects.update(families=40, children=0)
+        MonthlyActivity.objects.create(month="2020-01-01", donations=9)
+        call_command("rebuild_stats", stdout=io.StringIO())
+        self.assertEqual(self.totals(), (2, 2, 0, 0))
+        self.assertFalse(MonthlyActivity.objects.filter(month="2020-01-01").exists())
+
+    def test_view(self):
+        response = self.client.get("/api/stats/2026")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["totals"][:4], [2, 2, 0, 0])
+        health = response.data["status"]["health"]
+        self.assertEqual(dict(zip(health["status"], health["totals"])), {"Healthy": 2})
+        families = response.data["families"]
+        self.assertEqual(dict(zip(families["years"], families["totals"]))["2026"], 2)
+        self.assertEqual(len(response.data["don_delv"]["months"]), 12)
+
+    def test_view_without_families(self):
+        Family.objects.all().delete()
+        response = self.client.get("/api/stats/2026")
+        self.assertEqual(response.data["totals"][:4], [0, 0, 0, 0])
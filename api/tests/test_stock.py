@@ -0,0 +1,201 @@
+import threading
+from django.contrib.auth.models import User
+from django.db import connection, connections
+from django.db.models.signals import post_delete
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+from api.models import (
+    Delivery,
+    Donation,
+    MonthlyActivity,
+    Product,
+    StockMovement,
+    Year,
+)
+from api.serializers import ProductSerializer
+from .base import ApiTestCase, make_family
+
+
+def quantity(product):
+    return Product.objects.values_list("quantity", flat=True).get(pk=product.pk)
+
+
+class StockLedgerTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        response = self.client.post(
+            "/api/products/", {"category": "Flour", "type": "kg", "quantity": 10}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.product = Product.objects.get(pk=response.data["id"])
+
+    def test_donations_and_edits_move_the_ledger(self):
+        donation = Donation.objects.create(
+            product=self.product, quantity=5, date="2026-01-10"
+        )
+        self.assertEqual(quantity(self.product), 15)
+        donation.quantity = 3
+        donation.save()
+        self.assertEqual(quantity(self.product), 13)
+        donation.delete()
+        self.assertEqual(quantity(self.product), 10)
+        self.assertEqual(self.product.movements.count(), 4)
+
+    def test_set_quantity(self):
+        response = self.client.patch(
+            f"/api/product/{self.product.pk}", {"quantity": 4}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["quantity"], 4)
+        self.assertEqual(quantity(self.product), 4)
+        adjustment = self.product.movements.latest("id")
+        self.assertEqual(adjustment.kind, StockMovement.Kinds.ADJUSTMENT)
+        self.assertEqual(adjustment.quantity, -6)
+
+    def test_set_quantity_from_stale_instance(self):
+        # Loaded before a donation was recorded: the delta must count it.
+        stale = Product.objects.get(pk=self.product.pk)
+        Donation.objects.create(product=self.product, quantity=5, date="2026-01-10")
+        serializer = ProductSerializer(stale, data={"quantity": 20}, partial=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        self.assertEqual(quantity(self.product), 20)
+
+
+class BulkDeleteTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.flour = Product.objects.create(category="Flour", type="kg")
+        self.oil = Product.objects.create(category="Oil", type="l")
+        self.donations = [
+            Donation.objects.create(product=product, quantity=count, date=date)
+            for product, count, date in [
+                (self.flour, 10, "2026-01-05"),
+                (self.flour, 4, "2026-01-05"),
+                (self.oil, 7, "2026-02-01"),
+                (self.oil, 2, "2026-03-01"),
+            ]
+        ]
+
+    def activity(self, month):
+        row = MonthlyActivity.objects.filter(month=month).first()
+        return row.donations if row else 0
+
+    def test_delete_multiple(self):
+        ids = [donation.pk for donation in self.donations[:3]]
+        response = self.client.delete(
+            "/api/donation/delete_multiple/", {"ids": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["message"], "Deleted 3 objects")
+        self.assertEqual(
+            list(Donation.objects.values_list("pk", flat=True)), [self.donations[3].pk]
+        )
+        self.assertEqual(quantity(self.flour), 0)
+        self.assertEqual(quantity(self.oil), 2)
+        # One summed reversal per product and day.
+        reversals = StockMovement.objects.filter(quantity__lt=0)
+        self.assertEqual(
+            sorted(reversals.values_list("product", "quantity")),
+            sorted([(self.flour.pk, -14), (self.oil.pk, -7)]),
+        )
+        self.assertEqual(self.activity("2026-01-01"), 0)
+        self.assertEqual(self.activity("2026-02-01"), 0)
+        self.assertEqual(self.activity("2026-03-01"), 1)
+
+    def test_no_per_row_signals(self):
+        received = []
+
+        def receiver(sender, **kwargs):
+            received.append(sender)
+
+        post_delete.connect(receiver, sender=Donation)
+        try:
+            Donation.delete_in_bulk(Donation.objects.all())
+        finally:
+            post_delete.disconnect(receiver, sender=Donation)
+        self.assertEqual(received, [])
+        self.assertFalse(Donation.objects.exists())
+
+
+class DeliveryStockTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = Product.objects.create(category="Flour", type="kg")
+        Donation.objects.create(product=self.product, quantity=10, date="2026-01-10")
+        self.family = make_family(self.year)
+
+    def deliver(self, count):
+        data = {
+            "product": self.product.pk,
+            "quantity": count,
+            "date": "2026-03-01",
+            "beneficiary": self.family.pk,
+        }
+        return self.client.post("/api/delivery/", data, format="json")
+
+    def test_second_delivery_cannot_overdraw(self):
+        self.assertEqual(self.deliver(6).status_code, 201)
+        response = self.deliver(6)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("quantity", response.data)
+        self.assertEqual(quantity(self.product), 4)
+        self.assertEqual(Delivery.objects.count(), 1)
+
+    def test_edit_counts_its_own_quantity(self):
+        delivery = self.deliver(6).data["id"]
+        url = f"/api/delivery/{delivery}"
+        self.assertEqual(self.client.patch(url, {"quantity": 10}).status_code, 200)
+        self.assertEqual(self.client.patch(url, {"quantity": 11}).status_code, 400)
+        self.assertEqual(quantity(self.product), 0)
+
+
+class ConcurrentDeliveryTests(TransactionTestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create(username="tester"))
+        self.product = Product.objects.create(category="Flour", type="kg")
+        Donation.objects.create(product=self.product, quantity=10, date="2026-01-10")
+        year, _ = Year.objects.get_or_create(year=2026)
+        self.family = make_family(year)
+
+    def test_waits_for_a_distribution_in_progress(self):
+        # Another session is handing out 6 and has not committed yet.
+        other = connections.create_connection("default")
+        self.addCleanup(other.close)
+        other.set_autocommit(False)
+        with other.cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM api_product WHERE id = %s FOR UPDATE",
+                [self.product.pk],
+            )
+            cursor.execute(
+                "INSERT INTO api_stockmovement (product_id, kind, quantity, date, "
+                "created_at) VALUES (%s, 'delivery', -6, '2026-03-01', NOW())",
+                [self.product.pk],
+            )
+
+        responses = []
+
+        def deliver():
+            try:
+                data = {
+                    "product": self.product.pk,
+                    "quantity": 6,
+                    "date": "2026-03-01",
+                    "beneficiary": self.family.pk,
+                }
+                responses.append(
+                    self.client.post("/api/delivery/", data, format="json")
+                )
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=deliver)
+        thread.start()
+        thread.join(timeout=1)  # blocked on the product row
+        other.commit()
+        thread.join()
+
+        self.assertEqual(responses[0].status_code, 400)
+        self.assertEqual(quantity(self.product), 4)
@@ -0,0 +1,82 @@
+import io
+import os
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from api.models import Document
+from api.storage import document_storage
+from .base import MediaTestCase, make_family
+
+
+class ContentAddressedStorageTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.families = [make_family(self.year) for _ in range(2)]
+
+    def add(self, family, content, name="scan.pdf"):
+        return Document.objects.create(owner=family, file=ContentFile(content, name))
+
+    def blobs(self):
+        root = document_storage.path(document_storage.blob_dir)
+        return sorted(name for _, _, files in os.walk(root) for name in files)
+
+    def test_identical_files_share_a_blob(self):
+        first = self.add(self.families[0], b"same content")
+        second = self.add(self.families[1], b"same content", name="copy.pdf")
+        self.add(self.families[1], b"other content")
+        self.assertTrue(os.path.samefile(first.file.path, second.file.path))
+        self.assertNotEqual(first.file.name, second.file.name)
+        self.assertEqual(len(self.blobs()), 2)
+        with second.file.open("rb") as file:
+            self.assertEqual(file.read(), b"same content")
+
+    def test_deleted_documents_release_their_blob(self):
+        kept = self.add(self.families[0], b"kept")
+        shared = self.add(self.families[0], b"shared")
+        self.add(self.families[1], b"shared", name="copy.pdf")
+        self.add(self.families[1], b"dropped")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/file/{shared.pk}")
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(os.path.exists(shared.file.path))
+        # The copy still links the blob.
+        self.assertEqual(document_storage.collect_garbage(), (0, 0))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.families[1].delete()
+        self.assertEqual(
+            document_storage.collect_garbage(), (2, len(b"shared") + len(b"dropped"))
+        )
+        self.assertEqual(len(self.blobs()), 1)
+        self.assertTrue(os.path.exists(kept.file.path))
+
+    def test_rolled_back_delete_keeps_the_file(self):
+        document = self.add(self.families[0], b"kept")
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                document.delete()
+                transaction.set_rollback(True)
+        self.assertTrue(os.path.exists(document.file.path))
+
+    def test_name_still_in_use(self):
+        document = self.add(self.families[0], b"kept")
+        Document.objects.create(owner=self.families[1], file=document.file.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            document.delete()
+        self.assertTrue(os.path.exists(document.file.path))
+
+    def test_dedupe_documents(self):
+        # Files written before the storage linked them.
+        names = [f"documents/{family.pk}/old.pdf" for family in self.families]
+        for name in names:
+            path = document_storage.path(name)
+            os.makedirs(os.path.dirname(path))
+            with open(path, "wb") as file:
+                file.write(b"legacy scan")
+
+        call_command("dedupe_documents", stdout=io.StringIO())
+        paths = [document_storage.path(name) for name in names]
+        self.assertTrue(os.path.samefile(*paths))
+        self.assertEqual(os.stat(paths[0]).st_nlink, 3)
+        self.assertEqual(len(self.blobs()), 1)
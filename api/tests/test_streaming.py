@@ -0,0 +1,35 @@
+import json
+from django.http import StreamingHttpResponse
+from api.models import Family
+from api.serializers import FamilySerializer
+from api.streaming import iter_json_array
+from .base import ApiTestCase, make_family
+
+
+class StreamingListTests(ApiTestCase):
+    def stream(self, year=2026):
+        response = self.client.get("/api/families/", {"year": year, "stream": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(response["Content-Type"], "application/json")
+        return json.loads(b"".join(response.streaming_content))
+
+    def test_empty_year(self):
+        self.assertEqual(self.stream(), [])
+
+    def test_families_in_id_order(self):
+        families = [make_family(self.year, lastName=f"F{index}") for index in range(3)]
+        rows = self.stream()
+        self.assertEqual([row["id"] for row in rows], [f.pk for f in families])
+        self.assertEqual(rows[0]["lastName"], "F0")
+
+    def test_chunks_join_into_one_array(self):
+        families = [make_family(self.year, lastName="عائلة") for _ in range(5)]
+        body = "".join(
+            iter_json_array(
+                Family.objects.order_by("id"), FamilySerializer, chunk_size=2
+            )
+        )
+        rows = json.loads(body)
+        self.assertEqual([row["id"] for row in rows], [f.pk for f in families])
+        self.assertIn("عائلة", body)
@@ -0,0 +1,65 @@
+import io
+from unittest import mock
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from PIL import Image
+from api.models import Document, build_document_thumbnail
+from .base import MediaTestCase, make_family
+
+
+def png(size=(1200, 800), color="red"):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class ThumbnailTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.family = make_family(self.year)
+
+    def add(self, content, name="photo.png"):
+        return Document.objects.create(
+            owner=self.family, file=ContentFile(content, name)
+        )
+
+    def test_scheduled_after_commit(self):
+        with mock.patch("api.models.in_background") as in_background:
+            with self.captureOnCommitCallbacks(execute=True):
+                document = self.add(png())
+        in_background.assert_called_once_with(build_document_thumbnail, document.pk)
+
+    def test_build(self):
+        document = self.add(png())
+        self.assertEqual(Document.objects.get(pk=document.pk).thumbnail.name, "")
+        document.build_thumbnail()
+        document.refresh_from_db()
+        with default_storage.open(document.thumbnail.name) as file:
+            image = Image.open(file)
+            self.assertEqual((image.format, image.size), ("JPEG", (320, 213)))
+
+        # Same content, same thumbnail.
+        copy = self.add(png(), name="copy.png")
+        copy.build_thumbnail()
+        self.assertEqual(copy.thumbnail.name, document.thumbnail.name)
+
+        response = self.client.get(f"/media/{document.thumbnail.name}")
+        self.assertEqual(response.status_code, 200)
+
+    def test_new_file_resets_the_thumbnail(self):
+        document = self.add(png())
+        document.build_thumbnail()
+        document.file = ContentFile(png(color="blue"), "other.png")
+        document.save()
+        self.assertEqual(Document.objects.get(pk=document.pk).thumbnail.name, "")
+
+    def test_build_thumbnails(self):
+        photo = self.add(png())
+        notes = self.add(b"plain text", name="notes.txt")
+        output = io.StringIO()
+        call_command("build_thumbnails", stdout=output)
+        self.assertIn("Built 1 thumbnails, 1 without preview", output.getvalue())
+        self.assertTrue(Document.objects.get(pk=photo.pk).thumbnail.name)
+        self.assertIsNone(Document.objects.get(pk=notes.pk).thumbnail.name)
+        self.assertFalse(Document.objects.filter(thumbnail="").exists())
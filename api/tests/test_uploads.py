@@ -0,0 +1,90 @@
+import hashlib
+import io
+from unittest import mock
+from django.http import UnreadablePostError
+from api.models import Document, DocumentUpload
+from .base import MediaTestCase, make_family
+
+CONTENT = b"0123456789" * 1000
+
+
+class DisconnectingStream(io.BytesIO):
+    """A request body whose client goes away after `limit` bytes."""
+
+    def __init__(self, data, limit):
+        super().__init__(data)
+        self.limit = limit
+
+    def read(self, size=-1):
+        if self.tell() >= self.limit:
+            raise UnreadablePostError("connection reset")
+        return super().read(min(size, self.limit - self.tell()))
+
+
+class FullDisk(io.BytesIO):
+    """A file that cannot be written to."""
+
+    def __init__(self, path, mode):
+        super().__init__()
+
+    def write(self, data):
+        raise OSError(28, "No space left on device")
+
+
+class ChunkedUploadTests(MediaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.family = make_family(self.year)
+        response = self.client.post(
+            "/api/files/uploads/",
+            {"owner": self.family.pk, "filename": "scan.pdf", "size": len(CONTENT)},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        self.url = f"/api/files/uploads/{response.data['id']}"
+
+    def send(self, offset, data):
+        return self.client.generic(
+            "PATCH",
+            self.url,
+            data,
+            content_type="application/offset+octet-stream",
+            HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_upload_in_chunks(self):
+        self.assertEqual(self.send(0, CONTENT[:4000]).data["offset"], 4000)
+        response = self.send(0, CONTENT[:4000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data["offset"], 4000)
+        self.assertEqual(self.send(4000, CONTENT[4000:]).data["offset"], len(CONTENT))
+
+        response = self.client.post(
+            f"{self.url}/finalize",
+            {"sha256": hashlib.sha256(CONTENT).hexdigest()},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 201)
+        document = Document.objects.get(owner=self.family)
+        with document.file.open("rb") as file:
+            self.assertEqual(file.read(), CONTENT)
+        self.assertFalse(DocumentUpload.objects.exists())
+
+    def test_chunk_past_size(self):
+        response = self.send(0, CONTENT + b"!")
+        self.assertEqual(response.status_code, 413)
+
+    def test_client_gone(self):
+        upload = DocumentUpload.objects.get()
+        received = upload.append(DisconnectingStream(CONTENT, 2500), len(CONTENT))
+        self.assertFalse(received)
+        upload.refresh_from_db()
+        self.assertEqual(upload.offset, 2500)
+
+    def test_write_error_is_raised(self):
+        upload = DocumentUpload.objects.get()
+        with mock.patch("api.models.open", FullDisk, create=True):
+            with self.assertRaises(OSError):
+                upload.append(io.BytesIO(CONTENT), len(CONTENT))
+        upload.refresh_from_db()
+        self.assertEqual(upload.offset, 0)
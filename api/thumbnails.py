@@ -0,0 +1,81 @@
+"""
+Small previews of family documents: a JPEG of the image itself, or of the
+first page of a PDF when PyMuPDF or poppler's `pdftoppm` is installed.
+They are named after the document's content hash, so identical documents
+share one, and built on a background thread pool after a document is saved
+(`manage.py build_thumbnails` catches up whatever was missed).
+"""
+
+import os
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from django.conf import settings
+
+THUMBNAIL_SIZE = (320, 320)
+IMAGE_EXTENSIONS = {".bmp", ".gif", ".jpeg", ".jpg", ".png", ".tif", ".tiff", ".webp"}
+
+try:
+    import fitz  # PyMuPDF
+except ImportError:
+    fitz = None
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix="thumbnails"
+)
+
+
+def thumbnail_name(digest):
+    return os.path.join("thumbnails", digest[:2], f"{digest}.jpg")
+
+
+def open_pdf_page(path):
+    from PIL import Image
+
+    if fitz is not None:
+        with fitz.open(path) as pdf:
+            pixmap = pdf[0].get_pixmap(dpi=72)
+            return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+    if shutil.which("pdftoppm"):
+        result = subprocess.run(
+            ["pdftoppm", "-f", "1", "-l", "1", "-png", "-scale-to", "640", path],
+            capture_output=True,
+            timeout=60,
+        )
+        if result.returncode == 0 and result.stdout:
+            return Image.open(BytesIO(result.stdout))
+    return None
+
+
+def render_thumbnail(path):
+    """JPEG bytes of the preview of the file at `path`, None when there is none."""
+    from PIL import Image, ImageOps
+
+    extension = os.path.splitext(path)[1].lower()
+    try:
+        if extension in IMAGE_EXTENSIONS:
+            image = Image.open(path)
+            image.draft("RGB", THUMBNAIL_SIZE)  # JPEGs decode at a fraction
+            image = ImageOps.exif_transpose(image)
+        elif extension == ".pdf":
+            image = open_pdf_page(path)
+        else:
+            return None
+        if image is None:
+            return None
+        image.thumbnail(THUMBNAIL_SIZE)
+        buffer = BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=80, optimize=True)
+        return buffer.getvalue()
+    except (
+        OSError,
+        ValueError,
+        Image.DecompressionBombError,
+        subprocess.SubprocessError,
+    ):
+        return None  # unreadable files get no preview
+
+
+def in_background(function, *args):
+    executor.submit(function, *args)
@@ -61,6 +61,26 @@ urlpatterns = [
         name="handler-families-view",
     ),
     path("families/", views.FamilyListCreate.as_view(), name="family-create-view"),
+    path(
+        "families/scan/<str:barcode>",
+        views.FamilyScanView.as_view(),
+        name="family-scan-view",
+    ),
+    path(
+        "families/labels/<int:year>",
+        views.FamilyLabelsView.as_view(),
+        name="family-labels-view",
+    ),
+    path(
+        "families/import/<int:year>",
+        views.FamilyImportView.as_view(),
+        name="family-import-view",
+    ),
+    path(
+        "families/rollover/<int:year>",
+        views.FamilyRolloverView.as_view(),
+        name="family-rollover-view",
+    ),
     path("view/<int:id>", views.FamilyRetrieve.as_view(), name="family-retrieve-view"),
     path(
         "families/<int:id>",
@@ -117,6 +137,11 @@ urlpatterns = [
     path(
         "delivery/filter/", views.DeliveryFilter.as_view(), name="delivery-filter-view"
     ),
+    path(
+        "delivery/bulk/",
+        views.DeliveryBulkCreateAPIView.as_view(),
+        name="delivery-bulk-create-view",
+    ),
     path(
         "product_deliveries/",
         views.ProductDeliveryList.as_view(),
@@ -129,6 +154,11 @@ urlpatterns = [
         name="product-retrieve-update-destroy-view",
     ),
     path("products/filter/", views.ProductFilter.as_view(), name="product-filter-view"),
+    path(
+        "product/<int:pk>/movements",
+        views.ProductMovementList.as_view(),
+        name="product-movements-view",
+    ),
     path("donations/", views.DonationListCreate.as_view(), name="donation-create-view"),
     path(
         "donation/<int:pk>",
@@ -144,12 +174,38 @@ urlpatterns = [
         "donations/filter/", views.DonationFilter.as_view(), name="donation-filter-view"
     ),
     path("files/", views.DocumentListCreate.as_view(), name="document-create-view"),
+    path(
+        "families/<int:id>/files.zip",
+        views.DocumentArchiveView.as_view(),
+        name="family-documents-archive-view",
+    ),
+    path(
+        "families/files/<int:year>",
+        views.DocumentArchiveView.as_view(),
+        name="families-documents-archive-view",
+    ),
+    path(
+        "files/uploads/",
+        views.DocumentUploadCreate.as_view(),
+        name="document-upload-create-view",
+    ),
+    path(
+        "files/uploads/<uuid:pk>",
+        views.DocumentUploadDetail.as_view(),
+        name="document-upload-detail-view",
+    ),
+    path(
+        "files/uploads/<uuid:pk>/finalize",
+        views.DocumentUploadFinalize.as_view(),
+        name="document-upload-finalize-view",
+    ),
     path(
         "file/<int:pk>",
         views.DocumentRetrieveUpdateDestroy.as_view(),
         name="document-retrieve-update-destroy-view",
     ),
     path("stats/<int:year>", views.StatsView.as_view(), name="stats-view"),
+    path("changes/", views.ChangeFeedView.as_view(), name="change-feed-view"),
     path("print-family/<int:id>", views.PrintFamilyView.as_view(), name="stats-view"),
     path(
         "family/delete_multiple/",
@@ -1,15 +1,39 @@
-from django.db.models import Count, F, Q, Value, CharField
+from django.db import transaction
+from django.http import FileResponse, Http404, QueryDict
+from django.core.exceptions import ImproperlyConfigured, SuspiciousFileOperation
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, F, Q, Sum, Value, CharField
 from django.db.models.functions import TruncMonth, Lower, Concat
 from rest_framework import generics, status
 from rest_framework.views import APIView
 from .models import *
 from .serializers import *
+from .filters import *
+from .pagination import KeysetPaginatedMixin
+from .streaming import streaming_json_response, streaming_zip_response
+from .caching import *
+from .changes import FEED_PAGE_SIZE, MAX_FEED_PAGE_SIZE, change_feed, parse_cursor
+from .conditional import ConditionalGetMixin
+from .exports import (
+    CHILD_COLUMNS,
+    DELIVERY_COLUMNS,
+    DONATION_COLUMNS,
+    FAMILY_COLUMNS,
+    ExportMixin,
+)
+from .imports import FamilyImporter, read_rows
+from .labels import family_labels, label_sheet, paginate
+from .rollover import rollover_families
+from .media import serve_file
+from .storage import document_storage
 from rest_framework.request import Request
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser, FormParser
 from django.utils.timezone import now
 from django.contrib.auth.models import User
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.exceptions import ValidationError
+from django.utils.dateparse import parse_date
 from django.shortcuts import get_object_or_404
 from rest_framework.authtoken.views import ObtainAuthToken
 from rest_framework.authtoken.models import Token
@@ -17,6 +41,19 @@ from rest_framework.authentication import TokenAuthentication
 from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.postgres.search import SearchVector, SearchQuery, SearchRank
 from datetime import datetime, date
+from collections import defaultdict
+import os
+import posixpath
+
+# Tables whose change markers validate the conditional GETs of each view.
+LOOKUP_TABLES = (Year, Tribe, HealthStatus, SocialStatus, Profession)
+HANDLER_TABLES = (Handler,)
+FAMILY_TABLES = LOOKUP_TABLES + (Handler, Family, Child, PersonInCustody, Spouce)
+DOCUMENT_TABLES = (Document,)
+PRODUCT_TABLES = (Product, StockMovement)
+DELIVERY_TABLES = (Delivery, Product, Family)
+DONATION_TABLES = (Donation, Product)
+STATS_TABLES = FAMILY_TABLES + (Delivery, Donation)
 
 
 class CustomAuthToken(ObtainAuthToken):
@@ -114,105 +151,128 @@ class UserDetailView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class YearListCreate(generics.ListCreateAPIView):
+class YearListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = Year.objects.order_by("year")
     serializer_class = YearSerializer
 
 
-class YearRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class YearRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = Year.objects.all()
     serializer_class = YearSerializer
     lookup_field = "year"
 
 
-class TribeListCreate(generics.ListCreateAPIView):
+class TribeListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = Tribe.objects.all()
     serializer_class = TribeSerializer
 
 
-class TribeRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class TribeRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = Tribe.objects.all()
     serializer_class = TribeSerializer
     lookup_field = "name"
 
 
-class HealthStatusListCreate(generics.ListCreateAPIView):
+class HealthStatusListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = HealthStatus.objects.all()
     serializer_class = HealthStatusSerializer
 
 
-class HealthStatusRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class HealthStatusRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = HealthStatus.objects.all()
     serializer_class = HealthStatusSerializer
     lookup_field = "name"
 
 
-class SocialStatusListCreate(generics.ListCreateAPIView):
+class SocialStatusListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = SocialStatus.objects.all()
     serializer_class = SocialStatusSerializer
 
 
-class SocialStatusRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class SocialStatusRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = SocialStatus.objects.all()
     serializer_class = SocialStatusSerializer
     lookup_field = "name"
 
 
-class ProfessionListCreate(generics.ListCreateAPIView):
+class ProfessionListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = Profession.objects.all()
     serializer_class = ProfessionSerializer
 
 
-class ProfessionRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class ProfessionRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = LOOKUP_TABLES
     queryset = Profession.objects.all()
     serializer_class = ProfessionSerializer
     lookup_field = "name"
 
 
-class HandlerListCreate(generics.ListCreateAPIView):
+class HandlerListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = HANDLER_TABLES
     queryset = Handler.objects.all()
     serializer_class = HandlerSerializer
 
 
-class HandlerRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class HandlerRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = HANDLER_TABLES
     queryset = Handler.objects.all()
     serializer_class = HandlerSerializer
     lookup_field = "pk"
 
 
-class HandlerFilter(APIView):
+class HandlerFilter(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = HANDLER_TABLES
     serializer_class = HandlerListSerializer
 
     def get(self, request: Request, *args, **kwargs):
         sort = request.query_params.getlist("sort", ["-id"])
-        search = request.query_params.get("search", "")
-        types = request.query_params.getlist("types", [])
 
         handler_query = Handler.objects.annotate(
             full_name=Concat(
@@ -223,31 +283,40 @@ class HandlerFilter(APIView):
                 output_field=CharField(),
             ),
         )
-        query = Q(full_name__icontains=search) & Q(type__in=types)
-        queryset = handler_query.filter(query)
+        queryset = HandlerFilterSet(request.query_params).filter(handler_query)
         queryset = queryset.order_by(*case_insensitive_sort(queryset, sort))
-        queryset = queryset.distinct()
 
         serializer = self.serializer_class(instance=queryset, many=True)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
 
-class HandlerFamiliesList(APIView):
+class HandlerFamiliesList(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     serializer_class = FamilyCreateSerializer
 
     def get(self, request: Request, *args, **kwargs):
         try:
-            year = request.query_params.get(
-                "year", str(Year.objects.order_by("year").last().year)
+            year = request.query_params.get("year") or str(
+                Year.objects.order_by("year").last().year
             )
             id = request.query_params.get("id", "")
             if id:
-                handler = Handler.objects.get(pk=id)
-                familiyList = handler.family_set.filter(year__year=year)
-                serializer = FamilyListSerializer(instance=familiyList, many=True)
-                return Response(serializer.data, status=status.HTTP_200_OK)
+
+                def build():
+                    handler = Handler.objects.get(pk=id)
+                    familiyList = handler.family_set.filter(
+                        year__year=year
+                    ).with_list_data()
+                    return FamilyListSerializer(instance=familiyList, many=True).data
+
+                return cached_response(
+                    request,
+                    f"handler-families:{year}",
+                    [year_scope(year), LOOKUPS_SCOPE],
+                    build,
+                )
             else:
                 return Response(
                     data={"error": "no id"}, status=status.HTTP_400_BAD_REQUEST
@@ -258,18 +327,28 @@ class HandlerFamiliesList(APIView):
             )
 
 
-class FamilyListCreate(APIView):
+class FamilyListCreate(ConditionalGetMixin, KeysetPaginatedMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     serializer_class = FamilyCreateSerializer
 
     def get(self, request: Request, *args, **kwargs):
-        year = request.query_params.get(
-            "year", str(Year.objects.order_by("year").last().year)
+        year = request.query_params.get("year") or str(
+            Year.objects.order_by("year").last().year
+        )
+        familiyList = Family.objects.filter(year__year=year).select_related(
+            "tribe", "healthStatus", "socialStatus", "profession"
+        )
+        if request.query_params.get("stream", ""):
+            # Whole-year dumps: constant memory, first byte right away.
+            return streaming_json_response(familiyList.order_by("id"), FamilySerializer)
+        return cached_response(
+            request,
+            f"families:{year}",
+            [year_scope(year), LOOKUPS_SCOPE],
+            lambda: self.list_response(request, familiyList, FamilySerializer).data,
         )
-        familiyList = Family.objects.filter(year__year=year)
-        serializer = FamilySerializer(instance=familiyList, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
 
     def post(self, request: Request, *args, **kwargs):
         data = request.data
@@ -280,9 +359,10 @@ class FamilyListCreate(APIView):
         return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class FamilyRetrieve(APIView):
+class FamilyRetrieve(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
 
     def get(self, request: Request, id, *args, **kwargs):
         try:
@@ -293,9 +373,10 @@ class FamilyRetrieve(APIView):
             return Response(data={"error": "no id"}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class FamilyRetrieveUpdateDestroy(APIView):
+class FamilyRetrieveUpdateDestroy(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
 
     def get(self, request: Request, id, *args, **kwargs):
         try:
@@ -322,116 +403,234 @@ class FamilyRetrieveUpdateDestroy(APIView):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class FamilySortFilterView(APIView):
+# barcode -> family summary, for the distribution desk scanners
+scan_cache = VersionedLRU(maxsize=4096)
+
+
+class FamilyScanView(APIView):
+    """
+    Resolves a scanned card: the family summary (with member counts) served
+    from `scan_cache`, plus what the family already received for `occasion`
+    (today's deliveries without it), which is the only database query.
+    """
+
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
-    serializer_class = FamilyListSerializer
 
-    def get(self, request: Request, year, *args, **kwargs):
-        sort = request.query_params.getlist("sort", ["-id"])
-        search = request.query_params.get("search", "")
-        professions = request.query_params.getlist("p", [])
-        socials = request.query_params.getlist("s", [])
-        healths = request.query_params.getlist("h", [])
-        min_age = int(request.query_params.get("min_age", 0))
-        max_age = int(request.query_params.get("max_age", 1000))
-        min_children_age = int(request.query_params.get("min_children_age", 0))
-        max_children_age = int(request.query_params.get("max_children_age", 1000))
+    def get(self, request: Request, barcode, *args, **kwargs):
+        family = self.get_family(barcode)
+        if family is None:
+            return Response(
+                {"error": "Unknown barcode"}, status=status.HTTP_404_NOT_FOUND
+            )
+
+        occasion = request.query_params.get("occasion", "")
+        deliveries = Delivery.objects.filter(beneficiary_id=family["id"])
+        if occasion:
+            deliveries = deliveries.filter(occasion=occasion)
+        else:
+            deliveries = deliveries.filter(date=now().date())
+        deliveries = deliveries.select_related("product", "beneficiary")
+
+        return Response(
+            {
+                "family": family,
+                "deliveries": DeliveryListSerializer(deliveries, many=True).data,
+            }
+        )
+
+    def get_family(self, barcode):
         today = now().date()
-        has_children = request.query_params.get("has_children", "")
-        get_children = request.query_params.get("get_children", "")
+        cached = scan_cache.get(barcode)
+        versions = None
+        if cached is not None:
+            fresh, scopes, (day, family) = cached
+            if fresh and day == today:  # `age` moves with the date
+                return family
+            versions = get_versions(scopes)
+
+        family = (
+            Family.objects.with_list_data()
+            .select_related("year")
+            .filter(barcode=barcode)
+            .first()
+        )
+        if family is None:
+            return None
+        data = dict(FamilyListSerializer(family).data, year=family.year.year)
+        scopes = [family_scope(family.pk), LOOKUPS_SCOPE]
+        if cached is None or cached[1] != scopes:
+            versions = None  # unknown, the next scan rebuilds it
+        scan_cache.set(barcode, scopes, versions, (today, data))
+        return data
 
-        if not get_children:
-            family_query = Family.objects.annotate(
-                full_name=Concat(
-                    "lastName",
-                    Value(" "),
-                    "firstName",
-                    Value(" "),
-                    "father",
-                    Value(" "),
-                    "grandFather",
-                    output_field=CharField(),
-                ),
-                spouces_full_name=Concat(
-                    "spouces__lastName",
-                    Value(" "),
-                    "spouces__firstName",
-                    output_field=CharField(),
-                ),
-                child_full_name=Concat(
-                    "lastName",
-                    Value(" "),
-                    "children__firstName",
-                    Value(" "),
-                    "firstName",
-                    Value(" "),
-                    "father",
-                    Value(" "),
-                    "grandFather",
-                    output_field=CharField(),
-                ),
-                handler_full_name=Concat(
-                    "handler__lastName",
-                    Value(" "),
-                    "handler__firstName",
-                    output_field=CharField(),
-                ),
-                personincustody_full_name=Concat(
-                    "personincustody__lastName",
-                    Value(" "),
-                    "personincustody__firstName",
-                    output_field=CharField(),
-                ),
-            ).only("id", "lastName", "firstName", "father", "grandFather")
-
-            query = (
-                Q(full_name__icontains=search)
-                | Q(tribe__name__icontains=search)
-                | Q(phoneNumber1__icontains=search)
-                | Q(phoneNumber2__icontains=search)
-                | Q(barcode__icontains=search)
-                | Q(healthStatus__name__icontains=search)
-                | Q(address__icontains=search)
-                | Q(child_full_name__icontains=search)
-                | Q(handler_full_name__icontains=search)
-                | Q(spouces_full_name__icontains=search)
-                | Q(personincustody_full_name__icontains=search)
+
+class FamilyLabelsView(ConditionalGetMixin, APIView):
+    """
+    Printable barcode cards for the year's families matching the family
+    filters: the whole sheet as a PDF, or one `page` of it as a PNG
+    (`X-Page-Count` gives the number of pages).
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
+
+    def get(self, request: Request, year, *args, **kwargs):
+        sort = request.query_params.getlist("sort", ["id"])
+        format = request.query_params.get("output", "pdf")
+        if format not in ("pdf", "png"):
+            raise ValidationError({"output": "Expected pdf or png."})
+
+        family_query = Family.objects.filter(year__year=year, barcode__isnull=False)
+        queryset = FamilyFilterSet(request.query_params).filter(family_query)
+        labels = family_labels(queryset.order_by(*sort))
+
+        page_count = len(paginate(labels))
+        page = None
+        if format == "png":
+            try:
+                page = int(request.query_params.get("page", 1))
+            except ValueError:
+                raise ValidationError({"page": "Expected a page number."})
+            if not 1 <= page <= page_count:
+                return Response(
+                    {"error": "No such page"}, status=status.HTTP_404_NOT_FOUND
+                )
+
+        try:
+            path = label_sheet(labels, format, page)
+        except ImproperlyConfigured as error:
+            return Response(
+                {"error": str(error)}, status=status.HTTP_503_SERVICE_UNAVAILABLE
             )
+        response = FileResponse(
+            open(path, "rb"),
+            content_type="application/pdf" if format == "pdf" else "image/png",
+            filename=f"labels-{year}.{format}",
+        )
+        response["X-Page-Count"] = page_count
+        return response
+
+
+class ChangeFeedView(APIView):
+    """
+    Rows created, updated or deleted since `cursor`, for clients that keep a
+    replica (see api/changes.py). Follow `cursor` while `more` is true; on
+    `reset` reload the lists, then sync from the returned cursor.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def get(self, request: Request, *args, **kwargs):
+        cursor = parse_cursor(request.query_params.get("cursor"))
+        try:
+            limit = int(request.query_params.get("limit", FEED_PAGE_SIZE))
+        except ValueError:
+            raise ValidationError({"limit": "Expected a number."})
+        limit = max(1, min(limit, MAX_FEED_PAGE_SIZE))
+        return Response(change_feed(cursor, limit))
+
+
+class FamilyRolloverView(APIView):
+    """
+    Copies families of `from_year` with their members into `year`, which is
+    created when needed, and issues them new barcodes. All of the year's
+    families are copied, or only the `ids` given, further narrowed by the
+    family filters of the query string.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def post(self, request: Request, year, *args, **kwargs):
+        try:
+            from_year = int(request.data.get("from_year"))
+        except (TypeError, ValueError):
+            raise ValidationError({"from_year": "Expected a year."})
+        if from_year == year:
+            raise ValidationError({"from_year": "Families are already in this year."})
+        source = get_object_or_404(Year, year=from_year)
+
+        family_query = Family.objects.filter(year=source)
+        families = FamilyFilterSet(request.query_params).filter(family_query)
+        ids = request.data.get("ids")
+        if ids is not None:
+            if not isinstance(ids, list):
+                raise ValidationError({"ids": "Expected a list of family ids."})
+            families = families.filter(pk__in=ids)
+
+        target, _ = Year.objects.get_or_create(year=year)
+        counts = rollover_families(families, target)
+        return Response({"year": year, **counts}, status=status.HTTP_201_CREATED)
+
+
+class FamilyImportView(APIView):
+    """
+    Imports the year's families from an uploaded CSV or XLSX `file` (see
+    api.imports for the columns). Nothing is saved when a row is invalid,
+    the errors are reported per spreadsheet row; `dry_run` only validates.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    parser_classes = [MultiPartParser, FormParser]
+
+    def post(self, request: Request, year, *args, **kwargs):
+        year = get_object_or_404(Year, year=year)
+        file = request.FILES.get("file")
+        if file is None:
+            raise ValidationError({"file": "No file was submitted."})
+        dry_run = request.data.get("dry_run") in ("1", "true", "True")
 
-            # Apply additional filters only if they are provided
-            if socials:
-                query &= Q(socialStatus__name__in=socials)
-            if professions:
-                query &= Q(profession__name__in=professions)
-            if healths:
-                query &= Q(healthStatus__name__in=healths)
-
-            query &= Q(
-                day_of_birth__gte=today.replace(year=today.year - max_age - 1),
-                day_of_birth__lte=today.replace(year=today.year - min_age),
+        try:
+            report = FamilyImporter(year).run(
+                read_rows(file.file, file.name), dry_run=dry_run
             )
+        except DjangoValidationError as error:
+            raise ValidationError({"file": error.messages})
+        if report["errors"]:
+            return Response(report, status=status.HTTP_400_BAD_REQUEST)
+        if dry_run:
+            return Response(report)
+        return Response(report, status=status.HTTP_201_CREATED)
+
+
+class FamilySortFilterView(
+    ConditionalGetMixin, KeysetPaginatedMixin, ExportMixin, APIView
+):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
+    serializer_class = FamilyListSerializer
 
-            if has_children:
-                query &= Q(
-                    children__day_of_birth__gte=today.replace(
-                        year=today.year - max_children_age
-                    ),
-                    children__day_of_birth__lte=today.replace(
-                        year=today.year - min_children_age
-                    ),
+    def get(self, request: Request, year, *args, **kwargs):
+        sort = request.query_params.getlist("sort", ["-id"])
+        get_children = request.query_params.get("get_children", "")
+        export = self.export_format(request)
+
+        if not get_children:
+            if export:
+                family_query = Family.objects.filter(year__year=year)
+                queryset = FamilyFilterSet(request.query_params).filter(family_query)
+                return self.export_response(
+                    queryset.order_by(*sort), FAMILY_COLUMNS, export, f"families-{year}"
                 )
 
-            queryset = (
-                family_query.filter(year__year=year)
-                .filter(query)
-                .distinct()
-                .order_by(*sort)
+            def build():
+                family_query = Family.objects.with_list_data().filter(year__year=year)
+                queryset = FamilyFilterSet(request.query_params).filter(family_query)
+                queryset = queryset.order_by(*sort)
+                return self.list_response(request, queryset, self.serializer_class).data
+
+            return cached_response(
+                request,
+                f"families-filter:{year}",
+                [year_scope(year), LOOKUPS_SCOPE],
+                build,
             )
 
-            serializer = self.serializer_class(instance=queryset, many=True)
-            return Response(data=serializer.data, status=status.HTTP_200_OK)
-
         else:
             children_query = Child.objects.annotate(
                 child_full_name=Concat(
@@ -446,22 +645,22 @@ class FamilySortFilterView(APIView):
                     "family__grandFather",
                     output_field=CharField(),
                 ),
-            ).only("id", "firstName", "family__lastName", "family__firstName")
+            ).select_related("family", "healthStatus")
 
-            query = Q(child_full_name__icontains=search) & Q(
-                day_of_birth__gte=today.replace(year=today.year - max_children_age),
-                day_of_birth__lte=today.replace(year=today.year - min_children_age),
-            )
-
-            queryset = children_query.filter(query).distinct().order_by(*sort)
+            queryset = ChildFilterSet(request.query_params).filter(children_query)
+            queryset = queryset.order_by(*sort)
 
-            serializer = ChildListSerializer(instance=queryset, many=True)
-            return Response(data=serializer.data, status=status.HTTP_200_OK)
+            if export:
+                return self.export_response(
+                    queryset, CHILD_COLUMNS, export, f"children-{year}"
+                )
+            return self.list_response(request, queryset, ChildListSerializer)
 
 
-class ChildList(APIView):
+class ChildList(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     serializer_class = ChildListSerializer
 
     def get(self, request: Request, *args, **kwargs):
@@ -492,25 +691,28 @@ class ChildCreate(APIView):
         return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ChildUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class ChildUpdateDestroy(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     queryset = Child.objects.all()
     serializer_class = ChildSerializer
     lookup_field = "pk"
 
 
-class ChildRetrieve(generics.RetrieveUpdateDestroyAPIView):
+class ChildRetrieve(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     queryset = Child.objects.all()
     serializer_class = ChildListSerializer
     lookup_field = "pk"
 
 
-class SpouceListCreate(APIView):
+class SpouceListCreate(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     serializer_class = SpouceSerializer
 
     def get(self, request: Request, *args, **kwargs):
@@ -537,25 +739,28 @@ class SpouceListCreate(APIView):
         return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class SpouceUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class SpouceUpdateDestroy(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     queryset = Spouce.objects.all()
     serializer_class = SpouceSerializer
     lookup_field = "pk"
 
 
-class SpouceRetrieve(generics.RetrieveUpdateDestroyAPIView):
+class SpouceRetrieve(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     queryset = Spouce.objects.all()
     serializer_class = SpouceListSerializer
     lookup_field = "pk"
 
 
-class PersonInCustodyListCreate(APIView):
+class PersonInCustodyListCreate(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     serializer_class = PersonInCustodySerializer
 
     def get(self, request: Request, *args, **kwargs):
@@ -576,25 +781,32 @@ class PersonInCustodyListCreate(APIView):
         return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PersonInCustodyUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class PersonInCustodyUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     queryset = PersonInCustody.objects.all()
     serializer_class = PersonInCustodySerializer
     lookup_field = "pk"
 
 
-class PersonInCustodyRetrieve(generics.RetrieveUpdateDestroyAPIView):
+class PersonInCustodyRetrieve(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
     queryset = PersonInCustody.objects.all()
     serializer_class = PersonInCustodyViewSerializer
     lookup_field = "pk"
 
 
-class DocumentListCreate(APIView):
+class DocumentListCreate(ConditionalGetMixin, KeysetPaginatedMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = DOCUMENT_TABLES
     serializer_class = DocumentSerializer
     parser_classes = (MultiPartParser, FormParser)
 
@@ -602,12 +814,10 @@ class DocumentListCreate(APIView):
         family_id = request.query_params.get("family_id", "")
         if family_id:
             list = Family.objects.get(pk=family_id).files.all()
-            serializer = self.serializer_class(instance=list, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return self.list_response(request, list, self.serializer_class)
         else:
             list = Document.objects.all()
-            serializer = self.serializer_class(instance=list, many=True)
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            return self.list_response(request, list, self.serializer_class)
 
     def post(self, request: Request, *args, **kwargs):
         try:
@@ -622,17 +832,187 @@ class DocumentListCreate(APIView):
             return Response({"error": e.__str__()}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DocumentRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class DocumentRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = DOCUMENT_TABLES
     queryset = Document.objects.all()
     serializer_class = DocumentSerializer
     lookup_field = "pk"
 
 
-class DeliveryListCreate(APIView):
+class DocumentArchiveView(APIView):
+    """
+    Streams a ZIP of the documents of one family, or of the year's families
+    matching the family filters (one folder per family).
+    """
+
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+
+    def get(self, request: Request, id=None, year=None, *args, **kwargs):
+        if id is not None:
+            family = get_object_or_404(Family, pk=id)
+            documents = family.files.order_by("id")
+            filename = f"family-{family.pk}.zip"
+        else:
+            family_query = Family.objects.filter(year__year=year)
+            families = FamilyFilterSet(request.query_params).filter(family_query)
+            documents = Document.objects.filter(owner__in=families).order_by(
+                "owner_id", "id"
+            )
+            filename = f"families-{year}.zip"
+
+        rows = documents.values_list(
+            "file", "owner_id", "owner__lastName", "owner__firstName"
+        )
+        entries = (
+            (
+                archive_name(name, None if id else (owner, lastName, firstName)),
+                document_storage.path(name),
+            )
+            for name, owner, lastName, firstName in rows.iterator()
+        )
+        return streaming_zip_response(entries, filename)
+
+
+def archive_name(name, family=None):
+    """Name of a stored document in an archive, under its family's folder."""
+    if family is None:
+        return posixpath.basename(name)
+    folder = " ".join(str(part) for part in family).replace("/", "-")
+    return f"{folder}/{posixpath.basename(name)}"
+
+
+class MediaFileView(APIView):
+    """
+    Serves the files of family documents (and their thumbnails) to
+    authenticated users, with Range and conditional request support.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def get(self, request: Request, path, *args, **kwargs):
+        name = posixpath.normpath(path)
+        if not Document.objects.filter(Q(file=name) | Q(thumbnail=name)).exists():
+            raise Http404
+        try:
+            full_path = document_storage.path(name)
+        except SuspiciousFileOperation:
+            raise Http404
+        if not os.path.isfile(full_path):
+            raise Http404
+        return serve_file(request, name, full_path)
+
+
+class DocumentUploadCreate(APIView):
+    """
+    Starts a chunked upload ({owner, filename, size, description}). Chunks
+    are then PATCHed to DocumentUploadDetail and the upload is finalized
+    into a Document.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def post(self, request: Request, *args, **kwargs):
+        serializer = DocumentUploadSerializer(data=request.data)
+        if serializer.is_valid():
+            serializer.save()
+            return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+        return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+class DocumentUploadDetail(APIView):
+    """
+    GET: how far the upload got (`offset`), where the client resumes.
+    PATCH: the raw bytes of the next chunk, starting at the `Upload-Offset`
+    header, streamed to the file. DELETE: abandons the upload.
+    """
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def get(self, request: Request, pk, *args, **kwargs):
+        upload = get_object_or_404(DocumentUpload, pk=pk)
+        return Response(DocumentUploadSerializer(upload).data)
+
+    def patch(self, request: Request, pk, *args, **kwargs):
+        try:
+            offset = int(request.headers["Upload-Offset"])
+            length = int(request.headers["Content-Length"])
+        except (KeyError, ValueError):
+            return Response(
+                {"error": "Upload-Offset and Content-Length are required"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            upload = get_object_or_404(
+                DocumentUpload.objects.select_for_update(), pk=pk
+            )
+            if offset != upload.offset:
+                return Response(
+                    {"error": "Wrong offset", "offset": upload.offset},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            if offset + length > upload.size:
+                return Response(
+                    {"error": "Chunk goes past the declared size"},
+                    status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                )
+            # The body is read from the raw request, never parsed or buffered.
+            received = upload.append(request._request, length)
+
+        data = DocumentUploadSerializer(upload).data
+        if not received:
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+    def delete(self, request: Request, pk, *args, **kwargs):
+        with transaction.atomic():
+            upload = get_object_or_404(
+                DocumentUpload.objects.select_for_update(), pk=pk
+            )
+            upload.abort()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class DocumentUploadFinalize(APIView):
+    """Turns a complete upload into its Document, checking `sha256` if sent."""
+
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+
+    def post(self, request: Request, pk, *args, **kwargs):
+        with transaction.atomic():
+            upload = get_object_or_404(
+                DocumentUpload.objects.select_for_update(), pk=pk
+            )
+            if not upload.complete:
+                return Response(
+                    {"error": "Upload is incomplete", "offset": upload.offset},
+                    status=status.HTTP_409_CONFLICT,
+                )
+            checksum = request.data.get("sha256")
+            if checksum and checksum.lower() != upload.sha256():
+                return Response(
+                    {"error": "Checksum mismatch"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            document = upload.finish()
+        return Response(
+            data=DocumentSerializer(document).data, status=status.HTTP_201_CREATED
+        )
+
+
+class DeliveryListCreate(ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    change_tables = DELIVERY_TABLES
     serializer_class = DeliverySerializer
 
     def get(self, request: Request, *args, **kwargs):
@@ -653,61 +1033,149 @@ class DeliveryListCreate(APIView):
         return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DeliveryRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class DeliveryBulkCreateAPIView(APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+
+    def post(self, request: Request, *args, **kwargs):
+        serializer = BulkDeliverySerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = serializer.validated_data
+
+        if "families" in data:
+            families = Family.objects.filter(pk__in=data["families"])
+        else:
+            families = filtered_families(data["filter"])
+
+        with transaction.atomic(), bulk_operation():
+            # Concurrent distributions of the product wait here, so the stock
+            # check below holds until this one commits.
+            product = Product._base_manager.select_for_update().get(
+                pk=data["product"].pk
+            )
+            available = Product.objects.values_list("quantity", flat=True).get(
+                pk=product.pk
+            )
+
+            family_ids = set(families.values_list("pk", flat=True))
+            unknown = set(data.get("families", [])) - family_ids
+            if unknown:
+                return Response(
+                    {"families": f"Unknown families: {sorted(unknown)}"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            # Families already served (e.g. a retried request) are skipped.
+            served = set(
+                Delivery.objects.filter(
+                    product=product,
+                    occasion=data.get("occasion"),
+                    date=data["date"],
+                    beneficiary__in=family_ids,
+                ).values_list("beneficiary_id", flat=True)
+            )
+            family_ids -= served
+
+            total = data["quantity"] * len(family_ids)
+            if total > available:
+                return Response(
+                    {"quantity": f"Only {available} left in stock, {total} needed"},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+            deliveries = Delivery.objects.bulk_create(
+                [
+                    Delivery(
+                        occasion=data.get("occasion"),
+                        date=data["date"],
+                        quantity=data["quantity"],
+                        beneficiary_id=family_id,
+                        product=product,
+                    )
+                    for family_id in sorted(family_ids)
+                ],
+                batch_size=500,
+            )
+            # One ledger row and one rollup bump for the whole distribution.
+            StockMovement.record(
+                [
+                    StockMovement(
+                        product=product,
+                        kind=StockMovement.Kinds.DELIVERY,
+                        quantity=-total,
+                        date=data["date"],
+                    )
+                ]
+            )
+            bump_counters(
+                MonthlyActivity,
+                {"month": month_start(data["date"])},
+                deliveries=len(deliveries),
+            )
+            TableChange.touch(Delivery)
+            bump_versions(STATS_SCOPE)
+
+        return Response(
+            {
+                "created": len(deliveries),
+                "skipped": len(served),
+                "quantity": available - total,
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+
+def filtered_families(params):
+    """Families matching the family filter view params in `params`."""
+    query = QueryDict(mutable=True)
+    for key, value in params.items():
+        values = value if isinstance(value, list) else [value]
+        query.setlist(key, [str(item) for item in values])
+    year = query.get("year") or Year.objects.order_by("year").last().year
+    return FamilyFilterSet(query).filter(Family.objects.filter(year__year=year))
+
+
+class DeliveryRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    change_tables = DELIVERY_TABLES
     queryset = Delivery.objects.all()
     serializer_class = DeliverySerializer
     lookup_field = "pk"
 
 
-class DeliveryFilter(APIView):
+class DeliveryFilter(ConditionalGetMixin, KeysetPaginatedMixin, ExportMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = DELIVERY_TABLES
     serializer_class = DeliveryFilterSerializer
 
     def get(self, request: Request, *args, **kwargs):
-        product_id = request.query_params.get("product_id", None)
         sort = request.query_params.getlist("sort", ["date"])
-        search = request.query_params.get("search", "")
-        today = date.today()
-        start_of_year = date(today.year, 1, 1)
-
-        since = request.query_params.get("since", start_of_year)
-        till = request.query_params.get("till", today)
 
         delivery_query = Delivery.objects.annotate(
             beneficiary_full_name=Concat(
                 "beneficiary__lastName", Value(" "), "beneficiary__firstName"
             )
-        )
-        query = (
-            Q(occasion__icontains=search)
-            | Q(product__category__icontains=search)
-            | Q(product__type__icontains=search)
-            | Q(beneficiary_full_name__icontains=search)
-        )
-        if since and till:
-            query = query & (Q(date__gte=since) & Q(date__lte=till))
-        elif since:
-            query = query & (Q(date__gte=since))
-        elif till:
-            query = query & (Q(date__lte=till))
-
-        if product_id:
-            query = query & Q(product__id=product_id)
-
-        queryset = delivery_query.filter(query)
+        ).select_related("product", "beneficiary")
+        queryset = DeliveryFilterSet(request.query_params).filter(delivery_query)
         queryset = queryset.order_by(*case_insensitive_sort(queryset, sort))
-        queryset = queryset.distinct()
 
-        serializer = self.serializer_class(instance=queryset, many=True)
-        return Response(data=serializer.data, status=status.HTTP_200_OK)
+        export = self.export_format(request)
+        if export:
+            return self.export_response(
+                queryset, DELIVERY_COLUMNS, export, "deliveries"
+            )
+        return self.list_response(request, queryset, self.serializer_class)
 
 
-class ProductDeliveryList(APIView):
+class ProductDeliveryList(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = DELIVERY_TABLES
     serializer_class = DeliverySerializer
 
     def get(self, request: Request, *args, **kwargs):
@@ -728,206 +1196,180 @@ class ProductDeliveryList(APIView):
         return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ProductListCreate(generics.ListCreateAPIView):
+class ProductListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = PRODUCT_TABLES
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
 
+    def get_queryset(self):
+        return stock_as_of(self.request, super().get_queryset())
+
 
-class ProductRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class ProductRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = PRODUCT_TABLES
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
     lookup_field = "pk"
 
 
-class ProductFilter(APIView):
+class ProductFilter(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = PRODUCT_TABLES
     serializer_class = ProductSerializer
 
     def get(self, request: Request, *args, **kwargs):
         sort = request.query_params.getlist("sort", ["-id"])
-        search = request.query_params.get("search", "")
 
-        query = Q(category__icontains=search) | Q(type__icontains=search)
-        queryset = Product.objects.filter(query)
+        queryset = stock_as_of(request, Product.objects.all())
+        queryset = ProductFilterSet(request.query_params).filter(queryset)
         queryset = queryset.order_by(*case_insensitive_sort(queryset, sort))
-        queryset = queryset.distinct()
 
         serializer = self.serializer_class(instance=queryset, many=True)
         return Response(data=serializer.data, status=status.HTTP_200_OK)
 
 
-class StatsView(APIView):
+class ProductMovementList(KeysetPaginatedMixin, ConditionalGetMixin, APIView):
+    permission_classes = [IsAuthenticated]
+    authentication_classes = [TokenAuthentication]
+    change_tables = PRODUCT_TABLES
+    serializer_class = StockMovementSerializer
+
+    def get(self, request: Request, pk, *args, **kwargs):
+        product = get_object_or_404(Product, pk=pk)
+        queryset = product.movements.order_by("-id")
+        return self.list_response(request, queryset, self.serializer_class)
+
+
+def stock_as_of(request, queryset):
+    """Quantities as of the `as_of` date query param, when given."""
+    as_of = request.query_params.get("as_of", "")
+    if not as_of:
+        return queryset
+    try:
+        day = parse_date(as_of)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({"as_of": f"Invalid date: {as_of}"})
+    return queryset.with_quantity(as_of=day)
+
+
+class StatsView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = STATS_TABLES
 
     def get(self, request, year: int, *args, **kwargs):
+        return cached_response(
+            request,
+            f"stats:{year}",
+            [STATS_SCOPE, LOOKUPS_SCOPE],
+            lambda: self.get_stats(year),
+        )
+
+    def get_stats(self, year):
+        # Everything below reads the rollup tables maintained by the model
+        # signals (YearStats, StatusDistribution, MonthlyActivity).
 
         today = now().date()
         months = [(today.year, today.month - i) for i in range(12)]
         months = [(y - (m <= 0), m + 12 if m <= 0 else m) for y, m in months]
         months = [datetime(year, month, 1).date() for year, month in months]
+        months.reverse()
 
-        queryset = (
-            Delivery.objects.annotate(month=TruncMonth("date"))
-            .filter(month__gte=months[-1])
-            .values(month=F("month"))
-            .annotate(total=Count("id"))
-            .order_by("month")
-        )
-        queryset_dict = {entry["month"]: entry["total"] for entry in queryset}
-        query = [
-            {"month": month, "total": queryset_dict.get(month, 0)} for month in months
-        ]
-        query.reverse()
-        last_12_months_deliveries = {"months": [], "totals": []}
-        for item in query:
-            last_12_months_deliveries["months"].append(str(item["month"]).split("-")[1])
-            last_12_months_deliveries["totals"].append(item["total"])
-
-        queryset = (
-            Donation.objects.annotate(month=TruncMonth("date"))
-            .filter(month__gte=months[-1])
-            .values(month=F("month"))
-            .annotate(total=Count("id"))
-            .order_by("month")
-        )
-        queryset_dict = {entry["month"]: entry["total"] for entry in queryset}
-        query = [
-            {"month": month, "total": queryset_dict.get(month, 0)} for month in months
-        ]
-        query.reverse()
-        last_12_months_donations = {"months": [], "totals": []}
-        for item in query:
-            last_12_months_donations["months"].append(str(item["month"]).split("-")[1])
-            last_12_months_donations["totals"].append(item["total"])
+        activity = {
+            row.month: row
+            for row in MonthlyActivity.objects.filter(month__gte=months[0])
+        }
+        don_delv = {"months": [], "donations": [], "deliveries": []}
+        for month in months:
+            row = activity.get(month)
+            don_delv["months"].append(str(month).split("-")[1])
+            don_delv["donations"].append(row.donations if row else 0)
+            don_delv["deliveries"].append(row.deliveries if row else 0)
 
         last_20_years = list(
-            Year.objects.order_by("-year")[:20].values_list("year", flat=True)
-        )
-        queryset = (
-            Family.objects.annotate(year_=F("year__year"))
-            .values("year_")
-            .annotate(total=Count("id"))
-            .order_by("year_")
-        )
-        queryset_dict = {entry["year_"]: entry["total"] for entry in queryset}
-        query = [
-            {"year_": year, "total": queryset_dict.get(year, 0)}
-            for year in last_20_years
-        ]
-        query.reverse()
-        last_20_years_families = {"years": [], "totals": []}
-        for item in query:
-            last_20_years_families["years"].append(str(item["year_"]))
-            last_20_years_families["totals"].append(item["total"])
-
-        queryset = HealthStatus.objects.annotate(total=Count("family")).values(
-            "name", "total"
-        )
-        health_status = {"status": [], "totals": []}
-        for item in queryset:
-            if item["total"] > 0:
-                health_status["status"].append(item["name"])
-                health_status["totals"].append(item["total"])
-
-        queryset = SocialStatus.objects.annotate(total=Count("family")).values(
-            "name", "total"
+            Year.objects.order_by("-year").values_list("year", "stats__families")[:20]
         )
-        social_status = {"status": [], "totals": []}
-        for item in queryset:
-            if item["total"] > 0:
-                social_status["status"].append(item["name"])
-                social_status["totals"].append(item["total"])
-
-        queryset = Profession.objects.annotate(total=Count("family")).values(
-            "name", "total"
-        )
-        proffession_status = {"status": [], "totals": []}
-        for item in queryset:
-            if item["total"] > 0:
-                proffession_status["status"].append(item["name"])
-                proffession_status["totals"].append(item["total"])
+        last_20_years.reverse()
+        last_20_years_families = {
+            "years": [str(year_) for year_, total in last_20_years],
+            "totals": [total or 0 for year_, total in last_20_years],
+        }
+
+        distribution = defaultdict(int)
+        for row in (
+            StatusDistribution.objects.values("field", "value")
+            .annotate(total=Sum("total"))
+            .order_by()
+        ):
+            distribution[(row["field"], row["value"])] = row["total"]
+
+        def status_totals(model, field):
+            totals = {"status": [], "totals": []}
+            for pk, name in model.objects.values_list("pk", "name"):
+                if distribution[(field, pk)] > 0:
+                    totals["status"].append(name)
+                    totals["totals"].append(distribution[(field, pk)])
+            return totals
+
+        tribes = {
+            name: distribution[("tribe", pk)]
+            for pk, name in Tribe.objects.values_list("pk", "name")
+        }
 
-        queryset = Tribe.objects.annotate(total=Count("family")).values("name", "total")
-        tribes = {}
-        for item in queryset:
-            tribes[item["name"]] = item["total"]
+        year_stats = YearStats.objects.filter(year__year=year).first() or YearStats()
 
         stats = {
             "totals": [
-                list(
-                    Family.objects.filter(year__year=year)
-                    .aggregate(
-                        total=Count("id"),
-                    )
-                    .values()
-                )[0],
-                list(
-                    Child.objects.filter(family__year__year=year)
-                    .aggregate(
-                        total=Count("id"),
-                    )
-                    .values()
-                )[0],
-                list(
-                    Spouce.objects.filter(family__year__year=year)
-                    .aggregate(
-                        total=Count("id"),
-                    )
-                    .values()
-                )[0],
-                list(
-                    PersonInCustody.objects.filter(family__year__year=year)
-                    .aggregate(
-                        total=Count("id"),
-                    )
-                    .values()
-                )[0],
-                list(
-                    Handler.objects.aggregate(
-                        total=Count("id"),
-                    ).values()
-                )[0],
+                year_stats.families,
+                year_stats.children,
+                year_stats.spouces,
+                year_stats.custodies,
+                Handler.objects.count(),
             ],
-            "don_delv": {
-                "months": (last_12_months_donations["months"]),
-                "donations": (last_12_months_donations["totals"]),
-                "deliveries": (last_12_months_deliveries["totals"]),
-            },
+            "don_delv": don_delv,
             "families": (last_20_years_families),
             "status": {
-                "health": (health_status),
-                "social": (social_status),
-                "profession": (proffession_status),
+                "health": status_totals(HealthStatus, "healthStatus"),
+                "social": status_totals(SocialStatus, "socialStatus"),
+                "profession": status_totals(Profession, "profession"),
             },
             "tribes": (tribes),
         }
-        return Response(stats)
+        return stats
 
 
-class DonationListCreate(generics.ListCreateAPIView):
+class DonationListCreate(ConditionalGetMixin, generics.ListCreateAPIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = DONATION_TABLES
     queryset = Donation.objects.all()
     serializer_class = DonationSerializer
 
 
-class DonationRetrieveUpdateDestroy(generics.RetrieveUpdateDestroyAPIView):
+class DonationRetrieveUpdateDestroy(
+    ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView
+):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = DONATION_TABLES
     queryset = Donation.objects.all()
     serializer_class = DonationSerializer
     lookup_field = "pk"
 
 
-class ProductDonationList(APIView):
+class ProductDonationList(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = DONATION_TABLES
     serializer_class = DonationFilterSerializer
 
     def get(self, request: Request, *args, **kwargs):
@@ -948,49 +1390,39 @@ class ProductDonationList(APIView):
         return Response(data=serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class DonationFilter(APIView):
+class DonationFilter(ConditionalGetMixin, KeysetPaginatedMixin, ExportMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = DONATION_TABLES
     serializer_class = DonationFilterSerializer
 
     def get(self, request: Request, *args, **kwargs):
-        product_id = request.query_params.get("product_id", None)
         sort = request.query_params.getlist("sort", ["date"])
-        search = request.query_params.get("search", "")
-        today = date.today()
-        start_of_year = date(today.year, 1, 1)
-
-        since = request.query_params.get("since", start_of_year)
-        till = request.query_params.get("till", today)
-
-        query = (
-            Q(donor__icontains=search)
-            | Q(product__category__icontains=search)
-            | Q(product__type__icontains=search)
-        )
-        if since and till:
-            query = query & (Q(date__gte=since) & Q(date__lte=till))
-        elif since:
-            query = query & (Q(date__gte=since))
-        elif till:
-            query = query & (Q(date__lte=till))
 
-        if product_id:
-            query = query & Q(product__id=product_id)
-
-        queryset = Donation.objects.filter(query)
+        donation_query = Donation.objects.select_related("product")
+        queryset = DonationFilterSet(request.query_params).filter(donation_query)
         queryset = queryset.order_by(*case_insensitive_sort(queryset, sort))
-        queryset = queryset.distinct()
 
-        serializer = self.serializer_class(instance=queryset, many=True)
-        return Response(data=serializer.data, status=status.HTTP_200_OK)
+        export = self.export_format(request)
+        if export:
+            return self.export_response(queryset, DONATION_COLUMNS, export, "donations")
+        return self.list_response(request, queryset, self.serializer_class)
 
 
-class PrintFamilyView(APIView):
+class PrintFamilyView(ConditionalGetMixin, APIView):
     permission_classes = [IsAuthenticated]
     authentication_classes = [TokenAuthentication]
+    change_tables = FAMILY_TABLES
 
     def get(self, request, id, *args, **kwargs):
+        return cached_response(
+            request,
+            f"print-family:{id}",
+            [family_scope(id), LOOKUPS_SCOPE],
+            lambda: self.get_data(id),
+        )
+
+    def get_data(self, id):
         data = {}
 
         family = get_object_or_404(Family, id=id)
@@ -1012,7 +1444,7 @@ class PrintFamilyView(APIView):
         custodies = PersonInCustody.objects.filter(family=family)
         data["custodies"] = PersonInCustodyListSerializer(custodies, many=True).data
 
-        return Response(data)
+        return data
 
 
 class FamiliesBulkDeleteAPIView(APIView):
@@ -1023,7 +1455,21 @@ class FamiliesBulkDeleteAPIView(APIView):
                 {"error": "No IDs provided"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        deleted, _ = Family.objects.filter(id__in=ids).delete()
+        # The year rollups are recomputed once instead of per family.
+        with transaction.atomic(), bulk_operation():
+            families = Family.objects.filter(id__in=ids)
+            year_ids = set(families.values_list("year_id", flat=True))
+            # Deliveries go with their beneficiary, give their stock back.
+            Delivery.delete_in_bulk(Delivery.objects.filter(beneficiary__in=ids))
+            years = Year.objects.filter(pk__in=year_ids).values_list("year", flat=True)
+            bump_versions(
+                STATS_SCOPE,
+                *[family_scope(pk) for pk in ids],
+                *[year_scope(year) for year in years],
+            )
+            deleted, _ = families.delete()
+            YearStats.refresh(year_ids)
+            TableChange.touch(Family, *MEMBER_MODELS, Document, Delivery)
         return Response(
             {"message": f"Deleted {deleted} objects"}, status=status.HTTP_200_OK
         )
@@ -1037,7 +1483,12 @@ class ChildrenBulkDeleteAPIView(APIView):
                 {"error": "No IDs provided"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        deleted, _ = Child.objects.filter(id__in=ids).delete()
+        # One recount per family instead of a counter UPDATE per child.
+        with transaction.atomic(), bulk_operation():
+            children = Child.objects.filter(id__in=ids)
+            family_ids = set(children.values_list("family_id", flat=True))
+            deleted, _ = children.delete()
+            families_changed.send(sender=Child, family_ids=family_ids)
         return Response(
             {"message": f"Deleted {deleted} objects"}, status=status.HTTP_200_OK
         )
@@ -1079,7 +1530,7 @@ class DonationsBulkDeleteAPIView(APIView):
                 {"error": "No IDs provided"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        deleted, _ = Donation.objects.filter(id__in=ids).delete()
+        deleted = Donation.delete_in_bulk(Donation.objects.filter(id__in=ids))
         return Response(
             {"message": f"Deleted {deleted} objects"}, status=status.HTTP_200_OK
         )
@@ -1093,7 +1544,7 @@ class DeliveriesBulkDeleteAPIView(APIView):
                 {"error": "No IDs provided"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        deleted, _ = Delivery.objects.filter(id__in=ids).delete()
+        deleted = Delivery.delete_in_bulk(Delivery.objects.filter(id__in=ids))
         return Response(
             {"message": f"Deleted {deleted} objects"}, status=status.HTTP_200_OK
         )
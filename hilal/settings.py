@@ -78,6 +78,24 @@ DATABASES = {
     'default': dj_database_url.config(default=os.environ.get('DATABASE_URL'))
 }
 
+# Response cache (api/caching.py). The in-process cache is only shared by the
+# threads of one worker; set CACHE_DIR when running several worker processes.
+if os.environ.get("CACHE_DIR"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.environ["CACHE_DIR"],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "hilal",
+            "OPTIONS": {"MAX_ENTRIES": 1000},
+        }
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -120,6 +138,26 @@ MEDIA_URL = "media/"
 
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Media is served by api.views.MediaFileView. Set MEDIA_SENDFILE to "x-accel"
+# (nginx, internal location at MEDIA_ACCEL_PREFIX aliased to MEDIA_ROOT) or
+# "x-sendfile" (Apache/lighttpd) to hand the transfer to the front server.
+MEDIA_SENDFILE = os.environ.get("MEDIA_SENDFILE", "")
+MEDIA_ACCEL_PREFIX = os.environ.get("MEDIA_ACCEL_PREFIX", "/protected-media/")
+
+# Barcode label sheets (api/labels.py). LABEL_FONT is a TTF with Arabic
+# glyphs (e.g. Amiri, Noto Naskh Arabic), sheets are refused without it.
+LABEL_CACHE_DIR = os.environ.get(
+    "LABEL_CACHE_DIR", os.path.join(BASE_DIR, "cache", "labels")
+)
+LABEL_FONT = os.environ.get("LABEL_FONT", "")
+LABEL_WORKERS = int(os.environ.get("LABEL_WORKERS", os.cpu_count() or 1))
+
+# Background threads building document thumbnails (api/thumbnails.py).
+THUMBNAIL_WORKERS = int(os.environ.get("THUMBNAIL_WORKERS", 2))
+
+# Database backups written by `manage.py backup` (api/backup.py).
+BACKUP_DIR = os.environ.get("BACKUP_DIR", os.path.join(BASE_DIR, "backups"))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -1,10 +1,14 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from api.views import MediaFileView
 
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', include("api.urls"))
-    
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    path('api/', include("api.urls")),
+    path(
+        settings.MEDIA_URL.lstrip("/") + "<path:path>",
+        MediaFileView.as_view(),
+        name="media-file-view",
+    ),
+]